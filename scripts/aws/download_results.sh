@@ -54,19 +54,29 @@ download_result \
 
 download_result \
     "output/monthly_avg" \
-    "output/monthly_avg_results.csv" \
+    "output/monthly_avg.jsonl" \
     "Monthly Average Temperature"
 
 download_result \
     "output/extreme_temps" \
-    "output/extreme_temps_results.csv" \
+    "output/extreme_temps.jsonl" \
     "Extreme Temperature Detection"
 
 download_result \
     "output/temp_precip" \
-    "output/temp_precip_results.csv" \
+    "output/temp_precip.jsonl" \
     "Temperature-Precipitation Correlation"
 
+download_result \
+    "output/temp_quantiles" \
+    "output/temp_quantiles.jsonl" \
+    "Monthly Temperature Quantile Sketches"
+
+download_result \
+    "output/temp_histograms" \
+    "output/temp_histograms.jsonl" \
+    "Temperature Histograms"
+
 echo "============================================================"
 echo "SUCCESS: Results downloaded!"
 echo "============================================================"
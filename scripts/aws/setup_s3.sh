@@ -79,9 +79,20 @@ echo "Folders created"
 echo ""
 echo "Uploading data files..."
 if [ -f "data/raw/medellin_weather_2022-2024.csv" ]; then
-    aws s3 cp data/raw/medellin_weather_2022-2024.csv \
-        "s3://$BUCKET_NAME/input/medellin_weather_2022-2024.csv"
-    echo "Weather data uploaded"
+    # bzip2 is the one compression Hadoop splits across mappers, so the
+    # compressed upload is still read by many map tasks in parallel
+    if [ ! -f "data/raw/medellin_weather_2022-2024.csv.bz2" ] || \
+       [ "data/raw/medellin_weather_2022-2024.csv" -nt "data/raw/medellin_weather_2022-2024.csv.bz2" ]; then
+        if command -v bzip2 &> /dev/null; then
+            bzip2 -kf -9 data/raw/medellin_weather_2022-2024.csv
+        else
+            python3 -c "import bz2, shutil, sys; shutil.copyfileobj(open(sys.argv[1], 'rb'), bz2.open(sys.argv[1] + '.bz2', 'wb', 9))" \
+                data/raw/medellin_weather_2022-2024.csv
+        fi
+    fi
+    aws s3 cp data/raw/medellin_weather_2022-2024.csv.bz2 \
+        "s3://$BUCKET_NAME/input/medellin_weather_2022-2024.csv.bz2"
+    echo "Weather data uploaded (bzip2, splittable)"
 else
     echo "WARNING: Weather data not found. Run: python3 scripts/download_data.py"
 fi
@@ -21,6 +21,12 @@ fi
 BUCKET_NAME=${S3_BUCKET:-"weatheria-climate-data"}
 JOB_NAME=${1:-"monthly"}
 
+# Prefer the splittable bzip2 upload of setup_s3.sh over plain CSV
+INPUT_KEY=${INPUT_KEY:-"input/medellin_weather_2022-2024.csv.bz2"}
+if ! aws s3 ls "s3://$BUCKET_NAME/$INPUT_KEY" &> /dev/null; then
+    INPUT_KEY="input/medellin_weather_2022-2024.csv"
+fi
+
 echo "============================================================"
 echo "Weatheria Climate Observatory - MRJob EMR Submission"
 echo "============================================================"
@@ -47,6 +53,26 @@ if ! $PYTHON_CMD -c "import mrjob" 2>/dev/null; then
     $PIP_CMD install mrjob boto3
 fi
 
+# Cache markers: a job whose input object (S3 ETag) and code fingerprint
+# match the _CACHE_KEY of its output is skipped. NO_CACHE=1 forces reruns.
+CACHE_LOG="output/reports/emr_cache.log"
+
+cache_key() {
+    local script_file=$1
+    local input_path=$2
+    local etag
+    
+    etag=$(aws s3api head-object --bucket "$BUCKET_NAME" --key "$input_path" \
+        --query ETag --output text 2>/dev/null) || return 1
+    echo "$etag:$($PYTHON_CMD src/mapreduce/result_cache.py fingerprint "$script_file")"
+}
+
+log_cache() {
+    mkdir -p "$(dirname "$CACHE_LOG")"
+    echo "$(date -u +%Y-%m-%dT%H:%M:%SZ) $1 $2" >> "$CACHE_LOG"
+    echo "   Cache $1 (hits: $(grep -c ' hit ' "$CACHE_LOG"), misses: $(grep -c ' miss ' "$CACHE_LOG"))"
+}
+
 # Function to run MRJob on EMR
 run_mrjob() {
     local script_file=$1
@@ -58,8 +84,20 @@ run_mrjob() {
     echo "   Script: $script_file"
     echo "   Input: s3://$BUCKET_NAME/$input_path"
     echo "   Output: s3://$BUCKET_NAME/$output_path"
+    echo "   Run report: output/reports/$(basename "$script_file" .py).json"
     echo ""
     
+    local key=""
+    if [ -z "$NO_CACHE" ] && key=$(cache_key "$script_file" "$input_path"); then
+        if [ "$(aws s3 cp "s3://$BUCKET_NAME/$output_path/_CACHE_KEY" - 2>/dev/null)" = "$key" ]; then
+            log_cache hit "$script_file"
+            echo "   Input and job code unchanged, keeping s3://$BUCKET_NAME/$output_path"
+            echo ""
+            return
+        fi
+        log_cache miss "$script_file"
+    fi
+    
     # Clean up previous output if exists
     echo "   Cleaning previous output..."
     aws s3 rm "s3://$BUCKET_NAME/$output_path/" --recursive 2>/dev/null || true
@@ -71,8 +109,14 @@ run_mrjob() {
         --region=us-east-1 \
         --no-output \
         --output-dir="s3://$BUCKET_NAME/$output_path" \
+        --run-report="output/reports/$(basename "$script_file" .py).json" \
         "s3://$BUCKET_NAME/$input_path"
     
+    # Mark the output with the run's cache key (Hadoop skips _ files)
+    if [ -n "$key" ]; then
+        echo "$key" | aws s3 cp - "s3://$BUCKET_NAME/$output_path/_CACHE_KEY"
+    fi
+    
     echo ""
     echo "   Job completed!"
     echo ""
@@ -83,7 +127,7 @@ case $JOB_NAME in
     "monthly"|"monthly-avg"|"2")
         run_mrjob \
             "src/mapreduce/monthly_avg_temp.py" \
-            "input/medellin_weather_2022-2024.csv" \
+            "$INPUT_KEY" \
             "output/monthly_avg" \
             "Monthly Average Temperature"
         ;;
@@ -91,7 +135,7 @@ case $JOB_NAME in
     "extreme"|"extreme-temps"|"3")
         run_mrjob \
             "src/mapreduce/extreme_temps.py" \
-            "input/medellin_weather_2022-2024.csv" \
+            "$INPUT_KEY" \
             "output/extreme_temps" \
             "Extreme Temperature Detection"
         ;;
@@ -99,30 +143,73 @@ case $JOB_NAME in
     "correlation"|"temp-precip"|"4")
         run_mrjob \
             "src/mapreduce/temp_precipitation.py" \
-            "input/medellin_weather_2022-2024.csv" \
+            "$INPUT_KEY" \
             "output/temp_precip" \
             "Temperature-Precipitation Correlation"
         ;;
         
+    "fused"|"5")
+        echo "Running: All analyses in a single scan"
+        echo "   Script: src/mapreduce/weather_analyses.py"
+        echo "   Input: s3://$BUCKET_NAME/$INPUT_KEY"
+        echo "   Output: s3://$BUCKET_NAME/output/fused"
+        echo "           output/hadoop/{monthly_avg,extreme_temps,temp_precip,temp_histograms}"
+        echo ""
+        
+        aws s3 rm "s3://$BUCKET_NAME/output/fused/" --recursive 2>/dev/null || true
+        
+        # One scan and one shuffle; the reduced results are split per
+        # analysis on this machine (--analysis-output-root is local only)
+        $PYTHON_CMD src/mapreduce/weather_analyses.py \
+            -r emr \
+            --cluster-id="$CLUSTER_ID" \
+            --region=us-east-1 \
+            --output-dir="s3://$BUCKET_NAME/output/fused" \
+            --analysis-output-root="output/hadoop" \
+            --run-report="output/reports/weather_analyses.json" \
+            "s3://$BUCKET_NAME/$INPUT_KEY"
+        
+        echo ""
+        echo "   Job completed! Collect the results for the API with:"
+        echo "   python scripts/convert_hadoop_output.py"
+        echo ""
+        ;;
+        
+    "rolling"|"rolling-window"|"6")
+        run_mrjob \
+            "src/mapreduce/rolling_window.py" \
+            "$INPUT_KEY" \
+            "output/rolling_window" \
+            "Rolling-Window Statistics"
+        ;;
+        
+    "quantiles"|"temp-quantiles"|"7")
+        run_mrjob \
+            "src/mapreduce/temp_quantiles.py" \
+            "$INPUT_KEY" \
+            "output/temp_quantiles" \
+            "Monthly Temperature Quantile Sketches"
+        ;;
+        
     "all")
         echo "Running all jobs..."
         echo ""
         
         run_mrjob \
             "src/mapreduce/monthly_avg_temp.py" \
-            "input/medellin_weather_2022-2024.csv" \
+            "$INPUT_KEY" \
             "output/monthly_avg" \
             "Monthly Average Temperature"
             
         run_mrjob \
             "src/mapreduce/extreme_temps.py" \
-            "input/medellin_weather_2022-2024.csv" \
+            "$INPUT_KEY" \
             "output/extreme_temps" \
             "Extreme Temperature Detection"
             
         run_mrjob \
             "src/mapreduce/temp_precipitation.py" \
-            "input/medellin_weather_2022-2024.csv" \
+            "$INPUT_KEY" \
             "output/temp_precip" \
             "Temperature-Precipitation Correlation"
         ;;
@@ -134,6 +221,9 @@ case $JOB_NAME in
         echo "  monthly          - Monthly average temperature"
         echo "  extreme          - Extreme temperature detection"
         echo "  correlation      - Temperature-precipitation correlation"
+        echo "  fused            - All analyses (incl. histograms) in one scan (one EMR job)"
+        echo "  rolling          - 7/30-day rolling means and extremes"
+        echo "  quantiles        - Monthly t-digest sketches for percentile queries"
         echo "  all              - Run all jobs"
         exit 1
         ;;
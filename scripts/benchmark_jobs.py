@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the Weatheria MapReduce jobs
+
+Generates synthetic datasets (cached under --data-dir) and runs every job
+on each of them with the multiprocess local engine, one child process per
+run, recording rows per second, peak resident memory of the run and the
+bytes that crossed the shuffle. Results are written as JSON together with
+the git commit, so runs on two commits can be compared with --compare.
+
+Usage: python scripts/benchmark_jobs.py --rows 100000 1000000 10000000
+       python scripts/benchmark_jobs.py --jobs monthly_avg extreme_temps \
+           --output benchmarks/after.json --compare benchmarks/before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# The jobs import their shared modules by name, as they do on Hadoop
+sys.path.append(str(ROOT / 'src' / 'mapreduce'))
+sys.path.append(str(Path(__file__).parent))
+
+from generate_weather_data import write_dataset
+from local_engine import JOBS
+
+LOCAL_ENGINE = ROOT / 'src' / 'mapreduce' / 'local_engine.py'
+
+
+def dataset_path(data_dir, rows, stations, malformed_rate, seed):
+    """
+    Cache path of a synthetic dataset, unique per generator options
+    
+    Args:
+        data_dir: Directory for datasets
+        rows: Data rows
+        stations: Number of stations
+        malformed_rate: Fraction of malformed lines
+        seed: Random seed
+        
+    Returns:
+        File path
+    """
+    name = f"weather_{rows}r_{stations}s_{malformed_rate:g}m_{seed}.csv"
+    return os.path.join(data_dir, name)
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_job(job_name, input_path, rows, processes=None, job_args=()):
+    """
+    Run one job in a child process and measure it
+    
+    Args:
+        job_name: Job registry name
+        input_path: Input CSV
+        rows: Data rows in the input
+        processes: Worker processes (default: all cores)
+        job_args: Job command line arguments
+        
+    Returns:
+        Dictionary of measurements, including the engine's run summary
+    """
+    with tempfile.TemporaryDirectory() as output_dir:
+        command = [sys.executable, str(LOCAL_ENGINE), job_name, input_path,
+                   '--output-dir', output_dir]
+        if processes:
+            command += ['--processes', str(processes)]
+        if job_args:
+            command += ['--'] + list(job_args)
+        
+        with tempfile.TemporaryFile() as stdout:
+            start = time.perf_counter()
+            process = subprocess.Popen(command, stdout=stdout)
+            
+            # wait4() reports the peak RSS of the engine and its reaped workers
+            _, status, usage = os.wait4(process.pid, 0)
+            wall_seconds = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            
+            if process.returncode != 0:
+                raise RuntimeError(f"{job_name} failed with exit code {process.returncode}")
+            
+            stdout.seek(0)
+            summary = json.loads(stdout.read())
+    
+    job_seconds = summary['map_seconds'] + summary['reduce_seconds']
+    
+    return {
+        'job': job_name,
+        'rows': rows,
+        'wall_seconds': round(wall_seconds, 3),
+        'rows_per_second': round(rows / job_seconds),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        'peak_rss_mb': round(usage.ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1),
+        'shuffle_records': summary['shuffle_records'],
+        'shuffle_bytes': summary['shuffle_bytes'],
+        'summary': summary,
+    }
+
+
+def compare(results, baseline):
+    """
+    Print throughput and shuffle size against a baseline results file
+    
+    Args:
+        results: Results dictionary of this run
+        baseline: Results dictionary of an earlier run
+    """
+    previous = {(run['job'], run['rows']): run for run in baseline['runs']}
+    
+    print(f"\n Compared to {baseline.get('commit') or 'baseline'}:")
+    print(f"{'job':<20}{'rows':>12}{'rows/s':>10}{'peak RSS':>10}{'shuffle':>10}")
+    
+    for run in results['runs']:
+        before = previous.get((run['job'], run['rows']))
+        if before is None:
+            continue
+        
+        def ratio(field):
+            return f"{run[field] / before[field]:.2f}x" if before[field] else 'n/a'
+        
+        print(f"{run['job']:<20}{run['rows']:>12,}{ratio('rows_per_second'):>10}"
+              f"{ratio('peak_rss_mb'):>10}{ratio('shuffle_bytes'):>10}")
+
+
+def main():
+    """Run the benchmark suite and write the results"""
+    parser = argparse.ArgumentParser(description='Benchmark the Weatheria MapReduce jobs')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000],
+                        help='Dataset sizes, 10^5 to 10^8 (default: 100000 1000000)')
+    parser.add_argument('--jobs', nargs='+', default=list(JOBS), choices=list(JOBS),
+                        help='Jobs to run (default: all)')
+    parser.add_argument('--stations', type=int, default=20,
+                        help='Stations in the synthetic data (default: 20)')
+    parser.add_argument('--malformed-rate', type=float, default=0.001,
+                        help='Fraction of malformed lines (default: 0.001)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Worker processes (default: all cores)')
+    parser.add_argument('--data-dir', default='data/benchmark',
+                        help='Directory for cached datasets (default: data/benchmark)')
+    parser.add_argument('--output', default=None,
+                        help='Results JSON (default: output/benchmarks/<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results JSON to compare with')
+    args = parser.parse_args()
+    
+    commit = git_commit()
+    output = args.output or os.path.join('output', 'benchmarks', f"{(commit or 'unknown')[:12]}.json")
+    
+    results = {
+        'commit': commit,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'processes': args.processes or os.cpu_count(),
+        'stations': args.stations,
+        'malformed_rate': args.malformed_rate,
+        'seed': args.seed,
+        'runs': [],
+    }
+    
+    print("=" * 72)
+    print("Weatheria - MapReduce Job Benchmark")
+    print("=" * 72)
+    
+    for rows in args.rows:
+        path = dataset_path(args.data_dir, rows, args.stations, args.malformed_rate, args.seed)
+        if not os.path.exists(path):
+            print(f" Generating {rows:,} rows -> {path}")
+            write_dataset(path, rows, stations=args.stations,
+                          malformed_rate=args.malformed_rate, seed=args.seed)
+        
+        print(f"{'job':<20}{'rows':>12}{'rows/s':>12}{'peak RSS MB':>13}{'shuffle MB':>12}")
+        for job_name in args.jobs:
+            run = run_job(job_name, path, rows, args.processes)
+            results['runs'].append(run)
+            print(f"{job_name:<20}{rows:>12,}{run['rows_per_second']:>12,}"
+                  f"{run['peak_rss_mb']:>13.1f}{run['shuffle_bytes'] / 1e6:>12.2f}")
+    
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    
+    print("=" * 72)
+    print(f" Results saved to: {output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
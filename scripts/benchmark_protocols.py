@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: mrjob JSONProtocol vs PackedValueProtocol
+
+Encodes and decodes synthetic intermediate records shaped like the ones the
+MapReduce jobs shuffle, and reports bytes per record and records per second.
+
+Usage: python scripts/benchmark_protocols.py [--records 200000] [--seed 42]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# The jobs import their shared modules by name, as they do on Hadoop
+sys.path.append(str(Path(__file__).parent.parent / 'src' / 'mapreduce'))
+
+from mrjob.protocol import JSONProtocol
+
+from protocols import PackedValueProtocol
+
+
+def synthetic_records(kind, count, seed):
+    """
+    Build intermediate records shaped like the jobs' mapper/combiner output
+    
+    Args:
+        kind: 'raw' for per-line mapper output, 'partial' for combiner sums
+        count: Number of records
+        seed: Random seed
+        
+    Returns:
+        List of (key, value) tuples
+    """
+    rng = random.Random(seed)
+    records = []
+    
+    for _ in range(count):
+        year_month = f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}"
+        temp_max = round(rng.uniform(20, 34), 1)
+        temp_min = round(rng.uniform(10, 20), 1)
+        precip = round(max(0.0, rng.gauss(4, 6)), 1)
+        
+        if kind == 'raw':
+            # MonthlyAvgTemperature / TempPrecipitationCorrelation mapper output
+            records.append((year_month, (temp_max, temp_min, 1)))
+            records.append((year_month, (1, (temp_max + temp_min) / 2, precip,
+                                         0.0, 0.0, 0.0, int(precip > 0))))
+        else:
+            # Combiner output: sums over a month of readings
+            days = rng.randint(28, 31)
+            records.append((year_month, (temp_max * days, temp_min * days, days)))
+            records.append((year_month, (days, temp_max * days, precip * days,
+                                         rng.uniform(0, 100), rng.uniform(0, 900),
+                                         rng.uniform(-300, 300), rng.randint(0, days))))
+    
+    return records
+
+
+def benchmark(protocol, records):
+    """
+    Time encoding and decoding a list of records
+    
+    Args:
+        protocol: mrjob-style protocol instance
+        records: List of (key, value) tuples
+        
+    Returns:
+        Dictionary of measurements
+    """
+    start = time.perf_counter()
+    lines = [protocol.write(key, value) for key, value in records]
+    encode_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for line in lines:
+        protocol.read(line)
+    decode_seconds = time.perf_counter() - start
+    
+    # +1 for the newline separating records in the shuffle
+    total_bytes = sum(len(line) + 1 for line in lines)
+    
+    return {
+        'bytes_per_record': total_bytes / len(records),
+        'encode_rps': len(records) / encode_seconds,
+        'decode_rps': len(records) / decode_seconds,
+    }
+
+
+def main():
+    """Run the benchmark and print a comparison table"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    protocols = [
+        ('JSONProtocol', JSONProtocol()),
+        ('PackedValueProtocol', PackedValueProtocol()),
+    ]
+    
+    print("=" * 72)
+    print("Weatheria - Internal Protocol Benchmark")
+    print("=" * 72)
+    print(f"{'records':<10}{'protocol':<22}{'bytes/rec':>10}{'encode rec/s':>15}{'decode rec/s':>15}")
+    
+    for kind in ('raw', 'partial'):
+        records = synthetic_records(kind, args.records // 2, args.seed)
+        
+        for name, protocol in protocols:
+            result = benchmark(protocol, records)
+            print(f"{kind:<10}{name:<22}{result['bytes_per_record']:>10.1f}"
+                  f"{result['encode_rps']:>15,.0f}{result['decode_rps']:>15,.0f}")
+    
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
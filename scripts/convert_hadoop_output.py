@@ -1,94 +1,109 @@
-﻿#!/usr/bin/env python3
+#!/usr/bin/env python3
 """
-Convert Hadoop MapReduce output (TSV) to CSV format for API
+Collect Hadoop MapReduce output (part files) into the API results files
+
+The jobs write one JSON record per line, so current output only needs its
+part files concatenated. Output from older runs, written as
+"key"\t"value1\tvalue2" with a literal backslash-t, is converted to the same
+JSON-lines records.
 """
 
-import csv
+import glob
+import json
 import os
 
 
-def convert_monthly_avg():
-    """Convert monthly average output"""
-    input_file = "output/hadoop/monthly_avg.tsv"
-    output_file = "output/monthly_avg_results.csv"
-
-    with open(input_file, 'r') as fin, open(output_file, 'w', newline='') as fout:
-        writer = csv.writer(fout)
-        writer.writerow(['month', 'avg_max', 'avg_min'])
-
-        for line in fin:
-            # Remove quotes and parse - Hadoop output uses quotes around values
-            line = line.strip().replace('"', '')
-            # Replace literal \t with actual tab
-            line = line.replace('\\t', '\t')
-            # Split by tab - first tab separates key from value
-            parts = line.split('\t', 1)  # Split only on first tab
-            if len(parts) >= 2:
-                month = parts[0]
-                # Second part contains "avg_max\tavg_min" format
-                value_part = parts[1]
-                temps = value_part.split('\t')
-                if len(temps) >= 2:
-                    writer.writerow([month, temps[0], temps[1]])
-
-    print(f" Converted monthly averages: {output_file}")
-
-
-def convert_extreme_temps():
-    """Convert extreme temperatures output"""
-    input_file = "output/hadoop/extreme_temps.tsv"
-    output_file = "output/extreme_temps_results.csv"
-
-    with open(input_file, 'r') as fin, open(output_file, 'w', newline='') as fout:
-        writer = csv.writer(fout)
-        writer.writerow(['category', 'count', 'avg_temp'])
-
-        for line in fin:
-            # Remove quotes and parse
-            line = line.strip().replace('"', '')
-            line = line.replace('\\t', '\t')
-            parts = line.split('\t', 1)  # Split only on first tab
-            if len(parts) >= 2:
-                category = parts[0]
-                # Second part contains "count\tavg_temp"
-                value_part = parts[1]
-                stats = value_part.split('\t')
-                if len(stats) >= 2:
-                    writer.writerow([category, stats[0], stats[1]])
-
-    print(f" Converted extreme temperatures: {output_file}")
-
-
-def convert_temp_precip():
-    """Convert temperature-precipitation correlation output"""
-    input_file = "output/hadoop/temp_precip.tsv"
-    output_file = "output/temp_precip_results.csv"
-
-    with open(input_file, 'r') as fin, open(output_file, 'w', newline='') as fout:
-        writer = csv.writer(fout)
-        writer.writerow(['month', 'correlation', 'avg_temp', 'avg_precip', 'rainy_days', 'total_precip'])
-
-        for line in fin:
-            # Remove quotes and parse
-            line = line.strip().replace('"', '')
-            line = line.replace('\\t', '\t')
-            parts = line.split('\t', 1)  # Split only on first tab
-            if len(parts) >= 2:
-                month = parts[0]
-                # Second part contains "corr\tavg_temp\tavg_precip\trainy_days\ttotal_precip"
-                value_part = parts[1]
-                stats = value_part.split('\t')
-                if len(stats) >= 5:
-                    writer.writerow([month, stats[0], stats[1], stats[2], stats[3], stats[4]])
-
-    print(f" Converted temp-precipitation: {output_file}")
+HADOOP_OUTPUT_DIR = "output/hadoop"
+RESULTS_DIR = "output"
+
+# Result name -> field names of the legacy key/value columns
+RESULT_FIELDS = {
+    "monthly_avg": ["month", "avg_max", "avg_min"],
+    "extreme_temps": ["category", "count", "avg_temp"],
+    "temp_precip": ["month", "correlation", "avg_temp", "avg_precip", "rainy_days", "total_precip"],
+    # Only ever written as JSON lines
+    "temp_quantiles": ["month"],
+    "temp_histograms": ["variable"],
+}
+
+
+def parse_legacy_line(line, fields):
+    """
+    Convert a legacy "key"\t"v1\tv2" line into a record
+    
+    Args:
+        line: Output line
+        fields: Field names, key first
+        
+    Returns:
+        Dictionary record, or None if the line cannot be parsed
+    """
+    key, _, value = line.partition('\t')
+    values = [json.loads(key)] + json.loads(value).split('\t')
+    if len(values) < len(fields):
+        return None
+    
+    record = {fields[0]: values[0]}
+    for field, raw in zip(fields[1:], values[1:]):
+        number = float(raw)
+        record[field] = int(number) if field in ("count", "rainy_days") else number
+    return record
+
+
+def convert(name, hadoop_output_dir=HADOOP_OUTPUT_DIR, results_dir=RESULTS_DIR):
+    """
+    Collect one result's part files into <results_dir>/<name>.jsonl
+    
+    The file is written under a temporary name and renamed into place, so
+    a reader (e.g. the API) never sees a partial result. A result without
+    part files (a job that was not run) is skipped and its existing file
+    kept.
+    
+    Args:
+        name: Result name (a key of RESULT_FIELDS)
+        hadoop_output_dir: Directory holding one part file directory per result
+        results_dir: Directory for the JSON-lines results
+        
+    Returns:
+        Number of records written, or None if there were no part files
+    """
+    fields = RESULT_FIELDS[name]
+    part_files = sorted(glob.glob(os.path.join(hadoop_output_dir, name, "part-*")))
+    output_file = os.path.join(results_dir, f"{name}.jsonl")
+    tmp_file = os.path.join(results_dir, f".{name}.jsonl.tmp")
+    
+    if not part_files:
+        print(f" Skipped {name}: no part files in {os.path.join(hadoop_output_dir, name)}")
+        return None
+    
+    count = 0
+    with open(tmp_file, 'w') as fout:
+        for part_file in part_files:
+            with open(part_file, 'r') as fin:
+                for line in fin:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    
+                    if line.startswith('{'):
+                        record = json.loads(line)
+                    else:
+                        record = parse_legacy_line(line, fields)
+                        if record is None:
+                            continue
+                    
+                    fout.write(json.dumps(record) + '\n')
+                    count += 1
+    
+    os.replace(tmp_file, output_file)
+    print(f" Converted {name}: {output_file} ({count} records)")
+    return count
 
 
 if __name__ == '__main__':
-    print("Converting Hadoop MapReduce outputs to CSV format...\n")
+    print("Collecting Hadoop MapReduce outputs for the API...\n")
 
-    convert_monthly_avg()
-    convert_extreme_temps()
-    convert_temp_precip()
+    for name in RESULT_FIELDS:
+        convert(name)
 
     print("\n All conversions completed successfully!")
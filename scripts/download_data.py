@@ -2,8 +2,14 @@
 """
 Download weather data from Open-Meteo API for Medellín, Colombia
 Usage: python scripts/download_data.py
+       python scripts/download_data.py --start-date 2025-01-01 --end-date 2025-01-07 \
+           --output data/raw/delta.csv
+       python scripts/download_data.py --format parquet --output data/raw/medellin_parquet
+       python scripts/download_data.py --compress bzip2
 """
 
+import argparse
+import bz2
 import os
 import sys
 import requests
@@ -13,6 +19,7 @@ from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "mapreduce"))
 
 # Configuration
 LATITUDE = 6.25
@@ -23,6 +30,91 @@ TIMEZONE = "America/Bogota"
 OUTPUT_DIR = "data/raw"
 OUTPUT_FILE = "medellin_weather_2022-2024.csv"
 
+# Columnar output: file extension per format
+COLUMNAR_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Splittable CSV compression: file extension per codec
+COMPRESSED_EXTENSIONS = {"bgzip": ".gz", "bzip2": ".bz2"}
+
+
+def write_partitioned(df: pd.DataFrame, output_dir: str, file_format: str) -> list:
+    """
+    Write weather rows as a year/month partitioned Parquet or Arrow dataset
+    
+    Each month goes to output_dir/year=YYYY/month=MM/part-00000.<ext> with
+    a typed schema (date32 date, float64 readings, zstd compression), which
+    the MapReduce jobs read with --input-format parquet|arrow.
+    
+    Args:
+        df: DataFrame with date, temp_max, temp_min, precipitation
+            [, station_id] columns
+        output_dir: Dataset root directory
+        file_format: 'parquet' or 'arrow'
+        
+    Returns:
+        List of written file paths
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    
+    dates = pd.to_datetime(df['date'])
+    typed = pd.DataFrame({
+        'date': dates.dt.date,
+        'temp_max': df['temp_max'].astype('float64'),
+        'temp_min': df['temp_min'].astype('float64'),
+        'precipitation': df['precipitation'].astype('float64'),
+    })
+    if 'station_id' in df.columns:
+        typed['station_id'] = df['station_id'].astype(str)
+    
+    paths = []
+    for (year, month), rows in typed.groupby([dates.dt.year, dates.dt.month]):
+        partition = os.path.join(output_dir, f"year={year:04d}", f"month={month:02d}")
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, "part-00000" + COLUMNAR_EXTENSIONS[file_format])
+        
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        if file_format == "parquet":
+            pq.write_table(table, path, compression="zstd")
+        else:
+            feather.write_feather(table, path, compression="zstd")
+        paths.append(path)
+    
+    return paths
+
+
+def write_compressed_csv(df: pd.DataFrame, output_file: str, compression: str) -> str:
+    """
+    Write weather rows as a splittable compressed CSV
+    
+    bgzip writes independent 64 KiB gzip blocks with a .gzi index, which
+    the local engine splits across map tasks and any gzip reader can read.
+    bzip2 is split natively by Hadoop (and so on EMR), which cannot split
+    gzip files of any kind.
+    
+    Args:
+        df: DataFrame with the weather columns
+        output_file: CSV path; the codec's extension is appended
+        compression: 'bgzip' or 'bzip2'
+        
+    Returns:
+        Path of the written file
+    """
+    from bgzf import BgzfWriter
+    
+    path = output_file + COMPRESSED_EXTENSIONS[compression]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    
+    if compression == "bgzip":
+        with BgzfWriter(path) as f:
+            f.write(df.to_csv(index=False))
+    else:
+        with bz2.open(path, "wt", compresslevel=9) as f:
+            df.to_csv(f, index=False)
+    
+    return path
+
 
 def download_medellin_weather(
     start_date: str,
@@ -30,6 +122,8 @@ def download_medellin_weather(
     output_file: str,
     latitude: float = LATITUDE,
     longitude: float = LONGITUDE,
+    file_format: str = "csv",
+    compression: str = "none",
 ) -> pd.DataFrame:
     """
     Download weather data from Open-Meteo for Medellín
@@ -37,9 +131,14 @@ def download_medellin_weather(
     Args:
         start_date: Start date (YYYY-MM-DD)
         end_date: End date (YYYY-MM-DD)
-        output_file: Path to save CSV file
+        output_file: Path to save CSV file, or dataset directory for
+            columnar formats
         latitude: Latitude coordinate
         longitude: Longitude coordinate
+        file_format: 'csv', or 'parquet'/'arrow' for a year/month
+            partitioned dataset
+        compression: 'none', or 'bgzip'/'bzip2' for a splittable
+            compressed copy of the CSV
     
     Returns:
         DataFrame with weather data
@@ -80,11 +179,19 @@ def download_medellin_weather(
             'precipitation': data['daily']['precipitation_sum']
         })
         
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        # Save to CSV
-        df.to_csv(output_file, index=False)
+        if file_format == "csv":
+            # Ensure output directory exists
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+            
+            # Save to CSV
+            df.to_csv(output_file, index=False)
+            
+            if compression != "none":
+                compressed = write_compressed_csv(df, output_file, compression)
+                print(f" Compressed copy: {compressed}")
+        else:
+            paths = write_partitioned(df, output_file, file_format)
+            print(f" Partitions written: {len(paths)}")
         
         print(f" Data saved to: {output_file}")
         print(f" Total records: {len(df)}")
@@ -110,13 +217,39 @@ def download_medellin_weather(
 
 def main():
     """Main function"""
-    output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
+    parser = argparse.ArgumentParser(description='Download Medellín weather data')
+    parser.add_argument('--start-date', default=START_DATE,
+                        help=f'Start date YYYY-MM-DD (default: {START_DATE})')
+    parser.add_argument('--end-date', default=END_DATE,
+                        help=f'End date YYYY-MM-DD (default: {END_DATE})')
+    parser.add_argument('--output', default=None,
+                        help='CSV file to write, or dataset directory with --format '
+                             'parquet/arrow')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'arrow'], default='csv',
+                        help='csv (default), or a year=YYYY/month=MM partitioned '
+                             'Parquet or Arrow IPC dataset')
+    parser.add_argument('--compress', choices=['none', 'bgzip', 'bzip2'], default='none',
+                        help='Also write a splittable compressed CSV: bgzip (.gz with '
+                             '.gzi index, split by the local engine) or bzip2 (.bz2, '
+                             'split by Hadoop/EMR)')
+    args = parser.parse_args()
+    
+    if args.compress != 'none' and args.format != 'csv':
+        parser.error('--compress applies to --format csv')
+    
+    output_path = args.output
+    if output_path is None:
+        output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
+        if args.format != 'csv':
+            output_path = os.path.splitext(output_path)[0] + '_' + args.format
     
     # Download data
     df = download_medellin_weather(
-        start_date=START_DATE,
-        end_date=END_DATE,
-        output_file=output_path
+        start_date=args.start_date,
+        end_date=args.end_date,
+        output_file=output_path,
+        file_format=args.format,
+        compression=args.compress
     )
     
     print("\n" + "=" * 60)
@@ -126,6 +259,12 @@ def main():
     print(f"   1. Review the data: cat {output_path}")
     print(f"   2. Load to HDFS: ./scripts/load_to_hdfs.sh")
     print(f"   3. Run MapReduce jobs: ./scripts/run_mapreduce.sh")
+    if args.format != 'csv':
+        print(f"   Columnar input: python src/mapreduce/local_engine.py monthly_avg "
+              f"{output_path} --output-dir output/local/monthly_avg")
+    print(f"   Or merge a delta into stored results:")
+    print(f"      python src/mapreduce/incremental.py monthly_avg {output_path} "
+          f"--output-dir output/local/monthly_avg")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic weather dataset for scaling tests and benchmarks
+
+Writes the same CSV layout the MapReduce jobs read (date, temp_max,
+temp_min, precipitation[, station_id]) with seasonal temperatures and
+bursty rain, one day per station at a time. Rows are produced as a stream,
+so 10^8-row files take no more memory than 10^5-row ones, and the output
+only depends on the options, so two runs with the same seed are identical.
+
+A fraction of the lines can be corrupted (non-numeric or missing fields,
+bad dates, blank lines) to exercise the jobs' error handling.
+
+Usage: python scripts/generate_weather_data.py --rows 1000000 --stations 50 \
+           --output data/benchmark/weather_1m.csv
+       python scripts/generate_weather_data.py --rows 100000 --malformed-rate 0.01 > sample.csv
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+
+START_YEAR = 1990
+
+# Lines written per buffered write
+CHUNK_SIZE = 10000
+
+# Kinds of corrupted lines, chosen uniformly
+MALFORMED_KINDS = ('text_temperature', 'missing_columns', 'bad_date', 'empty_line')
+
+
+def corrupt_line(line, kind):
+    """
+    Damage a well-formed CSV line
+    
+    Args:
+        line: CSV line without newline
+        kind: One of MALFORMED_KINDS
+        
+    Returns:
+        Corrupted line
+    """
+    parts = line.split(',')
+    
+    if kind == 'text_temperature':
+        parts[1] = 'N/A'
+    elif kind == 'missing_columns':
+        parts = parts[:2]
+    elif kind == 'bad_date':
+        parts[0] = parts[0].replace('-', '/')
+    else:
+        parts = []
+    
+    return ','.join(parts)
+
+
+def generate_lines(rows, stations=1, years=30, start_year=START_YEAR,
+                   malformed_rate=0.0, seed=42):
+    """
+    Stream synthetic CSV lines
+    
+    Rows walk through the days of [start_year, start_year + years), one row
+    per station and day; once every day is used the walk starts over, so
+    row counts beyond stations * days repeat dates.
+    
+    Args:
+        rows: Number of data rows (the header is not counted)
+        stations: Number of stations; with more than one, a station_id
+            column is written
+        years: Number of years the dates span
+        start_year: First year
+        malformed_rate: Fraction of rows written as malformed lines
+        seed: Random seed
+        
+    Yields:
+        CSV lines without newline, header first
+    """
+    rng = random.Random(seed)
+    first_day = date(start_year, 1, 1)
+    days = (date(start_year + years, 1, 1) - first_day).days
+    
+    # Per-station climate: mean level, seasonal amplitude and chance of rain
+    climates = [
+        (rng.uniform(14, 26), rng.uniform(0.5, 4), rng.uniform(0.2, 0.6))
+        for _ in range(stations)
+    ]
+    station_ids = [f"ST{index:05d}" for index in range(stations)]
+    
+    header = 'date,temp_max,temp_min,precipitation'
+    yield header + ',station_id' if stations > 1 else header
+    
+    row = 0
+    while row < rows:
+        for day in range(days):
+            current = first_day + timedelta(days=day)
+            date_str = current.isoformat()
+            season = math.sin(2 * math.pi * current.timetuple().tm_yday / 365.25)
+            
+            for station, (level, amplitude, rain_chance) in enumerate(climates):
+                if row >= rows:
+                    return
+                row += 1
+                
+                temp_mean = level + amplitude * season
+                spread = rng.uniform(6, 13)
+                temp_max = temp_mean + spread / 2 + rng.gauss(0, 1.2)
+                temp_min = temp_mean - spread / 2 + rng.gauss(0, 1.0)
+                precipitation = rng.expovariate(0.15) if rng.random() < rain_chance else 0.0
+                
+                line = f"{date_str},{temp_max:.1f},{temp_min:.1f},{precipitation:.1f}"
+                if stations > 1:
+                    line += ',' + station_ids[station]
+                
+                if malformed_rate and rng.random() < malformed_rate:
+                    line = corrupt_line(line, rng.choice(MALFORMED_KINDS))
+                
+                yield line
+
+
+def write_dataset(output, rows, **options):
+    """
+    Write a synthetic dataset
+    
+    Args:
+        output: File path, or '-' for standard output
+        rows: Number of data rows
+        **options: generate_lines() options
+        
+    Returns:
+        Number of bytes written
+    """
+    if output == '-':
+        f = sys.stdout
+    else:
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        f = open(output, 'w', newline='')
+    
+    written = 0
+    try:
+        chunk = []
+        for line in generate_lines(rows, **options):
+            chunk.append(line + '\n')
+            if len(chunk) >= CHUNK_SIZE:
+                written += f.write(''.join(chunk))
+                chunk = []
+        written += f.write(''.join(chunk))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    
+    return written
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Generate a synthetic weather dataset')
+    parser.add_argument('--rows', type=int, default=100000, help='Data rows (default: 100000)')
+    parser.add_argument('--stations', type=int, default=1,
+                        help='Stations; more than one adds a station_id column (default: 1)')
+    parser.add_argument('--years', type=int, default=30, help='Years spanned (default: 30)')
+    parser.add_argument('--start-year', type=int, default=START_YEAR,
+                        help=f'First year (default: {START_YEAR})')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Fraction of malformed lines (default: 0)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', default='-', help="CSV file to write (default: '-', stdout)")
+    args = parser.parse_args()
+    
+    written = write_dataset(
+        args.output,
+        args.rows,
+        stations=args.stations,
+        years=args.years,
+        start_year=args.start_year,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed
+    )
+    
+    if args.output != '-':
+        print(f" Wrote {args.rows:,} rows ({written / 1e6:.1f} MB) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,25 @@
 """
 Simple MapReduce-style processing of weather data
 Generates the same results as MapReduce jobs without requiring Hadoop
+
+With --cache-dir, results are cached by input content and processing code
+(see src/mapreduce/result_cache.py), so a rerun over unchanged data copies
+the previous outputs instead of recomputing them.
 """
 
+import argparse
 import pandas as pd
 import os
+import sys
+import json
 from collections import defaultdict
+from pathlib import Path
 import math
 
+sys.path.append(str(Path(__file__).parent.parent / "src" / "mapreduce"))
+
+from result_cache import add_cache_arguments, cache_from_args, source_fingerprint
+
 def process_monthly_avg(input_file, output_file):
     """Calculate monthly average temperatures"""
     print("Processing monthly averages...")
@@ -23,7 +35,8 @@ def process_monthly_avg(input_file, output_file):
 
     with open(output_file, 'w') as f:
         for month, row in results.iterrows():
-            f.write(f"{month}\t{row['temp_max']}\t{row['temp_min']}\n")
+            record = {"month": str(month), "avg_max": float(row['temp_max']), "avg_min": float(row['temp_min'])}
+            f.write(json.dumps(record) + "\n")
 
     print(f" Monthly averages saved to {output_file}")
     return results
@@ -55,7 +68,8 @@ def process_extreme_temps(input_file, output_file):
     with open(output_file, 'w') as f:
         for cat, data in categories.items():
             avg_temp = round(data['total_temp'] / data['count'], 2)
-            f.write(f"{cat}\t{data['count']}\t{avg_temp}\n")
+            record = {"category": cat, "count": int(data['count']), "avg_temp": float(avg_temp)}
+            f.write(json.dumps(record) + "\n")
 
     print(f" Extreme temperatures saved to {output_file}")
     return categories
@@ -95,13 +109,42 @@ def process_temp_precipitation(input_file, output_file):
             avg_temp = round(mean_temp, 2)
             avg_precip = round(mean_precip, 2)
 
-            f.write(f"{month}\t{correlation}\t{avg_temp}\t{avg_precip}\t{rainy_days}\t{total_precip}\n")
+            record = {
+                "month": str(month),
+                "correlation": float(correlation),
+                "avg_temp": float(avg_temp),
+                "avg_precip": float(avg_precip),
+                "rainy_days": int(rainy_days),
+                "total_precip": float(total_precip),
+            }
+            f.write(json.dumps(record) + "\n")
 
     print(f" Temperature-precipitation correlation saved to {output_file}")
 
+def run_cached(cache, process, input_file, output_file):
+    """Run a processing function unless the cache holds its output"""
+    if cache is None:
+        process(input_file, output_file)
+        return
+
+    key = cache.key([input_file], process.__name__, source_fingerprint(process))
+    if cache.fetch(key, output_file) is not None:
+        print(f" Cache hit: {output_file} is up to date")
+        return
+
+    process(input_file, output_file)
+    cache.store(key, output_file)
+
 def main():
     """Process all MapReduce jobs"""
-    input_file = "data/raw/medellin_weather_2022-2024.csv"
+    parser = argparse.ArgumentParser(description='Process weather data without Hadoop')
+    parser.add_argument('--input', default="data/raw/medellin_weather_2022-2024.csv",
+                        help='Input CSV (default: data/raw/medellin_weather_2022-2024.csv)')
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    input_file = args.input
+    cache = cache_from_args(args)
 
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found!")
@@ -116,9 +159,9 @@ def main():
     print("")
 
     # Process all jobs
-    process_monthly_avg(input_file, "output/monthly_avg_results.csv")
-    process_extreme_temps(input_file, "output/extreme_temps_results.csv")
-    process_temp_precipitation(input_file, "output/temp_precip_results.csv")
+    run_cached(cache, process_monthly_avg, input_file, "output/monthly_avg.jsonl")
+    run_cached(cache, process_extreme_temps, input_file, "output/extreme_temps.jsonl")
+    run_cached(cache, process_temp_precipitation, input_file, "output/temp_precip.jsonl")
 
     print("")
     print("="*60)
@@ -126,9 +169,13 @@ def main():
     print("="*60)
     print("")
     print("Results location: ./output/")
-    print("  - monthly_avg_results.csv")
-    print("  - extreme_temps_results.csv")
-    print("  - temp_precip_results.csv")
+    print("  - monthly_avg.jsonl")
+    print("  - extreme_temps.jsonl")
+    print("  - temp_precip.jsonl")
+    if cache is not None:
+        stats = cache.stats
+        print(f"Result cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({args.cache_dir})")
     print("")
     print("Next: Start API server to view results")
     print("  Run: source venv/bin/activate && python3 -m src.api.main")
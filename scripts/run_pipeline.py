@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Run the Weatheria pipeline (download -> jobs -> convert -> publish) as a DAG
+
+Each stage runs as soon as the stages it depends on have finished, so the
+analysis jobs, which only need the downloaded data, run concurrently, and
+each result is published to the API results directory as soon as its own
+job is done instead of after the slowest one. Results are renamed into
+place, so the API never reads a partial file.
+
+Jobs run with one of:
+    local   the multiprocess local engine (src/mapreduce/local_engine.py)
+    hadoop  mrjob's local runner, a single-machine Hadoop stand-in that runs
+            the job scripts as Hadoop Streaming would
+    simple  the pandas implementations of scripts/process_data_simple.py
+            (monthly_avg, extreme_temps and temp_precip only)
+
+Concurrent local engine jobs share --processes (default: all cores)
+between them, and their worker pools are started with the forkserver
+method, as forking the pipeline's threads could deadlock them.
+
+Per-stage timings are printed and saved to <work-dir>/pipeline_report.json.
+
+Usage: python scripts/run_pipeline.py
+       python scripts/run_pipeline.py --runner hadoop --jobs monthly_avg extreme_temps
+       python scripts/run_pipeline.py --download --start-date 2022-01-01 --end-date 2024-12-31
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# The jobs import their shared modules by name, as they do on Hadoop
+sys.path.append(str(ROOT / 'src' / 'mapreduce'))
+sys.path.append(str(Path(__file__).parent))
+
+from convert_hadoop_output import RESULT_FIELDS, convert
+from local_engine import JOBS, run_local
+from result_cache import add_cache_arguments, cache_from_args
+
+DEFAULT_INPUT = os.path.join('data', 'raw', 'medellin_weather_2022-2024.csv')
+
+# Results served by the API, in the order they are listed
+API_RESULTS = list(RESULT_FIELDS)
+
+
+class Stage(object):
+    """
+    One step of the pipeline
+    
+    Args:
+        name: Unique stage name (e.g. "job:monthly_avg")
+        function: Callable run without arguments; its return value is kept
+            in the report when JSON-serializable
+        depends_on: Names of the stages that must succeed first
+    """
+    
+    def __init__(self, name, function, depends_on=()):
+        self.name = name
+        self.function = function
+        self.depends_on = list(depends_on)
+
+
+def run_dag(stages, max_workers=None):
+    """
+    Run stages in dependency order, independent stages concurrently
+    
+    A failed stage does not stop the others; stages that depend on it,
+    directly or not, are skipped.
+    
+    Args:
+        stages: List of Stage
+        max_workers: Stages running at once (default: all ready stages)
+        
+    Returns:
+        Dictionary stage name -> {"status": "ok" | "failed" | "skipped",
+        "start", "end", "seconds" (relative to the pipeline start),
+        "result" or "error"}
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"{stage.name}: unknown dependency {dependency}")
+    
+    report = {}
+    pending = list(stages)
+    running = {}
+    origin = time.perf_counter()
+    
+    def timed(stage):
+        start = time.perf_counter()
+        try:
+            return stage.function(), start, time.perf_counter()
+        except Exception as e:
+            e.timing = (start, time.perf_counter())
+            raise
+    
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as pool:
+        while pending or running:
+            # Skip stages downstream of failures, start the ready ones
+            for stage in list(pending):
+                states = [report.get(dependency, {}).get('status') for dependency in stage.depends_on]
+                if any(state in ('failed', 'skipped') for state in states):
+                    report[stage.name] = {'status': 'skipped'}
+                    pending.remove(stage)
+                elif all(state == 'ok' for state in states):
+                    running[pool.submit(timed, stage)] = stage
+                    pending.remove(stage)
+            
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle among: {', '.join(s.name for s in pending)}")
+                break
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    result, start, end = future.result()
+                    entry = {'status': 'ok'}
+                    try:
+                        json.dumps(result)
+                        entry['result'] = result
+                    except TypeError:
+                        pass
+                except Exception as e:
+                    start, end = getattr(e, 'timing', (origin, time.perf_counter()))
+                    entry = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+                
+                entry.update({
+                    'start': round(start - origin, 3),
+                    'end': round(end - origin, 3),
+                    'seconds': round(end - start, 3),
+                })
+                report[stage.name] = entry
+    
+    return report
+
+
+def publish_file(source, results_dir):
+    """
+    Copy a result file into the results directory atomically
+    
+    Args:
+        source: Result file
+        results_dir: API results directory
+        
+    Returns:
+        Published path
+    """
+    destination = os.path.join(results_dir, os.path.basename(source))
+    tmp_path = os.path.join(results_dir, f".{os.path.basename(source)}.tmp")
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+    return destination
+
+
+def job_stage(name, runner, input_path, work_dir, processes=None, cache=None):
+    """
+    Callable running one analysis job
+    
+    Args:
+        name: Result / job registry name
+        runner: 'local', 'hadoop' or 'simple'
+        input_path: Input CSV
+        work_dir: Pipeline working directory
+        processes: Worker processes of this local engine job
+        cache: ResultCache for the local engine
+        
+    Returns:
+        Function returning the job's run summary
+    """
+    output_dir = os.path.join(work_dir, 'hadoop', name)
+    
+    def run_local_job():
+        # Stages run on threads: start the workers without forking them
+        summary = run_local(name, [input_path], output_dir, processes=processes, cache=cache,
+                            mp_context=multiprocessing.get_context('forkserver'))
+        return {field: summary[field] for field in
+                ('processes', 'map_tasks', 'input_lines', 'map_seconds', 'reduce_seconds',
+                 'cache')
+                if field in summary}
+    
+    def run_hadoop_job():
+        module, _ = JOBS[name].split('.')
+        script = ROOT / 'src' / 'mapreduce' / f'{module}.py'
+        command = [sys.executable, str(script), '-r', 'local', '--no-conf',
+                   '--output-dir', output_dir, '--no-output', input_path]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{script.name} failed: {completed.stderr.strip()[-2000:]}")
+        return {'output_dir': output_dir}
+    
+    def run_simple_job():
+        import process_data_simple
+        
+        process = {
+            'monthly_avg': process_data_simple.process_monthly_avg,
+            'extreme_temps': process_data_simple.process_extreme_temps,
+            'temp_precip': process_data_simple.process_temp_precipitation,
+        }[name]
+        os.makedirs(os.path.join(work_dir, 'results'), exist_ok=True)
+        process(input_path, os.path.join(work_dir, 'results', f'{name}.jsonl'))
+        return {'output_file': os.path.join(work_dir, 'results', f'{name}.jsonl')}
+    
+    return {'local': run_local_job, 'hadoop': run_hadoop_job, 'simple': run_simple_job}[runner]
+
+
+def job_processes(args):
+    """
+    Worker processes of each local engine job
+    
+    The jobs run concurrently, so --processes (default: all cores) is split
+    between as many of them as can run at once.
+    
+    Args:
+        args: Parsed arguments
+        
+    Returns:
+        Worker processes per job (at least 1)
+    """
+    total = args.processes or os.cpu_count() or 1
+    concurrent_jobs = min(len(args.jobs), args.max_parallel or len(args.jobs)) or 1
+    return max(1, total // concurrent_jobs)
+
+
+def build_stages(args):
+    """
+    Pipeline stages for the command line options
+    
+    Args:
+        args: Parsed arguments
+        
+    Returns:
+        List of Stage
+    """
+    cache = cache_from_args(args)
+    stages = []
+    job_dependencies = []
+    
+    if args.download or not os.path.exists(args.input):
+        def download():
+            from download_data import download_medellin_weather
+            download_medellin_weather(args.start_date, args.end_date, args.input)
+            return {'input': args.input}
+        
+        stages.append(Stage('download', download))
+        job_dependencies = ['download']
+    
+    os.makedirs(args.results_dir, exist_ok=True)
+    processes = job_processes(args)
+    
+    for name in args.jobs:
+        stages.append(Stage(
+            f'job:{name}',
+            job_stage(name, args.runner, args.input, args.work_dir, processes, cache),
+            job_dependencies
+        ))
+        
+        if args.runner == 'simple':
+            def publish(name=name):
+                source = os.path.join(args.work_dir, 'results', f'{name}.jsonl')
+                return {'published': publish_file(source, args.results_dir)}
+        else:
+            def publish(name=name):
+                records = convert(name, os.path.join(args.work_dir, 'hadoop'), args.results_dir)
+                if records is None:
+                    raise FileNotFoundError(f"No part files for {name}")
+                return {'records': records}
+        
+        stages.append(Stage(f'publish:{name}', publish, [f'job:{name}']))
+    
+    return stages
+
+
+def print_report(report, total_seconds):
+    """Print per-stage status and timings"""
+    print(f"\n{'stage':<26}{'status':<9}{'start':>8}{'seconds':>9}")
+    for name, entry in sorted(report.items(), key=lambda item: item[1].get('start', float('inf'))):
+        start = f"{entry['start']:.2f}" if 'start' in entry else '-'
+        seconds = f"{entry['seconds']:.2f}" if 'seconds' in entry else '-'
+        print(f"{name:<26}{entry['status']:<9}{start:>8}{seconds:>9}")
+        if entry['status'] == 'failed':
+            print(f"    {entry['error']}")
+    print(f"\n Total: {total_seconds:.2f}s")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Run the Weatheria pipeline as a DAG')
+    parser.add_argument('--input', default=DEFAULT_INPUT,
+                        help=f'Input CSV, downloaded when missing (default: {DEFAULT_INPUT})')
+    parser.add_argument('--download', action='store_true',
+                        help='Download the input even if it exists')
+    parser.add_argument('--start-date', default='2022-01-01', help='Download start date')
+    parser.add_argument('--end-date', default='2024-12-31', help='Download end date')
+    parser.add_argument('--runner', choices=['local', 'hadoop', 'simple'], default='local',
+                        help='How to run the jobs (default: local)')
+    parser.add_argument('--jobs', nargs='+', default=None, choices=API_RESULTS,
+                        help='Results to build (default: all the API serves; with '
+                             '--runner simple, the three it implements)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Worker processes shared by the concurrent local engine '
+                             'jobs (default: all cores)')
+    parser.add_argument('--max-parallel', type=int, default=None,
+                        help='Stages running at once (default: unlimited)')
+    parser.add_argument('--work-dir', default=os.path.join('output', 'pipeline'),
+                        help='Directory for intermediate outputs (default: output/pipeline)')
+    parser.add_argument('--results-dir', default=os.environ.get('RESULTS_DIR', 'output'),
+                        help='API results directory (default: $RESULTS_DIR or output)')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    if args.jobs is None:
+        args.jobs = (['monthly_avg', 'extreme_temps', 'temp_precip']
+                     if args.runner == 'simple' else API_RESULTS)
+    elif args.runner == 'simple':
+        unsupported = set(args.jobs) - {'monthly_avg', 'extreme_temps', 'temp_precip'}
+        if unsupported:
+            parser.error(f"--runner simple cannot build: {', '.join(sorted(unsupported))}")
+    
+    print("=" * 60)
+    print("Weatheria - Pipeline")
+    print("=" * 60)
+    print(f" Input: {args.input}")
+    print(f" Runner: {args.runner}")
+    print(f" Results: {args.results_dir}")
+    
+    start = time.perf_counter()
+    report = run_dag(build_stages(args), max_workers=args.max_parallel)
+    total_seconds = time.perf_counter() - start
+    
+    print_report(report, total_seconds)
+    
+    os.makedirs(args.work_dir, exist_ok=True)
+    report_path = os.path.join(args.work_dir, 'pipeline_report.json')
+    with open(report_path, 'w') as f:
+        json.dump({'runner': args.runner, 'total_seconds': round(total_seconds, 3),
+                   'stages': report}, f, indent=2)
+    print(f" Report saved to: {report_path}")
+    
+    if any(entry['status'] != 'ok' for entry in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
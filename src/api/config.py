@@ -20,6 +20,16 @@ class Settings(BaseSettings):
     # Results directory (can be overridden with env var RESULTS_DIR)
     results_dir: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "output")
     
+    # Parsed results cache: entries kept, and seconds a result is served
+    # before its file (mtime/size) or S3 ETags are checked again
+    results_cache_size: int = 32
+    results_cache_ttl: float = 5.0
+    
+    # Threads for blocking result reads (local files, S3), and for
+    # concurrent part file downloads of one S3 result
+    io_threads: int = 8
+    s3_workers: int = 16
+    
     # CORS
     cors_origins: list = ["*"]
     
@@ -28,10 +38,12 @@ class Settings(BaseSettings):
     s3_bucket: str = "weatheria-climate-data"
     aws_region: str = "us-east-1"
     
-    # File names
-    monthly_avg_file: str = "monthly_avg_fixed.csv"
-    extreme_temps_file: str = "extreme_temps_fixed.csv"
-    temp_precip_file: str = "temp_precip_fixed.csv"
+    # File names (MapReduce results, one JSON record per line)
+    monthly_avg_file: str = "monthly_avg.jsonl"
+    extreme_temps_file: str = "extreme_temps.jsonl"
+    temp_precip_file: str = "temp_precip.jsonl"
+    temp_quantiles_file: str = "temp_quantiles.jsonl"
+    temp_histograms_file: str = "temp_histograms.jsonl"
     
     class Config:
         env_file = ".env"
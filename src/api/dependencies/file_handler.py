@@ -5,10 +5,180 @@ Dependency injection functions
 import os
 import pandas as pd
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import HTTPException
 from ..config import settings
+from . import s3_mirror
+import asyncio
+import functools
 import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Optional
+
+
+# Fields only present in some results (multi-station runs)
+OPTIONAL_COLUMNS = ('station_id',)
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsCache:
+    """
+    Process-level LRU cache of parsed results, validated against their source
+    
+    An entry is served from memory, without any I/O, for ttl seconds after
+    it was loaded or last validated. After that its source's version (mtime
+    and size of a local file, ETags of the S3 part files) is read again: an
+    unchanged source renews the entry, a changed one is reloaded. The least
+    recently used entries are evicted beyond max_entries.
+    
+    Args:
+        max_entries: Maximum number of cached results
+        ttl: Seconds an entry is served without checking its source
+    """
+    
+    def __init__(self, max_entries: int = 32, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.revalidated = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def get(self, key: Hashable, version_of: Callable, load: Callable):
+        """
+        Return a cached result, loading it when missing or stale
+        
+        Args:
+            key: Cache key (source and requested columns)
+            version_of: Returns the source's current version; may raise
+                HTTPException when the source is gone
+            load: Called with the version to read and parse the source
+            
+        Returns:
+            The cached value, shared with other requests
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry['checked'] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry['value']
+        
+        version = version_of()
+        
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry['version'] == version:
+                entry['checked'] = time.monotonic()
+                self.entries.move_to_end(key)
+                self.revalidated += 1
+                return entry['value']
+        
+        # Parse outside the lock so other results are still served meanwhile
+        value = load(version)
+        
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = {'version': version, 'value': value, 'checked': time.monotonic()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        
+        return value
+    
+    def stats(self) -> dict:
+        """
+        Cache counters
+        
+        Returns:
+            Dictionary with hits (no I/O), revalidated (source checked but
+            not re-read), misses (read and parsed), evictions, entries,
+            hit_rate (share of requests served without I/O) and
+            revalidated_rate (share of requests that only checked the source)
+        """
+        with self.lock:
+            requests = self.hits + self.revalidated + self.misses
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "revalidated_rate": self.revalidated / requests if requests else 0.0,
+            }
+
+
+results_cache = ResultsCache(settings.results_cache_size, settings.results_cache_ttl)
+
+# Bounded pool for blocking result reads (local files, S3), so a slow read
+# never stalls the event loop serving every other request
+io_executor = ThreadPoolExecutor(max_workers=settings.io_threads, thread_name_prefix='results-io')
+
+
+async def run_blocking(function: Callable, *args, **kwargs):
+    """
+    Run a blocking data access call on the I/O thread pool
+    
+    Async endpoints await this instead of calling load_csv_data() and
+    friends directly; at most settings.io_threads reads run at once.
+    
+    Args:
+        function: Blocking callable
+        *args: Positional arguments for function
+        **kwargs: Keyword arguments for function
+        
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(function, *args, **kwargs))
+
+
+# Part file downloads of one S3 result run concurrently on their own pool
+# (loads themselves run on io_executor, so sharing it could deadlock)
+s3_executor = ThreadPoolExecutor(max_workers=settings.s3_workers, thread_name_prefix='results-s3')
+
+# One S3 client per region, shared by all requests (boto3 clients are
+# thread-safe and keep their HTTP connections pooled)
+s3_clients = {}
+s3_clients_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Shared S3 client for settings.aws_region
+    
+    Its connection pool holds one connection per download worker.
+    
+    Returns:
+        boto3 S3 client
+    """
+    with s3_clients_lock:
+        client = s3_clients.get(settings.aws_region)
+        if client is None:
+            client = boto3.client(
+                's3',
+                region_name=settings.aws_region,
+                config=Config(max_pool_connections=max(settings.s3_workers, 10))
+            )
+            s3_clients[settings.aws_region] = client
+        return client
 
 
 def get_results_file_path(filename: str) -> str:
@@ -35,86 +205,177 @@ def get_results_file_path(filename: str) -> str:
     return file_path
 
 
-def load_csv_from_s3(s3_prefix: str, column_names: list) -> pd.DataFrame:
+def read_results(source, column_names: list) -> pd.DataFrame:
     """
-    Load CSV data from S3 MapReduce output (combines all part files)
+    Parse MapReduce results written as JSON lines with named fields
+    
+    Optional fields such as station_id are returned as None for records
+    (or whole single-station files) that do not have them.
     
     Args:
-        s3_prefix: S3 prefix/folder containing MapReduce output parts
-        column_names: List of column names for the DataFrame
+        source: Path or file-like object with one JSON record per line
+        column_names: Fields to return, in order
         
     Returns:
-        DataFrame with the data
+        DataFrame with the requested columns
+    """
+    df = pd.read_json(
+        source,
+        lines=True,
+        dtype=False,
+        convert_dates=False,
+        precise_float=True
+    )
+    
+    if df.empty:
+        return pd.DataFrame(columns=column_names)
+    
+    for name in OPTIONAL_COLUMNS:
+        if name not in column_names:
+            continue
+        if name not in df.columns:
+            df[name] = None
+        else:
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    
+    return df[column_names]
+
+
+def filter_station(df: pd.DataFrame, station_id: Optional[str]) -> pd.DataFrame:
+    """
+    Restrict results to a single station
+    
+    Args:
+        df: Results with a station_id column
+        station_id: Station to keep, or None to keep every station
+        
+    Returns:
+        Filtered DataFrame
         
     Raises:
-        HTTPException: If files cannot be loaded from S3
+        HTTPException: If the station has no results
     """
-    try:
-        s3_client = boto3.client('s3', region_name=settings.aws_region)
-        
-        # List all part files in the S3 prefix
-        response = s3_client.list_objects_v2(
-            Bucket=settings.s3_bucket,
-            Prefix=s3_prefix
+    if station_id is None:
+        return df
+    
+    df = df[df['station_id'] == station_id]
+    if df.empty:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No results for station: {station_id}"
         )
+    return df
+
+
+def list_s3_parts(s3_client, s3_prefix: str) -> tuple:
+    """
+    List the part files of a MapReduce output on S3
+    
+    Every page of the listing is read, so outputs with more than 1000
+    objects are complete.
+    
+    Args:
+        s3_client: boto3 S3 client
+        s3_prefix: S3 prefix/folder containing MapReduce output parts
         
-        if 'Contents' not in response:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No files found in S3 at: {s3_prefix}"
-            )
-        
-        # Filter for part files (exclude _SUCCESS and directory markers)
-        part_files = [
-            obj['Key'] for obj in response['Contents']
-            if 'part-' in obj['Key'] and obj['Size'] > 0
-        ]
+    Returns:
+        Sorted tuple of (key, ETag) pairs, which changes whenever any
+        part file is rewritten
         
-        if not part_files:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No part files found in S3 at: {s3_prefix}"
-            )
+    Raises:
+        HTTPException: If the prefix has no part files
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    objects = [
+        obj
+        for page in paginator.paginate(Bucket=settings.s3_bucket, Prefix=s3_prefix)
+        for obj in page.get('Contents', [])
+    ]
+    
+    if not objects:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No files found in S3 at: {s3_prefix}"
+        )
+    
+    # Filter for part files (exclude _SUCCESS and directory markers)
+    part_files = [
+        (obj['Key'], obj['ETag']) for obj in objects
+        if 'part-' in obj['Key'] and obj['Size'] > 0
+    ]
+    
+    if not part_files:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No part files found in S3 at: {s3_prefix}"
+        )
+    
+    return tuple(sorted(part_files))
+
+
+def load_csv_from_s3(s3_prefix: str, column_names: list, build: Optional[Callable] = None):
+    """
+    Load results from S3 MapReduce output (combines all part files)
+    
+    Part files are downloaded and parsed concurrently (settings.s3_workers
+    at a time) and concatenated once, so a large output loads in about the
+    time of its slowest part. Parsed results are cached and revalidated
+    against the part files' ETags.
+    
+    Downloaded parts are kept in a local mirror (see s3_mirror); parts whose
+    ETag is unchanged are read from it instead of downloaded again. When S3
+    cannot be reached, the mirrored copy of the output is served.
+    
+    Args:
+        s3_prefix: S3 prefix/folder containing MapReduce output parts
+        column_names: List of column names for the DataFrame
+        build: Optional callable turning the DataFrame into the cached value
         
-        # Download and combine all part files
-        dfs = []
-        for part_file in sorted(part_files):
-            obj = s3_client.get_object(Bucket=settings.s3_bucket, Key=part_file)
-            content = obj['Body'].read().decode('utf-8')
-            
-            # Read tab-separated values (MapReduce output format)
-            # Note: Hadoop output has quoted strings and embedded tabs
-            df_part = pd.read_csv(
-                io.StringIO(content),
-                sep='\t',
-                header=None,
-                quotechar='"',
-                skipinitialspace=True
-            )
-            
-            # Handle cases where multiple values are in a single column (from Hadoop reducer)
-            # Example: "2022-01"\t"24.75\t14.52" where second column has embedded tab
-            if len(df_part.columns) == 2 and len(column_names) > 2:
-                # Split the second column - note that Hadoop outputs literal \t not actual tabs
-                split_cols = df_part.iloc[:, 1].str.replace('\\t', '\t').str.split('\t', expand=True)
-                
-                # Create DataFrame with proper column names
-                data = {column_names[0]: df_part.iloc[:, 0].str.strip('"')}
-                for i, col_name in enumerate(column_names[1:]):
-                    data[col_name] = pd.to_numeric(split_cols[i], errors='coerce')
-                
-                df_part = pd.DataFrame(data)
-            else:
-                # Assign column names if dimensions match
-                df_part.columns = column_names
-            
-            dfs.append(df_part)
+    Returns:
+        Cached DataFrame (or build() result), shared with other requests
         
-        # Combine all parts
-        df = pd.concat(dfs, ignore_index=True)
+    Raises:
+        HTTPException: If files cannot be loaded from S3
+    """
+    def version_of():
+        try:
+            return 's3', list_s3_parts(get_s3_client(), s3_prefix)
+        except (BotoCoreError, ClientError) as e:
+            try:
+                parts = s3_mirror.mirrored_parts(s3_prefix)
+            except HTTPException:
+                raise e
+            logger.warning("S3 unreachable (%s); serving mirrored copy of %s", e, s3_prefix)
+            return 'mirror', parts
+    
+    def load_part(part_file, manifest):
+        key, etag = part_file
+        data = s3_mirror.read_part(key, etag, manifest)
+        if data is None:
+            obj = get_s3_client().get_object(Bucket=settings.s3_bucket, Key=key)
+            data = obj['Body'].read()
+            s3_mirror.write_part(key, data)
+            # The object may have been replaced since it was listed
+            etag = obj.get('ETag', etag)
+        return (key, etag), read_results(io.BytesIO(data), column_names)
+    
+    def load(version):
+        source, part_files = version
+        manifest = s3_mirror.read_manifest(s3_prefix)
+        loaded = list(s3_executor.map(lambda part_file: load_part(part_file, manifest), part_files))
+        if source == 's3':
+            s3_mirror.save_manifest(s3_prefix, [part_file for part_file, _ in loaded])
         
-        return df
+        frames = [frame for _, frame in loaded if not frame.empty]
+        df = (pd.concat(frames, ignore_index=True) if frames
+              else pd.DataFrame(columns=column_names))
+        return build(df) if build else df
+    
+    try:
+        return results_cache.get(('s3', s3_prefix, tuple(column_names), build), version_of, load)
         
+    except HTTPException:
+        raise
     except ClientError as e:
         import traceback
         error_detail = f"S3 access error: {str(e)}\n{traceback.format_exc()}"
@@ -122,13 +383,6 @@ def load_csv_from_s3(s3_prefix: str, column_names: list) -> pd.DataFrame:
             status_code=500,
             detail=error_detail
         )
-    except pd.errors.EmptyDataError as e:
-        import traceback
-        error_detail = f"Results files are empty at: {s3_prefix}\n{traceback.format_exc()}"
-        raise HTTPException(
-            status_code=500,
-            detail=error_detail
-        )
     except Exception as e:
         import traceback
         error_detail = f"Error loading results from S3: {str(e)}\nTraceback:\n{traceback.format_exc()}"
@@ -140,14 +394,40 @@ def load_csv_from_s3(s3_prefix: str, column_names: list) -> pd.DataFrame:
 
 def load_csv_data(filename: str, column_names: list) -> pd.DataFrame:
     """
-    Load CSV data from results file (tries S3 first, then local)
+    Load results data (tries S3 first, then local)
+    
+    Results are JSON lines with named, typed fields, so they are parsed
+    with a single vectorized read and no per-column string handling.
     
     Args:
         filename: Name of the results file or S3 prefix
         column_names: List of column names for the DataFrame
         
     Returns:
-        DataFrame with the data
+        DataFrame with the data, safe for the caller to modify
+        
+    Raises:
+        HTTPException: If file cannot be loaded
+    """
+    return load_results(filename, column_names).copy()
+
+
+def load_results(filename: str, column_names: list, build: Optional[Callable] = None):
+    """
+    Load cached results data (tries S3 first, then local)
+    
+    Parsed results are cached (see ResultsCache) and revalidated against
+    the local file's modification time and size or the S3 ETags.
+    
+    Args:
+        filename: Name of the results file or S3 prefix
+        column_names: List of column names for the DataFrame
+        build: Optional callable turning the DataFrame into the cached
+            value (e.g. a typed results store), rebuilt only when the
+            source changes
+        
+    Returns:
+        Cached DataFrame (or build() result), shared with other requests
         
     Raises:
         HTTPException: If file cannot be loaded
@@ -158,55 +438,36 @@ def load_csv_data(filename: str, column_names: list) -> pd.DataFrame:
         s3_prefix_map = {
             settings.monthly_avg_file: "output/monthly_avg/",
             settings.extreme_temps_file: "output/extreme_temps/",
-            settings.temp_precip_file: "output/temp_precip/"
+            settings.temp_precip_file: "output/temp_precip/",
+            settings.temp_quantiles_file: "output/temp_quantiles/",
+            settings.temp_histograms_file: "output/temp_histograms/"
         }
         
         s3_prefix = s3_prefix_map.get(filename)
         if s3_prefix:
             try:
-                return load_csv_from_s3(s3_prefix, column_names)
-            except HTTPException:
-                # If S3 fails, fall back to local files
-                pass
+                return load_csv_from_s3(s3_prefix, column_names, build)
+            except HTTPException as e:
+                # Neither S3 nor its mirror has the output: use local files
+                logger.warning("S3 results unavailable for %s (%s); using local file",
+                               s3_prefix, str(e.detail).splitlines()[0])
     
     # Fall back to local file loading
+    def version_of():
+        stat = os.stat(get_results_file_path(filename))
+        return stat.st_mtime_ns, stat.st_size
+    
+    def load(version):
+        df = read_results(os.path.join(settings.results_dir, filename), column_names)
+        return build(df) if build else df
+    
     try:
-        file_path = get_results_file_path(filename)
-        
-        # Read tab-separated values (MapReduce output format)
-        df = pd.read_csv(
-            file_path, 
-            sep='\t', 
-            header=None,
-            quotechar='"',
-            skipinitialspace=True
+        return results_cache.get(
+            ('local', settings.results_dir, filename, tuple(column_names), build), version_of, load
         )
         
-        # Handle cases where multiple values are in a single column (from Hadoop reducer)
-        if len(df.columns) == 2 and len(column_names) > 2:
-            # Split the second column - note that Hadoop outputs literal \t not actual tabs
-            split_cols = df.iloc[:, 1].str.replace('\\t', '\t').str.split('\t', expand=True)
-            
-            # Create DataFrame with proper column names
-            data = {column_names[0]: df.iloc[:, 0].str.strip('"')}
-            # split_cols has indices 0, 1, 2... for the values from the second column
-            for i, col_name in enumerate(column_names[1:]):
-                data[col_name] = pd.to_numeric(split_cols[i], errors='coerce')
-            
-            df = pd.DataFrame(data)
-        else:
-            # Assign column names if dimensions match
-            df.columns = column_names
-        
-        return df
-        
-    except pd.errors.EmptyDataError as e:
-        import traceback
-        error_detail = f"Results file is empty: {filename}\n{traceback.format_exc()}"
-        raise HTTPException(
-            status_code=500,
-            detail=error_detail
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_detail = f"Error loading results: {str(e)}\nTraceback:\n{traceback.format_exc()}"
@@ -0,0 +1,81 @@
+"""
+Threshold queries against stored temperature histograms
+
+The temperature histograms job stores, per variable, dense per-bin day
+counts and sums of average temperature ("counts", "sum_avg_temp") starting
+at "min_bin", at a fixed resolution. Prefix sums over the bins are built
+once in O(bins); any threshold range is then answered with two lookups.
+"""
+
+import math
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class CumulativeHistogram:
+    """
+    Cumulative view of one or more histograms of the same variable
+    
+    Histograms of several stations are pooled bin by bin.
+    
+    Args:
+        records: Histogram records written by the temperature histograms job
+    """
+    
+    def __init__(self, records: Iterable[dict]):
+        records = list(records)
+        self.bins_per_degree = round(1 / records[0]["resolution"])
+        self.min_bin = min(record["min_bin"] for record in records)
+        self.max_bin = max(record["min_bin"] + len(record["counts"]) - 1 for record in records)
+        
+        size = self.max_bin - self.min_bin + 1
+        counts = np.zeros(size)
+        sums = np.zeros(size)
+        for record in records:
+            start = record["min_bin"] - self.min_bin
+            end = start + len(record["counts"])
+            counts[start:end] += record["counts"]
+            sums[start:end] += record["sum_avg_temp"]
+        
+        # Entry i holds the totals of the bins before bin min_bin + i
+        self.cumulative_counts = np.concatenate([[0], np.cumsum(counts)])
+        self.cumulative_sums = np.concatenate([[0.0], np.cumsum(sums)])
+    
+    @property
+    def total(self) -> int:
+        """Number of days in the histogram"""
+        return int(self.cumulative_counts[-1])
+    
+    def range_stats(self, above: Optional[float] = None,
+                    below: Optional[float] = None) -> Tuple[int, Optional[float]]:
+        """
+        Days strictly above and/or strictly below a threshold
+        
+        Thresholds are resolved at the histogram resolution (0.1 °C), which
+        is exact for readings reported to one decimal.
+        
+        Args:
+            above: Keep days with the variable > above
+            below: Keep days with the variable < below
+            
+        Returns:
+            Tuple (day count, mean average temperature of those days or None)
+        """
+        low = self.min_bin
+        high = self.max_bin
+        
+        if above is not None:
+            low = max(low, math.floor(round(above * self.bins_per_degree, 6)) + 1)
+        if below is not None:
+            high = min(high, math.ceil(round(below * self.bins_per_degree, 6)) - 1)
+        
+        if high < low:
+            return 0, None
+        
+        start = low - self.min_bin
+        end = high - self.min_bin + 1
+        count = int(self.cumulative_counts[end] - self.cumulative_counts[start])
+        total = float(self.cumulative_sums[end] - self.cumulative_sums[start])
+        
+        return count, (total / count if count else None)
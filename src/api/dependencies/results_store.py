@@ -0,0 +1,441 @@
+"""
+Typed, precomputed views of the results
+
+The monthly averages and temperature-precipitation results are loaded once
+(at startup, and again only when their file changes) into compact typed
+columns: categorical station and month keys, float32 measures. Everything
+the fixed-answer endpoints return (hottest, coolest, wettest and driest
+month, the overall statistics, the correlation interpretations and the
+row listings) is computed at load time for every station and for all
+stations pooled and kept as row positions, so a request is a lookup plus
+building its response rows from the columns. No per-row dictionaries are
+kept.
+
+The float32 values convert back to the values of the result files (see
+TypedResults.record()) and the /stats aggregates are computed from the
+parsed float64 values, so answers are identical to computing them per
+request.
+
+The t-digest sketches and temperature histograms are likewise turned into
+query views (DigestQuantiles, CumulativeHistogram prefix sums) once per
+version of their file, so percentile and threshold requests only evaluate
+them.
+"""
+
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+from ..config import settings
+from .file_handler import load_results
+from .histograms import CumulativeHistogram
+from .sketches import DigestQuantiles
+
+
+MONTHLY_COLUMNS = ['station_id', 'month', 'avg_max', 'avg_min']
+TEMP_PRECIP_COLUMNS = [
+    'station_id', 'month', 'correlation', 'avg_temp', 'avg_precip', 'rainy_days', 'total_precip'
+]
+TEMPERATURE_VARIABLES = ('temp_max', 'temp_min', 'avg_temp')
+QUANTILE_COLUMNS = ['station_id', 'month', 'count', *TEMPERATURE_VARIABLES]
+HISTOGRAM_COLUMNS = ['station_id', 'variable', 'resolution', 'min_bin', 'counts', 'sum_avg_temp']
+
+
+def interpret_correlation(corr: float) -> str:
+    """
+    Interpret a correlation coefficient
+    
+    Args:
+        corr: Pearson correlation coefficient
+        
+    Returns:
+        Strength and direction, e.g. "moderate negative"
+    """
+    abs_corr = abs(corr)
+    if abs_corr >= 0.7:
+        strength = "strong"
+    elif abs_corr >= 0.4:
+        strength = "moderate"
+    elif abs_corr >= 0.2:
+        strength = "weak"
+    else:
+        strength = "very weak"
+    
+    direction = "negative" if corr < 0 else "positive"
+    return f"{strength} {direction}"
+
+
+class TypedResults:
+    """
+    Compact typed table of one result file with per-station answers
+    
+    Rows are only kept as columns: categorical station and month keys,
+    float32 measures and int32 counts. Answers are computed at load time
+    and stored as row positions (or small aggregates); response records
+    are built from the typed columns when they are requested.
+    
+    Subclasses compute their answers for a selection of rows in
+    summarize(), and name in row_formats the method building the response
+    rows of an answer (record() by default).
+    
+    Args:
+        df: Parsed results from read_results()
+    """
+    
+    row_formats = {}
+    
+    def __init__(self, df: pd.DataFrame):
+        df = df.reset_index(drop=True)
+        
+        self.columns = list(df.columns)
+        self.station = pd.Categorical(df['station_id'])
+        self.month = pd.Categorical(df['month'])
+        self.values = {
+            column: df[column].to_numpy(
+                dtype=np.int32 if pd.api.types.is_integer_dtype(df[column]) else np.float32)
+            for column in self.columns if column not in ('station_id', 'month')
+        }
+        
+        # Single-station files have no station codes (all -1)
+        selections = {None: np.arange(len(df))}
+        for code, station_id in enumerate(self.station.categories):
+            selections[station_id] = np.flatnonzero(self.station.codes == code)
+        
+        self.answers = {
+            station_id: self.summarize(df, rows) for station_id, rows in selections.items()
+        }
+    
+    def record(self, row: int) -> dict:
+        """
+        Response record of a row, built from the typed columns
+        
+        float32 values are converted through their shortest repr, which
+        gives back the parsed value exactly for results written with up to
+        six significant digits (the jobs round to 2-4 decimals).
+        
+        Args:
+            row: Row position
+            
+        Returns:
+            Dictionary column -> value, as DataFrame.to_dict('records')
+        """
+        record = {}
+        for column in self.columns:
+            if column in ('station_id', 'month'):
+                keys = self.station if column == 'station_id' else self.month
+                code = keys.codes[row]
+                record[column] = keys.categories[code] if code >= 0 else None
+            else:
+                value = self.values[column][row]
+                record[column] = int(value) if value.dtype.kind == 'i' else float(str(value))
+        return record
+    
+    def summarize(self, df: pd.DataFrame, rows: np.ndarray) -> dict:
+        """
+        Compute every answer for a selection of rows
+        
+        Args:
+            df: Parsed results (float64)
+            rows: Row positions of the selection
+            
+        Returns:
+            Dictionary answer name -> row positions (array), row position
+            (int), None or response
+        """
+        return {"rows": rows}
+    
+    def pick(self, column: str, rows: np.ndarray, largest: bool) -> Optional[int]:
+        """
+        Row with the largest or smallest value of a column
+        
+        Ties go to the first row, as with DataFrame.idxmax().
+        
+        Args:
+            column: Measure column
+            rows: Row positions to choose from
+            largest: True for the maximum, False for the minimum
+            
+        Returns:
+            Row position, or None for an empty selection
+        """
+        if len(rows) == 0:
+            return None
+        values = self.values[column][rows]
+        position = np.nanargmax(values) if largest else np.nanargmin(values)
+        return int(rows[position])
+    
+    def answer(self, name: str, station_id: Optional[str] = None):
+        """
+        Look up a precomputed answer
+        
+        Args:
+            name: Answer name
+            station_id: Station, or None for all stations
+            
+        Returns:
+            Response, with rows built from the typed columns
+            
+        Raises:
+            HTTPException: If the station or the answer is not available
+        """
+        answers = self.answers.get(station_id)
+        if answers is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No results for station: {station_id}"
+            )
+        
+        value = answers[name]
+        if value is None:
+            raise HTTPException(
+                status_code=404,
+                detail="No results available"
+            )
+        
+        format_row = getattr(self, self.row_formats.get(name, 'record'))
+        if isinstance(value, np.ndarray):
+            return [format_row(row) for row in value]
+        if isinstance(value, int):
+            return format_row(value)
+        return value
+
+
+class MonthlyResults(TypedResults):
+    """Monthly averages with hottest/coolest months and overall statistics"""
+    
+    def summarize(self, df, rows):
+        """Listing, hottest and coolest month and /stats aggregates"""
+        answers = super().summarize(df, rows)
+        answers["hottest"] = self.pick('avg_max', rows, largest=True)
+        answers["coolest"] = self.pick('avg_min', rows, largest=False)
+        answers["stats"] = None
+        
+        if len(rows):
+            selection = df.iloc[rows]
+            answers["stats"] = {
+                "total_months_analyzed": int(len(np.unique(self.month.codes[rows]))),
+                "total_stations": max(int(len(np.unique(self.station.codes[rows]))), 1),
+                "max_temperature": float(df['avg_max'].iloc[answers["hottest"]]),
+                "min_temperature": float(df['avg_min'].iloc[answers["coolest"]]),
+                "overall_avg_max": float(selection['avg_max'].mean()),
+                "overall_avg_min": float(selection['avg_min'].mean())
+            }
+        
+        return answers
+
+
+class TempPrecipResults(TypedResults):
+    """Temperature-precipitation results with wettest/driest months and interpretations"""
+    
+    row_formats = {"interpretations": "interpretation"}
+    
+    def summarize(self, df, rows):
+        """Listing, wettest and driest month and correlation interpretations"""
+        answers = super().summarize(df, rows)
+        answers["wettest"] = self.pick('total_precip', rows, largest=True)
+        answers["driest"] = self.pick('total_precip', rows, largest=False)
+        answers["interpretations"] = rows
+        return answers
+    
+    def interpretation(self, row: int) -> dict:
+        """
+        Correlation interpretation of a row
+        
+        Args:
+            row: Row position
+            
+        Returns:
+            Dictionary {["station_id",] "month", "correlation", "interpretation"}
+        """
+        record = self.record(row)
+        result = {
+            "month": record['month'],
+            "correlation": record['correlation'],
+            "interpretation": interpret_correlation(record['correlation'])
+        }
+        if record['station_id'] is not None:
+            result["station_id"] = record['station_id']
+        return result
+
+
+class QuantileSketches:
+    """
+    Query views of the monthly t-digest sketches
+    
+    Each sketch is turned into a DigestQuantiles once, and the sketches are
+    indexed by station and month.
+    
+    Args:
+        df: Parsed sketches from read_results()
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        self.selections = {(None, None): []}
+        for record in df.to_dict('records'):
+            row = {
+                "station_id": record['station_id'],
+                "month": record['month'],
+                "count": int(record['count']),
+                "digests": {
+                    variable: DigestQuantiles(record[variable])
+                    for variable in TEMPERATURE_VARIABLES if record.get(variable) is not None
+                },
+            }
+            for key in {(None, None), (row['station_id'], None),
+                        (None, row['month']), (row['station_id'], row['month'])}:
+                self.selections.setdefault(key, []).append(row)
+    
+    def select(self, station_id: Optional[str] = None, month: Optional[str] = None) -> list:
+        """
+        Sketches of a station and/or month
+        
+        Args:
+            station_id: Station to keep, or None for all
+            month: Year-month to keep, or None for all
+            
+        Returns:
+            List of {"station_id", "month", "count", "digests"}, with
+            digests mapping each variable to its DigestQuantiles
+            
+        Raises:
+            HTTPException: If the station or the month has no sketches
+        """
+        if station_id is not None and (station_id, None) not in self.selections:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No results for station: {station_id}"
+            )
+        
+        rows = self.selections.get((station_id, month))
+        if rows is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No quantile sketch for month: {month}"
+            )
+        return rows
+
+
+class ThresholdHistograms:
+    """
+    Cumulative temperature histograms per station and variable
+    
+    A CumulativeHistogram is built for every station and variable, and for
+    every variable with all stations pooled.
+    
+    Args:
+        df: Parsed histograms from read_results()
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        groups = defaultdict(list)
+        for record in df.to_dict('records'):
+            groups[(None, record['variable'])].append(record)
+            if record['station_id'] is not None:
+                groups[(record['station_id'], record['variable'])].append(record)
+        
+        self.stations = {station_id for station_id, _ in groups if station_id is not None}
+        self.histograms = {key: CumulativeHistogram(records) for key, records in groups.items()}
+    
+    def histogram(self, variable: str, station_id: Optional[str] = None) -> CumulativeHistogram:
+        """
+        Histogram of a variable
+        
+        Args:
+            variable: temp_max, temp_min or avg_temp
+            station_id: Station, or None for all stations
+            
+        Returns:
+            CumulativeHistogram
+            
+        Raises:
+            HTTPException: If the station or the variable has no histogram
+        """
+        if station_id is not None and station_id not in self.stations:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No results for station: {station_id}"
+            )
+        
+        histogram = self.histograms.get((station_id, variable))
+        if histogram is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No histogram for variable: {variable}"
+            )
+        return histogram
+
+
+def monthly_results() -> MonthlyResults:
+    """
+    Typed monthly averages, built once per version of the results file
+    
+    Returns:
+        MonthlyResults shared by all requests
+        
+    Raises:
+        HTTPException: If the results cannot be loaded
+    """
+    return load_results(settings.monthly_avg_file, MONTHLY_COLUMNS, MonthlyResults)
+
+
+def temp_precip_results() -> TempPrecipResults:
+    """
+    Typed temperature-precipitation results, built once per version of the results file
+    
+    Returns:
+        TempPrecipResults shared by all requests
+        
+    Raises:
+        HTTPException: If the results cannot be loaded
+    """
+    return load_results(settings.temp_precip_file, TEMP_PRECIP_COLUMNS, TempPrecipResults)
+
+
+def quantile_sketches() -> QuantileSketches:
+    """
+    Query views of the t-digest sketches, built once per version of the sketches file
+    
+    Returns:
+        QuantileSketches shared by all requests
+        
+    Raises:
+        HTTPException: If the sketches cannot be loaded
+    """
+    return load_results(settings.temp_quantiles_file, QUANTILE_COLUMNS, QuantileSketches)
+
+
+def threshold_histograms() -> ThresholdHistograms:
+    """
+    Cumulative temperature histograms, built once per version of the histograms file
+    
+    Returns:
+        ThresholdHistograms shared by all requests
+        
+    Raises:
+        HTTPException: If the histograms cannot be loaded
+    """
+    return load_results(settings.temp_histograms_file, HISTOGRAM_COLUMNS, ThresholdHistograms)
+
+
+def preload_results():
+    """
+    Build the typed results at startup so the first requests are lookups
+    
+    Results not produced yet are skipped; they load on first request.
+    
+    Returns:
+        Names of the loaded results
+    """
+    loaded = []
+    for name, loader in (('monthly_avg', monthly_results), ('temp_precip', temp_precip_results),
+                         ('temp_quantiles', quantile_sketches),
+                         ('temp_histograms', threshold_histograms)):
+        try:
+            loader()
+            loaded.append(name)
+        except HTTPException:
+            pass
+    return loaded
@@ -0,0 +1,144 @@
+"""
+On-disk mirror of MapReduce output read from S3
+
+Every part file downloaded from S3 is kept under
+<results_dir>/.s3-mirror/<bucket>/<key>, and a manifest per output prefix
+records the ETag of each mirrored part. A later load compares the ETags
+of the S3 listing with the manifest and downloads only the parts that
+changed, so an unchanged output is never downloaded twice. When S3 cannot
+be reached, the mirrored parts are the last known copy of the output.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from fastapi import HTTPException
+
+from ..config import settings
+
+
+MIRROR_DIR = '.s3-mirror'
+MANIFEST_FILE = '_manifest.json'
+
+# Serializes manifest updates of concurrent loads
+manifest_lock = threading.Lock()
+
+
+def mirror_path(key: str) -> str:
+    """
+    Local path of a mirrored S3 object
+    
+    Args:
+        key: S3 object key (or prefix)
+        
+    Returns:
+        Path under <results_dir>/.s3-mirror/<bucket>/
+        
+    Raises:
+        ValueError: If the key would escape the mirror directory
+    """
+    root = os.path.abspath(os.path.join(settings.results_dir, MIRROR_DIR, settings.s3_bucket))
+    path = os.path.abspath(os.path.join(root, key))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"S3 key outside the mirror: {key}")
+    return path
+
+
+def write_atomic(path: str, data: bytes):
+    """Write a file under a temporary name and rename it into place"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(s3_prefix: str) -> dict:
+    """
+    ETags of the mirrored parts of an output
+    
+    Args:
+        s3_prefix: S3 prefix of the output
+        
+    Returns:
+        Dictionary S3 key -> ETag (empty when nothing is mirrored)
+    """
+    path = os.path.join(mirror_path(s3_prefix), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def mirrored_parts(s3_prefix: str) -> tuple:
+    """
+    Mirrored part files of an output, for use when S3 is unreachable
+    
+    Args:
+        s3_prefix: S3 prefix of the output
+        
+    Returns:
+        Sorted tuple of (key, ETag) pairs, as list_s3_parts() returns
+        
+    Raises:
+        HTTPException: If the output was never mirrored
+    """
+    manifest = read_manifest(s3_prefix)
+    if not manifest:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No mirrored copy of: {s3_prefix}"
+        )
+    return tuple(sorted(manifest.items()))
+
+
+def read_part(key: str, etag: str, manifest: dict) -> Optional[bytes]:
+    """
+    Read a mirrored part file if it is current
+    
+    Args:
+        key: S3 object key
+        etag: ETag of the object on S3
+        manifest: read_manifest() of the output
+        
+    Returns:
+        File contents, or None when the part must be downloaded
+    """
+    path = mirror_path(key)
+    if manifest.get(key) != etag or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def write_part(key: str, data: bytes):
+    """
+    Store a downloaded part file
+    
+    Args:
+        key: S3 object key
+        data: Object contents
+    """
+    write_atomic(mirror_path(key), data)
+
+
+def save_manifest(s3_prefix: str, part_files: list):
+    """
+    Record the mirrored parts of an output, deleting parts no longer listed
+    
+    Args:
+        s3_prefix: S3 prefix of the output
+        part_files: (key, ETag) of every part file now in the output
+    """
+    manifest = dict(part_files)
+    
+    with manifest_lock:
+        for key in set(read_manifest(s3_prefix)) - set(manifest):
+            if os.path.exists(mirror_path(key)):
+                os.remove(mirror_path(key))
+        
+        path = os.path.join(mirror_path(s3_prefix), MANIFEST_FILE)
+        write_atomic(path, json.dumps(manifest, indent=2, sort_keys=True).encode())
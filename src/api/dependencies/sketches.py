@@ -0,0 +1,96 @@
+"""
+Percentile queries against stored t-digest sketches
+
+The temperature quantiles job stores one serialized t-digest per month and
+variable ({"count", "min", "max", "centroids": [[mean, weight], ...]}).
+Quantiles and percentile ranks are interpolated between centroid centers
+exactly as the job's TDigest does, with a binary search over the
+cumulative weights, so a query costs O(log centroids).
+"""
+
+import bisect
+from typing import Optional
+
+
+class DigestQuantiles:
+    """
+    Query view of a serialized t-digest
+    
+    Args:
+        digest: Dictionary written by the temperature quantiles job
+    """
+    
+    def __init__(self, digest: dict):
+        self.means = [mean for mean, _ in digest["centroids"]]
+        self.minimum = digest["min"]
+        self.maximum = digest["max"]
+        
+        # Cumulative weight at the center of each centroid
+        self.centers = []
+        cumulative = 0.0
+        for _, weight in digest["centroids"]:
+            self.centers.append(cumulative + weight / 2)
+            cumulative += weight
+        self.total = cumulative
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile
+        
+        Args:
+            q: Quantile in [0, 1]
+            
+        Returns:
+            Estimated value, or None for an empty digest
+        """
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+        
+        target = q * self.total
+        
+        if target < self.centers[0]:
+            return self.minimum + (self.means[0] - self.minimum) * target / self.centers[0]
+        
+        if target > self.centers[-1]:
+            tail = self.total - self.centers[-1]
+            return self.means[-1] + (self.maximum - self.means[-1]) * (target - self.centers[-1]) / tail
+        
+        right = max(bisect.bisect_left(self.centers, target), 1)
+        left = right - 1
+        fraction = (target - self.centers[left]) / (self.centers[right] - self.centers[left])
+        return self.means[left] + (self.means[right] - self.means[left]) * fraction
+    
+    def rank(self, value: float) -> Optional[float]:
+        """
+        Estimate the fraction of readings at or below a value
+        
+        Args:
+            value: Temperature
+            
+        Returns:
+            Fraction in [0, 1], or None for an empty digest
+        """
+        if not self.means:
+            return None
+        if value < self.minimum:
+            return 0.0
+        if value >= self.maximum:
+            return 1.0
+        
+        if value < self.means[0]:
+            span = self.means[0] - self.minimum
+            weight = self.centers[0] * (value - self.minimum) / span if span else 0.0
+        elif value >= self.means[-1]:
+            span = self.maximum - self.means[-1]
+            tail = self.total - self.centers[-1]
+            weight = self.centers[-1] + tail * (value - self.means[-1]) / span
+        else:
+            right = bisect.bisect_right(self.means, value)
+            left = right - 1
+            span = self.means[right] - self.means[left]
+            fraction = (value - self.means[left]) / span if span else 1.0
+            weight = self.centers[left] + (self.centers[right] - self.centers[left]) * fraction
+        
+        return weight / self.total
@@ -3,17 +3,22 @@ Main FastAPI application for Weatheria Climate Observatory
 Best practices implementation with routers, models, and dependency injection
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
-from typing import Dict
+from typing import Dict, Optional
 import os
-import pandas as pd
 
 from .config import settings
-from .models.schemas import Statistics, HealthCheck
+from .models.schemas import CacheStats, Statistics, HealthCheck
 from .routers import monthly, extremes, correlation
-from .dependencies.file_handler import ensure_results_directory, get_results_file_path
+from .dependencies.file_handler import (
+    ensure_results_directory,
+    get_results_file_path,
+    results_cache,
+    run_blocking,
+)
+from .dependencies.results_store import monthly_results, preload_results
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -45,8 +50,10 @@ async def startup_event():
     Run on application startup
     """
     ensure_results_directory()
+    loaded = await run_blocking(preload_results)
     print(f"Weatheria Climate Observatory API v{settings.api_version}")
     print(f"Results directory: {settings.results_dir}")
+    print(f"Preloaded results: {', '.join(loaded) or 'none'}")
     print(f"Access docs at: http://{settings.api_host}:{settings.api_port}/docs")
 
 
@@ -77,7 +84,8 @@ async def root():
             "/temp-precipitation/correlation-strength": "Correlation interpretation",
             "/stats": "Overall statistics",
             "/health": "Health check",
-            "/download/{result_type}": "Download CSV results"
+            "/cache-stats": "Results cache hit rate",
+            "/download/{result_type}": "Download results (JSON lines)"
         },
         "documentation": {
             "swagger": "/docs",
@@ -102,43 +110,43 @@ async def health_check():
     }
 
 
+@app.get(
+    "/cache-stats",
+    response_model=CacheStats,
+    summary="Results Cache Statistics",
+    description="Get hit and miss counts of the parsed results cache"
+)
+async def cache_stats():
+    """
+    Results cache counters; in steady state, requests are hits
+    """
+    return results_cache.stats()
+
+
 @app.get(
     "/stats",
     response_model=Statistics,
     summary="Overall Statistics",
     description="Get overall climate statistics for the analyzed period"
 )
-async def get_statistics():
+async def get_statistics(
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
     """
     Get overall statistics from all MapReduce results
     """
     try:
-        # Load monthly averages
-        monthly_df = pd.read_csv(
-            get_results_file_path(settings.monthly_avg_file),
-            sep='\t',
-            names=['month', 'data'],
-            header=None
-        )
+        # Aggregates of the monthly averages, computed when they were loaded
+        results = await run_blocking(monthly_results)
+        return results.answer("stats", station_id)
         
-        # Parse the data column
-        split_data = monthly_df['data'].str.split('\t', expand=True)
-        monthly_df['avg_max'] = pd.to_numeric(split_data[0], errors='coerce')
-        monthly_df['avg_min'] = pd.to_numeric(split_data[1], errors='coerce')
-        
-        return {
-            "total_months_analyzed": len(monthly_df),
-            "max_temperature": float(monthly_df['avg_max'].max()),
-            "min_temperature": float(monthly_df['avg_min'].min()),
-            "overall_avg_max": float(monthly_df['avg_max'].mean()),
-            "overall_avg_min": float(monthly_df['avg_min'].mean())
-        }
-        
-    except FileNotFoundError:
-        raise HTTPException(
-            status_code=404,
-            detail="Statistics not available. Run MapReduce jobs first."
-        )
+    except HTTPException as e:
+        if e.status_code == 404 and station_id is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Statistics not available. Run MapReduce jobs first."
+            )
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -149,21 +157,25 @@ async def get_statistics():
 @app.get(
     "/download/{result_type}",
     summary="Download Results",
-    description="Download CSV file of MapReduce results"
+    description="Download the MapReduce results file (JSON lines)"
 )
 async def download_results(result_type: str):
     """
-    Download CSV file of results
+    Download results file (one JSON record per line)
     
     Available result types:
     - monthly-avg: Monthly average temperatures
     - extreme-temps: Extreme temperature detection
     - temp-precipitation: Temperature-precipitation correlation
+    - temp-quantiles: Monthly temperature t-digest sketches
+    - temp-histograms: 0.1 °C temperature histograms
     """
     file_mapping = {
         "monthly-avg": settings.monthly_avg_file,
         "extreme-temps": settings.extreme_temps_file,
-        "temp-precipitation": settings.temp_precip_file
+        "temp-precipitation": settings.temp_precip_file,
+        "temp-quantiles": settings.temp_quantiles_file,
+        "temp-histograms": settings.temp_histograms_file
     }
     
     if result_type not in file_mapping:
@@ -177,7 +189,7 @@ async def download_results(result_type: str):
         
         return FileResponse(
             file_path,
-            media_type="text/csv",
+            media_type="application/x-ndjson",
             filename=file_mapping[result_type]
         )
         
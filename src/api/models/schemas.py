@@ -3,11 +3,12 @@ Pydantic models for API request/response validation
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 
 
 class MonthlyAverage(BaseModel):
     """Monthly average temperature model"""
+    station_id: Optional[str] = Field(None, description="Station identifier (multi-station runs)")
     month: str = Field(..., description="Year-month (YYYY-MM)")
     avg_max: float = Field(..., description="Average maximum temperature (°C)")
     avg_min: float = Field(..., description="Average minimum temperature (°C)")
@@ -24,6 +25,7 @@ class MonthlyAverage(BaseModel):
 
 class ExtremeTemperature(BaseModel):
     """Extreme temperature detection model"""
+    station_id: Optional[str] = Field(None, description="Station identifier (multi-station runs)")
     category: str = Field(..., description="Temperature category")
     count: int = Field(..., description="Number of days in this category")
     avg_temp: float = Field(..., description="Average temperature for this category (°C)")
@@ -38,8 +40,70 @@ class ExtremeTemperature(BaseModel):
         }
 
 
+class MonthlyPercentiles(BaseModel):
+    """Percentiles of a temperature variable for one month"""
+    station_id: Optional[str] = Field(None, description="Station identifier (multi-station runs)")
+    month: str = Field(..., description="Year-month (YYYY-MM)")
+    variable: str = Field(..., description="temp_max, temp_min or avg_temp")
+    count: int = Field(..., description="Number of days in the month")
+    percentiles: Dict[str, float] = Field(..., description="Percentile (0-100) -> temperature (°C)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "month": "2022-01",
+                "variable": "temp_max",
+                "count": 31,
+                "percentiles": {"50": 27.9, "95": 30.4}
+            }
+        }
+
+
+class ThresholdStats(BaseModel):
+    """Days beyond user-supplied temperature thresholds"""
+    station_id: Optional[str] = Field(None, description="Station identifier, when filtered")
+    variable: str = Field(..., description="temp_max, temp_min or avg_temp")
+    above: Optional[float] = Field(None, description="Lower threshold (exclusive, °C)")
+    below: Optional[float] = Field(None, description="Upper threshold (exclusive, °C)")
+    count: int = Field(..., description="Number of days within the thresholds")
+    percentage: float = Field(..., description="Percent of all days")
+    avg_temp: Optional[float] = Field(None, description="Average temperature of those days (°C)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "variable": "temp_max",
+                "above": 30.0,
+                "below": None,
+                "count": 23,
+                "percentage": 2.1,
+                "avg_temp": 24.8
+            }
+        }
+
+
+class PercentileRank(BaseModel):
+    """Share of days at or below a temperature for one month"""
+    station_id: Optional[str] = Field(None, description="Station identifier (multi-station runs)")
+    month: str = Field(..., description="Year-month (YYYY-MM)")
+    variable: str = Field(..., description="temp_max, temp_min or avg_temp")
+    value: float = Field(..., description="Queried temperature (°C)")
+    percentile: float = Field(..., description="Percent of days at or below the value")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "month": "2022-01",
+                "variable": "temp_max",
+                "value": 30.0,
+                "percentile": 87.1
+            }
+        }
+
+
 class TempPrecipCorrelation(BaseModel):
     """Temperature-precipitation correlation model"""
+    station_id: Optional[str] = Field(None, description="Station identifier (multi-station runs)")
     month: str = Field(..., description="Year-month (YYYY-MM)")
     correlation: float = Field(..., description="Pearson correlation coefficient")
     avg_temp: float = Field(..., description="Average temperature (°C)")
@@ -63,6 +127,7 @@ class TempPrecipCorrelation(BaseModel):
 class Statistics(BaseModel):
     """Overall statistics model"""
     total_months_analyzed: int = Field(..., description="Total number of months")
+    total_stations: int = Field(1, description="Number of stations analyzed")
     max_temperature: float = Field(..., description="Highest temperature recorded (°C)")
     min_temperature: float = Field(..., description="Lowest temperature recorded (°C)")
     overall_avg_max: float = Field(..., description="Overall average maximum temperature (°C)")
@@ -94,6 +159,30 @@ class HealthCheck(BaseModel):
         }
 
 
+class CacheStats(BaseModel):
+    """Results cache counters"""
+    hits: int = Field(..., description="Requests served from memory without any I/O")
+    revalidated: int = Field(..., description="Requests that checked the source but did not re-read it")
+    misses: int = Field(..., description="Requests that read and parsed a results file")
+    evictions: int = Field(..., description="Entries evicted as least recently used")
+    entries: int = Field(..., description="Results currently cached")
+    hit_rate: float = Field(..., description="Share of requests served from memory without any I/O")
+    revalidated_rate: float = Field(..., description="Share of requests that checked the source but did not re-read it")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "hits": 980,
+                "revalidated": 15,
+                "misses": 5,
+                "evictions": 0,
+                "entries": 5,
+                "hit_rate": 0.98,
+                "revalidated_rate": 0.015
+            }
+        }
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     error: str = Field(..., description="Error type")
@@ -2,12 +2,17 @@
 Router for extreme temperature endpoints
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal, Optional
 
-from ..models.schemas import ExtremeTemperature
-from ..dependencies.file_handler import load_csv_data
+from ..models.schemas import (
+    ExtremeTemperature,
+    MonthlyPercentiles,
+    PercentileRank,
+    ThresholdStats,
+)
+from ..dependencies.file_handler import filter_station, load_csv_data, run_blocking
+from ..dependencies.results_store import quantile_sketches, threshold_histograms
 from ..config import settings
 
 router = APIRouter(
@@ -23,7 +28,9 @@ router = APIRouter(
     summary="Get extreme temperature statistics",
     description="Retrieve counts of days with extreme temperature conditions"
 )
-async def get_extreme_temperatures():
+async def get_extreme_temperatures(
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
     """
     Get extreme temperature detection results from MapReduce job
     
@@ -35,17 +42,12 @@ async def get_extreme_temperatures():
     """
     try:
         # Load data from MapReduce output
-        df = load_csv_data(
+        df = await run_blocking(
+            load_csv_data,
             settings.extreme_temps_file,
-            column_names=['category', 'count', 'avg_temp']
+            column_names=['station_id', 'category', 'count', 'avg_temp']
         )
-        
-        # Handle cases where count and avg_temp are in a single column
-        if len(df.columns) == 2:
-            split_data = df.iloc[:, 1].str.split('\t', expand=True)
-            df['count'] = pd.to_numeric(split_data[0], errors='coerce').astype(int)
-            df['avg_temp'] = pd.to_numeric(split_data[1], errors='coerce')
-            df = df[['category', 'count', 'avg_temp']]
+        df = filter_station(df, station_id)
         
         # Convert to list of dictionaries
         return df.to_dict('records')
@@ -64,22 +66,30 @@ async def get_extreme_temperatures():
     summary="Get extreme temperature summary",
     description="Get a summary of extreme temperature occurrences"
 )
-async def get_extreme_summary():
+async def get_extreme_summary(
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
     """
     Get a summary of extreme temperature events
+    
+    Without a station filter, multi-station results are pooled: counts are
+    summed and averages weighted by each station's day count.
     """
     try:
-        df = load_csv_data(
+        df = await run_blocking(
+            load_csv_data,
             settings.extreme_temps_file,
-            column_names=['category', 'count', 'avg_temp']
+            column_names=['station_id', 'category', 'count', 'avg_temp']
         )
+        df = filter_station(df, station_id)
         
-        # Handle data format
-        if len(df.columns) == 2:
-            split_data = df.iloc[:, 1].str.split('\t', expand=True)
-            df['count'] = pd.to_numeric(split_data[0], errors='coerce').astype(int)
-            df['avg_temp'] = pd.to_numeric(split_data[1], errors='coerce')
-            df = df[['category', 'count', 'avg_temp']]
+        # Pool stations per category
+        df = df.assign(total_temp=df['count'] * df['avg_temp'])
+        df = df.groupby('category', sort=False, as_index=False).agg(
+            count=('count', 'sum'),
+            total_temp=('total_temp', 'sum')
+        )
+        df['avg_temp'] = (df['total_temp'] / df['count']).round(2)
         
         total_days = df['count'].sum()
         
@@ -108,3 +118,151 @@ async def get_extreme_summary():
             status_code=500,
             detail=f"Error generating summary: {str(e)}"
         )
+
+
+@router.get(
+    "/percentiles",
+    response_model=List[MonthlyPercentiles],
+    summary="Get monthly temperature percentiles",
+    description="Answer percentile queries per month from the stored t-digest sketches"
+)
+async def get_percentiles(
+    p: List[float] = Query([95.0], description="Percentiles (0-100), repeatable"),
+    variable: Literal['temp_max', 'temp_min', 'avg_temp'] = Query(
+        'temp_max', description="Temperature variable"),
+    month: Optional[str] = Query(None, description="Only this month (YYYY-MM)"),
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
+    """
+    Get arbitrary percentiles (e.g. the 95th percentile of temp_max) per month
+    
+    Estimates come from the sketches written by the temperature quantiles
+    job, so any percentile is answered without rerunning MapReduce.
+    """
+    if any(not 0 <= percentile <= 100 for percentile in p):
+        raise HTTPException(
+            status_code=400,
+            detail="Percentiles must be between 0 and 100"
+        )
+    
+    try:
+        sketches = await run_blocking(quantile_sketches)
+        
+        results = []
+        for row in sketches.select(station_id, month):
+            digest = row['digests'][variable]
+            result = {
+                "month": row['month'],
+                "variable": variable,
+                "count": row['count'],
+                "percentiles": {
+                    f"{percentile:g}": round(digest.quantile(percentile / 100), 2)
+                    for percentile in p
+                },
+            }
+            if row['station_id'] is not None:
+                result["station_id"] = row['station_id']
+            results.append(result)
+        
+        return results
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error computing percentiles: {str(e)}"
+        )
+
+
+@router.get(
+    "/percentile-rank",
+    response_model=List[PercentileRank],
+    summary="Get the percentile rank of a temperature",
+    description="Share of days per month at or below a temperature, from the stored sketches"
+)
+async def get_percentile_rank(
+    value: float = Query(..., description="Temperature (°C)"),
+    variable: Literal['temp_max', 'temp_min', 'avg_temp'] = Query(
+        'temp_max', description="Temperature variable"),
+    month: Optional[str] = Query(None, description="Only this month (YYYY-MM)"),
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
+    """
+    Get the percentile rank of a temperature in each month
+    """
+    try:
+        sketches = await run_blocking(quantile_sketches)
+        
+        results = []
+        for row in sketches.select(station_id, month):
+            digest = row['digests'][variable]
+            result = {
+                "month": row['month'],
+                "variable": variable,
+                "value": value,
+                "percentile": round(digest.rank(value) * 100, 2),
+            }
+            if row['station_id'] is not None:
+                result["station_id"] = row['station_id']
+            results.append(result)
+        
+        return results
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error computing percentile rank: {str(e)}"
+        )
+
+
+@router.get(
+    "/threshold",
+    response_model=ThresholdStats,
+    summary="Count days beyond any temperature threshold",
+    description="Answer threshold queries from the stored 0.1 °C histograms without rerunning MapReduce"
+)
+async def get_threshold_stats(
+    variable: Literal['temp_max', 'temp_min', 'avg_temp'] = Query(
+        'temp_max', description="Temperature variable"),
+    above: Optional[float] = Query(None, description="Count days with the variable above this (°C)"),
+    below: Optional[float] = Query(None, description="Count days with the variable below this (°C)"),
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
+    """
+    Count days and their average temperature for user-supplied thresholds
+    
+    For example, variable=temp_max&above=30 reproduces the very_hot category
+    and variable=temp_min&below=12 the very_cool one, for any threshold.
+    """
+    if above is None and below is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide at least one of 'above' or 'below'"
+        )
+    
+    try:
+        histograms = await run_blocking(threshold_histograms)
+        histogram = histograms.histogram(variable, station_id)
+        count, avg_temp = histogram.range_stats(above=above, below=below)
+        total_days = histogram.total
+        
+        return {
+            "station_id": station_id,
+            "variable": variable,
+            "above": above,
+            "below": below,
+            "count": count,
+            "percentage": round(count / total_days * 100, 2) if total_days > 0 else 0.0,
+            "avg_temp": round(avg_temp, 2) if avg_temp is not None else None,
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error computing threshold statistics: {str(e)}"
+        )
@@ -2,13 +2,12 @@
 Router for monthly average temperature endpoints
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 
 from ..models.schemas import MonthlyAverage
-from ..dependencies.file_handler import load_csv_data
-from ..config import settings
+from ..dependencies.file_handler import run_blocking
+from ..dependencies.results_store import monthly_results
 
 router = APIRouter(
     prefix="/monthly-avg",
@@ -23,32 +22,22 @@ router = APIRouter(
     summary="Get monthly average temperatures",
     description="Retrieve monthly average maximum and minimum temperatures for Medellín"
 )
-async def get_monthly_averages():
+async def get_monthly_averages(
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
     """
     Get monthly average temperature results from MapReduce job
     
     Returns a list of monthly averages with:
+    - Station identifier (multi-station runs only)
     - Month (YYYY-MM format)
     - Average maximum temperature
     - Average minimum temperature
     """
     try:
-        # Load data from MapReduce output
-        df = load_csv_data(
-            settings.monthly_avg_file,
-            column_names=['month', 'avg_max', 'avg_min']
-        )
-        
-        # Handle cases where avg_max and avg_min are in a single column
-        if len(df.columns) == 2:
-            # Split the second column by tab
-            split_data = df.iloc[:, 1].str.split('\t', expand=True)
-            df['avg_max'] = pd.to_numeric(split_data[0], errors='coerce')
-            df['avg_min'] = pd.to_numeric(split_data[1], errors='coerce')
-            df = df[['month', 'avg_max', 'avg_min']]
-        
-        # Convert to list of dictionaries
-        return df.to_dict('records')
+        # Precomputed records of the MapReduce output
+        results = await run_blocking(monthly_results)
+        return results.answer("rows", station_id)
         
     except HTTPException:
         raise
@@ -65,27 +54,16 @@ async def get_monthly_averages():
     summary="Get hottest month",
     description="Find the month with the highest average maximum temperature"
 )
-async def get_hottest_month():
+async def get_hottest_month(
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
     """
     Get the hottest month based on average maximum temperature
     """
     try:
-        df = load_csv_data(
-            settings.monthly_avg_file,
-            column_names=['month', 'avg_max', 'avg_min']
-        )
-        
-        # Handle data format
-        if len(df.columns) == 2:
-            split_data = df.iloc[:, 1].str.split('\t', expand=True)
-            df['avg_max'] = pd.to_numeric(split_data[0], errors='coerce')
-            df['avg_min'] = pd.to_numeric(split_data[1], errors='coerce')
-            df = df[['month', 'avg_max', 'avg_min']]
-        
-        # Find hottest month
-        hottest = df.loc[df['avg_max'].idxmax()]
-        
-        return hottest.to_dict()
+        # Hottest month, found when the results were loaded
+        results = await run_blocking(monthly_results)
+        return results.answer("hottest", station_id)
         
     except HTTPException:
         raise
@@ -102,27 +80,16 @@ async def get_hottest_month():
     summary="Get coolest month",
     description="Find the month with the lowest average minimum temperature"
 )
-async def get_coolest_month():
+async def get_coolest_month(
+    station_id: Optional[str] = Query(None, description="Only this station")
+):
     """
     Get the coolest month based on average minimum temperature
     """
     try:
-        df = load_csv_data(
-            settings.monthly_avg_file,
-            column_names=['month', 'avg_max', 'avg_min']
-        )
-        
-        # Handle data format
-        if len(df.columns) == 2:
-            split_data = df.iloc[:, 1].str.split('\t', expand=True)
-            df['avg_max'] = pd.to_numeric(split_data[0], errors='coerce')
-            df['avg_min'] = pd.to_numeric(split_data[1], errors='coerce')
-            df = df[['month', 'avg_max', 'avg_min']]
-        
-        # Find coolest month
-        coolest = df.loc[df['avg_min'].idxmin()]
-        
-        return coolest.to_dict()
+        # Coolest month, found when the results were loaded
+        results = await run_blocking(monthly_results)
+        return results.answer("coolest", station_id)
         
     except HTTPException:
         raise
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Splittable block-gzip (BGZF) files for the Weatheria local engine
+
+BGZF, the format written by ``bgzip`` (htslib), is a series of independent
+gzip members of at most 64 KiB each, every one carrying its compressed size
+in a "BC" extra field. Any gzip reader decompresses the whole file, but a
+reader that knows where the blocks start can begin at any block, so a large
+CSV can be cut into many map tasks without being decompressed first.
+
+Block start offsets are read from a ``.gzi`` index next to the file, in
+bgzip's format (``bgzip -i``), or found by walking the block headers, which
+only reads 18 bytes and the 4-byte size trailer of each block.
+"""
+
+import os
+import struct
+import zlib
+from bisect import bisect_right
+
+
+# Uncompressed bytes per block, as bgzip writes them
+BLOCK_DATA_SIZE = 0xff00
+
+# gzip header with the FEXTRA flag and a single 6-byte "BC" subfield
+# holding the block size minus one
+BLOCK_HEADER = struct.Struct('<4BI2BH2BHH')
+HEADER_PREFIX = b'\x1f\x8b\x08\x04'
+
+# Empty block marking the end of a BGZF file
+EOF_BLOCK = bytes.fromhex(
+    '1f8b08040000000000ff0600424302001b0003000000000000000000'
+)
+
+
+def compress_block(data, level=6):
+    """
+    Compress up to BLOCK_DATA_SIZE bytes into one BGZF block
+    
+    Args:
+        data: Uncompressed bytes
+        level: zlib compression level
+        
+    Returns:
+        Block bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    
+    block_size = BLOCK_HEADER.size + len(deflated) + 8
+    header = BLOCK_HEADER.pack(
+        0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord('B'), ord('C'), 2, block_size - 1
+    )
+    trailer = struct.pack('<II', zlib.crc32(data), len(data))
+    
+    return header + deflated + trailer
+
+
+class BgzfWriter(object):
+    """
+    Write a BGZF file and its .gzi index
+    
+    Data is cut into blocks at line ends where possible, so that most map
+    tasks start at the beginning of a block.
+    
+    Args:
+        path: Output file path
+        level: zlib compression level
+        index: Also write <path>.gzi
+        block_data_size: Uncompressed bytes per block
+    """
+    
+    def __init__(self, path, level=6, index=True, block_data_size=BLOCK_DATA_SIZE):
+        self.path = path
+        self.level = level
+        self.index = index
+        self.block_data_size = block_data_size
+        self.file = open(path, 'wb')
+        self.buffer = bytearray()
+        self.offsets = []
+        self.compressed_offset = 0
+        self.uncompressed_offset = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def write(self, data):
+        """
+        Buffer data, writing every full block
+        
+        Args:
+            data: Text or bytes
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.buffer += data
+        
+        while len(self.buffer) >= self.block_data_size:
+            cut = self.buffer.rfind(b'\n', 0, self.block_data_size) + 1 or self.block_data_size
+            self.write_block(bytes(self.buffer[:cut]))
+            del self.buffer[:cut]
+    
+    def write_block(self, data):
+        """Compress and write one block, recording its offsets"""
+        if self.compressed_offset:
+            self.offsets.append((self.compressed_offset, self.uncompressed_offset))
+        
+        block = compress_block(data, self.level)
+        self.file.write(block)
+        self.compressed_offset += len(block)
+        self.uncompressed_offset += len(data)
+    
+    def close(self):
+        """Write the buffered data, the EOF block and the index"""
+        if self.file.closed:
+            return
+        
+        if self.buffer:
+            self.write_block(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.file.write(EOF_BLOCK)
+        self.file.close()
+        
+        if self.index:
+            write_index(self.path + '.gzi', self.offsets)
+
+
+def write_index(path, offsets):
+    """
+    Write a bgzip .gzi index
+    
+    Args:
+        path: Index file path
+        offsets: (compressed offset, uncompressed offset) of every block
+            but the first
+    """
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(offsets)))
+        for compressed_offset, uncompressed_offset in offsets:
+            f.write(struct.pack('<QQ', compressed_offset, uncompressed_offset))
+
+
+def is_bgzf(path):
+    """
+    Check whether a file starts with a BGZF block
+    
+    Args:
+        path: File path
+        
+    Returns:
+        True for BGZF files (plain gzip files return False)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(BLOCK_HEADER.size)
+    
+    if len(header) < BLOCK_HEADER.size or not header.startswith(HEADER_PREFIX):
+        return False
+    
+    fields = BLOCK_HEADER.unpack(header)
+    return fields[7:11] == (6, ord('B'), ord('C'), 2)
+
+
+def read_index(path):
+    """
+    Block offsets of a BGZF file
+    
+    Args:
+        path: BGZF file path; <path>.gzi is used when present
+        
+    Returns:
+        Tuple (list of (compressed offset, uncompressed offset) for every
+        block, first block included, total uncompressed size)
+    """
+    file_size = os.path.getsize(path)
+    
+    if os.path.exists(path + '.gzi'):
+        with open(path + '.gzi', 'rb') as f:
+            count, = struct.unpack('<Q', f.read(8))
+            values = struct.unpack(f'<{2 * count}Q', f.read(16 * count))
+        offsets = [(0, 0)] + list(zip(values[::2], values[1::2]))
+        
+        # The index leaves out the size of the last block
+        with open(path, 'rb') as f:
+            compressed_offset, uncompressed_offset = offsets[-1]
+            while compressed_offset < file_size:
+                block_size, data_size = read_block_sizes(f, compressed_offset)
+                compressed_offset += block_size
+                uncompressed_offset += data_size
+        
+        return offsets, uncompressed_offset
+    
+    offsets = []
+    compressed_offset = uncompressed_offset = 0
+    with open(path, 'rb') as f:
+        while compressed_offset < file_size:
+            block_size, data_size = read_block_sizes(f, compressed_offset)
+            if data_size:
+                offsets.append((compressed_offset, uncompressed_offset))
+            compressed_offset += block_size
+            uncompressed_offset += data_size
+    
+    return offsets or [(0, 0)], uncompressed_offset
+
+
+def read_block_sizes(f, offset):
+    """
+    Compressed and uncompressed size of the block at an offset
+    
+    Args:
+        f: BGZF file opened in binary mode
+        offset: Block start offset
+        
+    Returns:
+        Tuple (block size, uncompressed data size)
+    """
+    f.seek(offset)
+    header = f.read(BLOCK_HEADER.size)
+    if len(header) < BLOCK_HEADER.size or not header.startswith(HEADER_PREFIX):
+        raise ValueError(f"{f.name}: no BGZF block at offset {offset}")
+    
+    block_size = BLOCK_HEADER.unpack(header)[-1] + 1
+    f.seek(offset + block_size - 4)
+    data_size, = struct.unpack('<I', f.read(4))
+    
+    return block_size, data_size
+
+
+class BgzfReader(object):
+    """
+    Read a BGZF file as bytes from any uncompressed offset
+    
+    Supports the seek()/tell()/readline() subset the local engine's line
+    reader needs; seeking decompresses only from the block holding the
+    target offset.
+    
+    Args:
+        path: BGZF file path
+        index: read_index() result, read when not given
+    """
+    
+    def __init__(self, path, index=None):
+        self.file = open(path, 'rb')
+        self.file_size = os.path.getsize(path)
+        self.offsets, self.size = index or read_index(path)
+        self.block_starts = [uncompressed for _, uncompressed in self.offsets]
+        self.seek(0)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Close the underlying file"""
+        self.file.close()
+    
+    def load_next_block(self):
+        """
+        Decompress the next non-empty block
+        
+        Returns:
+            False at the end of the file
+        """
+        while self.next_block < self.file_size:
+            self.file.seek(self.next_block)
+            header = self.file.read(BLOCK_HEADER.size)
+            block_size = BLOCK_HEADER.unpack(header)[-1] + 1
+            deflated = self.file.read(block_size - BLOCK_HEADER.size)
+            self.next_block += block_size
+            
+            data = zlib.decompress(deflated[:-8], -zlib.MAX_WBITS)
+            if data:
+                self.block_start += len(self.block)
+                self.block = data
+                self.position = 0
+                return True
+        
+        return False
+    
+    def seek(self, offset):
+        """
+        Move to an uncompressed offset
+        
+        Args:
+            offset: Uncompressed byte offset
+        """
+        index = max(0, bisect_right(self.block_starts, offset) - 1)
+        self.next_block, self.block_start = self.offsets[index]
+        self.block = b''
+        self.position = 0
+        
+        while offset >= self.block_start + len(self.block) and self.load_next_block():
+            pass
+        self.position = min(offset - self.block_start, len(self.block))
+    
+    def tell(self):
+        """Current uncompressed offset"""
+        return self.block_start + self.position
+    
+    def readline(self):
+        """
+        Read up to and including the next newline
+        
+        Returns:
+            Line bytes, or b'' at the end of the file
+        """
+        parts = []
+        while self.position < len(self.block) or self.load_next_block():
+            end = self.block.find(b'\n', self.position)
+            if end >= 0:
+                parts.append(self.block[self.position:end + 1])
+                self.position = end + 1
+                break
+            parts.append(self.block[self.position:])
+            self.position = len(self.block)
+        
+        return b''.join(parts)
@@ -7,16 +7,20 @@ Usage:
     # Local mode
     python src/mapreduce/extreme_temps.py data/raw/test_weather_data.csv
     
+    # Local mode, also keeping the 5 hottest/coldest dates per category
+    python src/mapreduce/extreme_temps.py --top-k 5 data/raw/test_weather_data.csv
+    
     # Hadoop mode
     python src/mapreduce/extreme_temps.py -r hadoop hdfs:///input/weather_data.csv
 """
 
-from mrjob.job import MRJob
 from mrjob.step import MRStep
-from datetime import datetime
+import heapq
+
+from weather_job import WeatherJob, split_station_key, station_key, station_result
 
 
-class ExtremeTemperatures(MRJob):
+class ExtremeTemperatures(WeatherJob):
     """
     Detect days with extreme temperature conditions
     
@@ -25,97 +29,206 @@ class ExtremeTemperatures(MRJob):
     - Cool: min temp < 15°C
     - Very cool: min temp < 12°C
     
-    Input: CSV with date, temp_max, temp_min, precipitation
-    Output: category\tcount\tavg_temp
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: JSON lines {["station_id",] "category", "count", "avg_temp"}
+            (plus "hottest"/"coldest" date lists when --top-k is set)
+    
+    Intermediate values are mergeable (count, sum_temp) partials, optionally
+    followed by the K hottest and K coldest [avg_temp, date] pairs, so the
+    combiner and reducer run in constant memory per category.
     """
     
+    def configure_args(self):
+        """Register job-specific command line options"""
+        super(ExtremeTemperatures, self).configure_args()
+        self.add_passthru_arg(
+            '--top-k',
+            type=int,
+            default=0,
+            help='Also report the K hottest and K coldest dates per category '
+                 '(default: 0, disabled)'
+        )
+    
     def steps(self):
         """Define the MapReduce steps"""
         return [
             MRStep(
-                mapper=self.mapper,
-                reducer=self.reducer
+                combiner=self.combiner,
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
             )
         ]
     
-    def mapper(self, _, line):
+    def key_class(self, key):
+        """Count emitted records per temperature category"""
+        return split_station_key(key)[1]
+    
+    def map_record(self, record):
         """
-        Classify days by temperature extremes
+        Classify a day by temperature extremes
         
         Args:
-            _: Line number (ignored)
-            line: CSV line
+            record: WeatherRecord
             
         Yields:
-            (category, (date, avg_temp, 1))
+            (category, (1, avg_temp)), or
+            (category, (1, avg_temp, [[avg_temp, date]], [[avg_temp, date]]))
+            when --top-k is set; keyed by (station_id, category) for records
+            with a station
         """
-        # Skip header line
-        if line.startswith('date'):
-            return
-        
-        try:
-            # Parse CSV line
-            parts = line.strip().split(',')
-            if len(parts) < 3:
-                return
-            
-            date_str = parts[0]
-            temp_max = float(parts[1])
-            temp_min = float(parts[2])
-            
-            # Calculate average temperature
-            avg_temp = (temp_max + temp_min) / 2
+        temp_max = record.temp_max
+        temp_min = record.temp_min
+        
+        # Calculate average temperature
+        avg_temp = (temp_max + temp_min) / 2
+        
+        # Classify based on temperature thresholds
+        categories = []
+        
+        if temp_max > 30:
+            categories.append('very_hot')
+        
+        if temp_min < 15:
+            categories.append('cool')
+        
+        if temp_min < 12:
+            categories.append('very_cool')
+        
+        # If no extreme condition, classify as normal
+        if not categories:
+            categories.append('normal')
+        
+        if self.options.top_k > 0:
+            value = (1, avg_temp, [[avg_temp, record.date]], [[avg_temp, record.date]])
+        else:
+            value = (1, avg_temp)
+        
+        # Emit each category
+        for category in categories:
+            yield station_key(record.station_id, category), value
+    
+    def map_frame(self, frame):
+        """
+        Emit per-category partial values for a block of parsed rows
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
             
-            # Classify based on temperature thresholds
-            categories = []
+        Yields:
+            (category or (station_id, category),
+             (count, sum_temp[, hottest, coldest]))
+        """
+        top_k = self.options.top_k
+        
+        for station_id, rows in frame.groupby('station_id', sort=False):
+            avg_temp = (rows['temp_max'] + rows['temp_min']) / 2
             
-            if temp_max > 30:
-                categories.append('very_hot')
+            very_hot = rows['temp_max'] > 30
+            cool = rows['temp_min'] < 15
+            very_cool = rows['temp_min'] < 12
+            normal = ~(very_hot | cool | very_cool)
             
-            if temp_min < 15:
-                categories.append('cool')
+            for category, mask in [('very_hot', very_hot), ('cool', cool),
+                                   ('very_cool', very_cool), ('normal', normal)]:
+                temps = avg_temp[mask]
+                if temps.empty:
+                    continue
+                
+                key = station_key(station_id, category)
+                
+                if top_k > 0:
+                    days = list(zip(temps.tolist(), rows['date'][mask].tolist()))
+                    yield key, (
+                        len(days), float(temps.sum()),
+                        [list(day) for day in heapq.nlargest(top_k, days)],
+                        [list(day) for day in heapq.nsmallest(top_k, days)]
+                    )
+                else:
+                    yield key, (int(temps.size), float(temps.sum()))
+    
+    def merge_values(self, values):
+        """
+        Merge partial (count, sum_temp[, hottest, coldest]) values
+        
+        Only the running totals and at most K dates per list are kept, so
+        memory does not grow with the number of days in a category.
+        
+        Args:
+            values: Iterator of partial values
             
-            if temp_min < 12:
-                categories.append('very_cool')
+        Returns:
+            Tuple (count, total_temp, hottest, coldest); the date lists are
+            empty unless --top-k is set
+        """
+        top_k = self.options.top_k
+        count = 0
+        total_temp = 0.0
+        hottest = []
+        coldest = []
+        
+        for value in values:
+            count += value[0]
+            total_temp += value[1]
             
-            # If no extreme condition, classify as normal
-            if not categories:
-                categories.append('normal')
+            if top_k > 0:
+                hottest = heapq.nlargest(
+                    top_k, hottest + [tuple(pair) for pair in value[2]])
+                coldest = heapq.nsmallest(
+                    top_k, coldest + [tuple(pair) for pair in value[3]])
+        
+        return count, total_temp, hottest, coldest
+    
+    def combiner(self, key, values):
+        """
+        Merge partial counts and sums for a category before the shuffle
+        
+        Args:
+            key: Temperature category or [station_id, category]
+            values: Iterator of partial values
             
-            # Emit each category
-            for category in categories:
-                yield category, (date_str, avg_temp, 1)
-                
-        except (ValueError, IndexError):
-            # Skip malformed lines
-            pass
+        Yields:
+            (key, (count, sum_temp[, hottest, coldest]))
+        """
+        count, total_temp, hottest, coldest = self.merge_values(values)
+        
+        if self.options.top_k > 0:
+            yield key, (count, total_temp, hottest, coldest)
+        else:
+            yield key, (count, total_temp)
     
-    def reducer(self, category, values):
+    def reducer(self, key, values):
         """
         Count extreme days by category and calculate average temperature
         
         Args:
-            category: Temperature category
-            values: Iterator of (date, avg_temp, count) tuples
+            key: Temperature category or [station_id, category]
+            values: Iterator of partial values
             
         Yields:
-            (category, (count, avg_temp))
+            (key, {["station_id",] "category", "count", "avg_temp"[, "hottest",
+                   "coldest"]})
         """
-        count = 0
-        total_temp = 0.0
-        dates = []
-        
-        # Aggregate data
-        for date, avg_temp, cnt in values:
-            count += cnt
-            total_temp += avg_temp
-            dates.append(date)
+        station_id, category = split_station_key(key)
+        count, total_temp, hottest, coldest = self.merge_values(values)
         
         # Calculate average temperature for this category
         avg_temp_for_category = round(total_temp / count, 2) if count > 0 else 0.0
         
-        # Emit result as tab-separated values
-        yield category, f"{count}\t{avg_temp_for_category}"
+        result = {
+            "category": category,
+            "count": count,
+            "avg_temp": avg_temp_for_category,
+        }
+        
+        if self.options.top_k > 0:
+            # Hottest/coldest first
+            result["hottest"] = [
+                {"date": date, "avg_temp": round(temp, 2)} for temp, date in hottest]
+            result["coldest"] = [
+                {"date": date, "avg_temp": round(temp, 2)} for temp, date in coldest]
+        
+        # Emit result as a typed record
+        yield key, station_result(station_id, result)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Incremental runs for the Weatheria MapReduce jobs
+
+Keeps each job's combined per-key state (the same mergeable partials its
+combiner produces: counts, sums, cross-products) in a _state.json file next
+to the results, together with one watermark per station holding the
+latest date already folded in for it. A run over a delta file maps and
+combines only records newer than their station's watermark, merges them
+into the stored partials with the job's own combiner, re-runs the reducer
+for the affected keys only and rewrites the results, so the cost scales
+with the new data rather than the full history.
+
+Records dated on or before their station's watermark are taken to be
+already merged (e.g. the overlap of a re-downloaded delta) and skipped;
+each run reports how many in already_merged. Stations first seen in a
+delta have no watermark, so their whole history is merged whatever the
+other stations' dates.
+
+The first run for an output directory has no state and processes whatever
+input it is given, normally the full history.
+
+Usage:
+    # Bootstrap from the full history
+    python src/mapreduce/incremental.py monthly_avg data/raw/medellin_weather_2022-2024.csv \\
+        --output-dir output/local/monthly_avg
+    
+    # Fold in a freshly downloaded delta
+    python scripts/download_data.py --start-date 2025-01-01 --end-date 2025-01-07 \\
+        --output data/raw/delta.csv
+    python src/mapreduce/incremental.py monthly_avg data/raw/delta.csv \\
+        --output-dir output/local/monthly_avg
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from local_engine import (
+    JOBS,
+    combine,
+    encode_key,
+    list_input_files,
+    make_job,
+    run_map_phase,
+    split_input,
+)
+
+
+STATE_FILE = '_state.json'
+
+
+def load_state(output_dir):
+    """
+    Read the stored state of an output directory
+    
+    Args:
+        output_dir: Directory holding the results and _state.json
+        
+    Returns:
+        State dictionary, or None if the directory has no state yet
+    """
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(output_dir, state):
+    """
+    Atomically replace the stored state of an output directory
+    
+    Args:
+        output_dir: Directory holding the results and _state.json
+        state: State dictionary
+    """
+    path = os.path.join(output_dir, STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def write_results(job, outputs, output_dir):
+    """
+    Rewrite the results of a job from its per-key reducer output
+    
+    Args:
+        job: Job instance
+        outputs: List of (key, value) in output order
+        output_dir: Directory for the part file, or the state directory of a
+            job that writes its own outputs (--analysis-output-root)
+    """
+    output_root = getattr(job.options, 'analysis_output_root', None)
+    if output_root:
+        job.write_analysis_outputs(outputs, output_root)
+        return
+    
+    for name in os.listdir(output_dir):
+        if name.startswith('part-') or name == '_SUCCESS':
+            os.remove(os.path.join(output_dir, name))
+    
+    protocol = job.output_protocol()
+    part_path = os.path.join(output_dir, 'part-00000')
+    with open(part_path + '.tmp', 'wb') as f:
+        for key, value in outputs:
+            f.write(protocol.write(key, value) + b'\n')
+    os.replace(part_path + '.tmp', part_path)
+    open(os.path.join(output_dir, '_SUCCESS'), 'w').close()
+
+
+def run_incremental(job_name, input_paths, output_dir, job_args=(), processes=None):
+    """
+    Merge new input into a job's stored state and refresh its results
+    
+    Args:
+        job_name: Job registry name or module.ClassName
+        input_paths: Delta files and/or directories (full history on the
+            first run)
+        output_dir: Directory for results and _state.json
+        job_args: Job command line arguments (must match the stored state)
+        processes: Worker processes (default: all cores)
+        
+    Returns:
+        Dictionary run summary
+        
+    Raises:
+        ValueError: If the job has no combiner or the stored state belongs
+            to a different job or job arguments
+    """
+    job_args = list(job_args)
+    job = make_job(job_name, job_args)
+    if not job.steps()[0].has_explicit_combiner:
+        raise ValueError(f"{job_name}: incremental runs need a job with a combiner")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_state(output_dir)
+    if state is None:
+        state = {'job': job_name, 'job_args': job_args, 'watermarks': {}, 'keys': []}
+    elif state['job'] != job_name or state['job_args'] != job_args:
+        raise ValueError(
+            f"{output_dir} holds state for {state['job']} {state['job_args']}, "
+            f"not {job_name} {job_args}"
+        )
+    
+    processes = processes or os.cpu_count() or 1
+    splits = split_input(list_input_files(input_paths), processes)
+    
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        new_pairs, input_lines, latest_dates, already_merged, _ = run_map_phase(
+            pool, job_name, job_args, splits, watermarks=state['watermarks'])
+    map_seconds = time.perf_counter() - start_time
+    
+    # encoded key -> {"key", "partials", "output"}
+    entries = {encode_key(entry['key']): entry for entry in state['keys']}
+    affected = {encode_key(key) for key, _ in new_pairs}
+    
+    start_time = time.perf_counter()
+    merge_input = list(new_pairs)
+    for encoded_key in affected & entries.keys():
+        entry = entries[encoded_key]
+        merge_input.extend((entry['key'], partial) for partial in entry['partials'])
+    
+    merged = {}
+    for key, partial in combine(job, merge_input):
+        merged.setdefault(encode_key(key), (key, []))[1].append(partial)
+    
+    for encoded_key, (key, partials) in merged.items():
+        output = list(job.reduce_pairs((key, partial) for partial in partials))
+        entries[encoded_key] = {'key': key, 'partials': partials, 'output': output}
+    
+    outputs = [
+        (out_key, out_value)
+        for encoded_key in sorted(entries)
+        for out_key, out_value in entries[encoded_key]['output']
+    ]
+    write_results(job, outputs, output_dir)
+    
+    # Watermarks only move forward, as skipped records never set them
+    state['watermarks'].update(latest_dates)
+    state['keys'] = [entries[encoded_key] for encoded_key in sorted(entries)]
+    save_state(output_dir, state)
+    
+    return {
+        'job': job_name,
+        'input_lines': input_lines,
+        'new_records': len(new_pairs),
+        'already_merged': already_merged,
+        'affected_keys': len(affected),
+        'total_keys': len(entries),
+        'watermarks': state['watermarks'],
+        'map_seconds': map_seconds,
+        'merge_seconds': time.perf_counter() - start_time,
+    }
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Merge new weather data into stored Weatheria job state',
+        epilog='Arguments after a -- separator are passed to the job.'
+    )
+    parser.add_argument('job', help=f"One of {', '.join(JOBS)} or module.ClassName")
+    parser.add_argument('input', nargs='+', help='Delta input files or directories')
+    parser.add_argument('--output-dir', required=True,
+                        help='Directory for results and stored state')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Worker processes (default: all cores)')
+    
+    argv = list(sys.argv[1:] if argv is None else argv)
+    job_args = []
+    if '--' in argv:
+        separator = argv.index('--')
+        argv, job_args = argv[:separator], argv[separator + 1:]
+    
+    args = parser.parse_args(argv)
+    
+    summary = run_incremental(
+        args.job,
+        args.input,
+        args.output_dir,
+        job_args=job_args,
+        processes=args.processes
+    )
+    
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+"""
+Multiprocess Local Engine for the Weatheria MapReduce jobs
+
+Runs a job on a single machine using every core. The input is cut into
+line-aligned byte ranges, each range is mapped and combined in a worker
+process with the job's own map_pairs()/combine_pairs(), and the combined
+records are spread over reduce workers, whole keys at a time, that run
+reduce_pairs() and write part-NNNNN files in the job's output protocol,
+exactly like a Hadoop run would.
+
+Usage:
+    python src/mapreduce/local_engine.py monthly_avg data/raw/test_weather_data.csv \\
+        --output-dir output/local/monthly_avg
+    
+    # Job options go after a -- separator
+    python src/mapreduce/local_engine.py weather_analyses data/raw/test_weather_data.csv \\
+        --processes 8 --output-dir output/local/fused -- --batch-mapper \\
+        --analysis-output-root output/local
+    
+    # Parquet/Arrow datasets (e.g. year=YYYY/month=MM/ partitions) are
+    # detected by file extension and read one file per map task
+    python src/mapreduce/local_engine.py monthly_avg data/raw/medellin_weather_2022-2024_parquet \
+        --output-dir output/local/monthly_avg
+    
+    # Block-gzip (bgzip) CSV is split across map tasks like plain CSV;
+    # gzip and bzip2 streams are read whole, one map task per file
+    python src/mapreduce/local_engine.py monthly_avg data/raw/medellin_weather_2022-2024.csv.bgz \
+        --output-dir output/local/monthly_avg
+"""
+
+import argparse
+import bz2
+import gzip
+import heapq
+import importlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+# Job modules import their shared modules by name, as they do on Hadoop
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bgzf import BgzfReader, is_bgzf, read_index
+from result_cache import add_cache_arguments, cache_from_args, is_job_output, source_fingerprint
+from weather_job import build_run_report, columnar_format, merge_counters, partition_in_range
+
+
+# Job name -> "module.ClassName"
+JOBS = {
+    'monthly_avg': 'monthly_avg_temp.MonthlyAvgTemperature',
+    'extreme_temps': 'extreme_temps.ExtremeTemperatures',
+    'temp_precip': 'temp_precipitation.TempPrecipitationCorrelation',
+    'rolling_window': 'rolling_window.RollingWindowStats',
+    'temp_quantiles': 'temp_quantiles.TemperatureQuantiles',
+    'temp_histograms': 'temp_histograms.TemperatureHistograms',
+    'weather_analyses': 'weather_analyses.WeatherAnalyses',
+}
+
+# Target bytes of input per map task
+DEFAULT_SPLIT_SIZE = 64 * 1024 * 1024
+
+# Buffered map output records before a map task runs its combiner
+DEFAULT_SPILL_SIZE = 200000
+
+
+def load_job_class(job_name):
+    """
+    Import a job class by registry name or "module.ClassName"
+    
+    Args:
+        job_name: Key of JOBS or a dotted module.ClassName path
+        
+    Returns:
+        MRJob subclass
+    """
+    module_name, class_name = JOBS.get(job_name, job_name).rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def list_input_files(input_paths):
+    """
+    Expand input paths into data files (directories are read recursively)
+    
+    Files whose name starts with '_' or '.' (e.g. _SUCCESS) are skipped, as
+    Hadoop does, and so are bgzip .gzi index files.
+    
+    Args:
+        input_paths: List of files and directories
+        
+    Returns:
+        Sorted list of file paths
+    """
+    files = []
+    for path in input_paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+                files.extend(
+                    os.path.join(root, name) for name in names
+                    if not name.startswith(('_', '.')) and not name.endswith('.gzi')
+                )
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def split_input(input_files, num_splits, split_size=DEFAULT_SPLIT_SIZE):
+    """
+    Cut input files into byte ranges for map tasks
+    
+    Each file gets at least one range and large files are cut so that there
+    are at least num_splits ranges overall and none is larger than
+    split_size. Ranges are not line aligned; iter_range_lines() aligns them.
+    Block-gzip (BGZF) files are cut like plain files, in uncompressed
+    offsets. Parquet and Arrow files, and gzip/bzip2 streams, which can
+    only be read from the start, are read whole, one range per file.
+    
+    Args:
+        input_files: List of file paths
+        num_splits: Minimum number of ranges to aim for
+        split_size: Maximum bytes per range
+        
+    Returns:
+        List of (path, start, end) tuples
+    """
+    sizes = [(path, input_size(path)) for path in input_files]
+    total_size = sum(size for _, size in sizes) or 1
+    
+    splits = []
+    for path, size in sizes:
+        if columnar_format(path) or is_stream_compressed(path):
+            splits.append((path, 0, size))
+            continue
+        
+        pieces = max(1, -(-size // split_size), round(num_splits * size / total_size))
+        bounds = [size * i // pieces for i in range(pieces + 1)]
+        splits.extend(
+            (path, start, end) for start, end in zip(bounds, bounds[1:])
+            if end > start or size == 0
+        )
+    return splits
+
+
+def is_stream_compressed(path):
+    """
+    Check for gzip/bzip2 input that must be read from its start
+    
+    Args:
+        path: File path
+        
+    Returns:
+        True for .gz files that are not BGZF and for .bz2 files
+    """
+    if path.endswith('.bz2'):
+        return True
+    return path.endswith(('.gz', '.bgz')) and not is_bgzf(path)
+
+
+def input_size(path):
+    """
+    Size of an input file in the offsets its ranges are cut in
+    
+    Args:
+        path: File path
+        
+    Returns:
+        Uncompressed size for BGZF files, file size otherwise
+    """
+    if path.endswith(('.gz', '.bgz')) and is_bgzf(path):
+        return read_index(path)[1]
+    return os.path.getsize(path)
+
+
+def open_input(path):
+    """
+    Open an input file for reading lines as bytes
+    
+    Args:
+        path: File path
+        
+    Returns:
+        Binary file object; BGZF files are seekable in uncompressed offsets
+    """
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith(('.gz', '.bgz')):
+        return BgzfReader(path) if is_bgzf(path) else gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_range_lines(path, start, end):
+    """
+    Read the lines of a file that start inside [start, end)
+    
+    A line that crosses a range boundary belongs to the range in which it
+    starts, so consecutive ranges see every line exactly once. Compressed
+    streams that cannot be split are read to their end.
+    
+    Args:
+        path: File path
+        start: First byte offset (uncompressed for BGZF)
+        end: End byte offset (exclusive)
+        
+    Yields:
+        Lines without trailing newline
+    """
+    if is_stream_compressed(path):
+        end = float('inf')
+    
+    with open_input(path) as f:
+        if start > 0:
+            # Skip the rest of the line that started in the previous range
+            f.seek(start - 1)
+            f.readline()
+        
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.rstrip(b'\r\n').decode('utf-8')
+
+
+def encode_key(key):
+    """Stable text form of a key, used for sorting, grouping and partitioning"""
+    return json.dumps(key, sort_keys=True)
+
+
+def assign_partitions(pairs, num_partitions):
+    """
+    Spread combined records over reduce partitions, whole keys at a time
+    
+    Keys are placed largest first on the least loaded partition, so the
+    reducers stay balanced when there are few keys or a few heavy ones,
+    where hashing can pile several large (station, month) groups onto the
+    same reducer. Ties are broken by key, so the assignment is deterministic.
+    
+    Args:
+        pairs: Iterable of combined (key, value)
+        num_partitions: Number of reduce partitions
+        
+    Returns:
+        List of per-partition (key, value) lists
+    """
+    groups = defaultdict(list)
+    for key, value in pairs:
+        groups[encode_key(key)].append((key, value))
+    
+    partitions = [[] for _ in range(num_partitions)]
+    loads = [(0, index) for index in range(num_partitions)]
+    
+    for encoded_key in sorted(groups, key=lambda k: (-len(groups[k]), k)):
+        load, index = heapq.heappop(loads)
+        partitions[index].extend(groups[encoded_key])
+        heapq.heappush(loads, (load + len(groups[encoded_key]), index))
+    
+    return partitions
+
+
+def sort_pairs(pairs, sort_values=False):
+    """
+    Sort (key, value) pairs the way the shuffle does
+    
+    Args:
+        pairs: Iterable of (key, value)
+        sort_values: Also order values within a key (mrjob SORT_VALUES)
+        
+    Returns:
+        Sorted list of (key, value)
+    """
+    if sort_values:
+        return sorted(pairs, key=lambda pair: (encode_key(pair[0]), encode_key(pair[1])))
+    return sorted(pairs, key=lambda pair: encode_key(pair[0]))
+
+
+def combine(job, pairs):
+    """
+    Run the job's combiner over a batch of map output
+    
+    Args:
+        job: Job instance
+        pairs: Iterable of (key, value)
+        
+    Returns:
+        List of combined (key, value)
+    """
+    if not job.steps()[0].has_explicit_combiner:
+        return list(pairs)
+    return list(job.combine_pairs(sort_pairs(pairs)))
+
+
+def make_job(job_name, job_args):
+    """
+    Instantiate a job and check that the engine can run it
+    
+    Args:
+        job_name: Job registry name or module.ClassName
+        job_args: Job command line arguments
+        
+    Returns:
+        Job instance
+    """
+    job = load_job_class(job_name)(list(job_args))
+    if len(job.steps()) != 1:
+        raise ValueError(f"{job_name}: the local engine runs single-step jobs only")
+    return job
+
+
+def iter_raw_mapper(job, path):
+    """
+    Run a job's mapper_raw over a whole input file
+    
+    Args:
+        job: Job instance configured for columnar input
+        path: Input file
+        
+    Yields:
+        (key, value) pairs from mapper_init, mapper_raw and mapper_final
+    """
+    functions = job.mapper_step_kwargs()
+    for name, args in [('mapper_init', ()), ('mapper_raw', (path, path)), ('mapper_final', ())]:
+        function = functions.get(name)
+        if function is not None:
+            yield from function(*args) or ()
+
+
+def line_station(line):
+    """
+    Station of a CSV line, for per-station watermarks
+    
+    Args:
+        line: CSV line
+        
+    Returns:
+        station_id column, or '' for single-station input
+    """
+    parts = line.split(',', 5)
+    return parts[4].strip() if len(parts) > 4 else ''
+
+
+def run_map_task(job_name, job_args, path, start, end, watermarks=None,
+                 spill_size=DEFAULT_SPILL_SIZE):
+    """
+    Map and combine one byte range of input (runs in a worker process)
+    
+    Args:
+        job_name: Job registry name or module.ClassName
+        job_args: Job command line arguments
+        path: Input file
+        start: First byte offset
+        end: End byte offset (exclusive)
+        watermarks: For incremental runs, dictionary station_id ('' for
+            single-station input) -> latest YYYY-MM-DD date already merged;
+            records dated on or before their station's watermark are skipped
+        spill_size: Map output records buffered before combining
+        
+    Returns:
+        Tuple (combined (key, value) list, input line count, dictionary
+        station_id -> latest record date (incremental runs only), number of
+        records skipped as already merged, task counters
+        {group: {name: amount}})
+    """
+    job = make_job(job_name, job_args)
+    
+    # Counters are collected from the job below, not from its stderr
+    job.sandbox()
+    
+    line_count = 0
+    latest_dates = {}
+    already_merged = 0
+    
+    def input_pairs():
+        nonlocal line_count, already_merged
+        for line in iter_range_lines(path, start, end):
+            line_count += 1
+            
+            # Lines without a leading date are left for the job to reject
+            date = line[:10]
+            if watermarks is not None and date[4:5] == '-' and date[:4].isdigit():
+                station_id = line_station(line)
+                watermark = watermarks.get(station_id)
+                if watermark is not None and date <= watermark:
+                    already_merged += 1
+                    continue
+                if date > latest_dates.get(station_id, ''):
+                    latest_dates[station_id] = date
+            
+            yield None, line
+    
+    if columnar_format(path):
+        if watermarks is not None:
+            raise ValueError(f"{path}: incremental runs need text input")
+        map_output = iter_raw_mapper(job, path)
+    else:
+        map_output = job.map_pairs(input_pairs())
+    
+    # Combine whenever spill_size new records have been buffered, like a
+    # Hadoop map-side spill; without a combiner there is nothing to spill
+    if not job.steps()[0].has_explicit_combiner:
+        spill_size = float('inf')
+    
+    buffered = []
+    threshold = spill_size
+    for pair in map_output:
+        buffered.append(pair)
+        if len(buffered) >= threshold:
+            buffered = combine(job, buffered)
+            threshold = len(buffered) + spill_size
+    buffered = combine(job, buffered)
+    
+    task_counters = getattr(job, 'task_counters', None)
+    counters = task_counters.as_dict() if task_counters is not None else {}
+    
+    if columnar_format(path):
+        line_count = task_counters.total_lines
+    
+    return buffered, line_count, latest_dates, already_merged, counters
+
+
+def run_map_phase(pool, job_name, job_args, splits, watermarks=None):
+    """
+    Map and combine all input splits on a process pool
+    
+    Args:
+        pool: ProcessPoolExecutor
+        job_name: Job registry name or module.ClassName
+        job_args: Job command line arguments
+        splits: List of (path, start, end) from split_input()
+        watermarks: Per-station watermarks of an incremental run (see
+            run_map_task())
+        
+    Returns:
+        Tuple (combined (key, value) list, input line count, dictionary
+        station_id -> latest record date, number of records skipped as
+        already merged, list of (task line count, task counters))
+    """
+    futures = [
+        pool.submit(run_map_task, job_name, job_args, path, start, end, watermarks)
+        for path, start, end in splits
+    ]
+    
+    pairs = []
+    input_lines = 0
+    latest_dates = {}
+    already_merged = 0
+    tasks = []
+    for future in futures:
+        task_pairs, line_count, task_dates, task_merged, counters = future.result()
+        tasks.append((line_count, counters))
+        input_lines += line_count
+        already_merged += task_merged
+        for station_id, date in task_dates.items():
+            if date > latest_dates.get(station_id, ''):
+                latest_dates[station_id] = date
+        pairs.extend(task_pairs)
+    
+    return pairs, input_lines, latest_dates, already_merged, tasks
+
+
+def run_reduce_task(job_name, job_args, pairs, output_path):
+    """
+    Reduce one partition (runs in a worker process)
+    
+    Args:
+        job_name: Job registry name or module.ClassName
+        job_args: Job command line arguments
+        pairs: List of combined (key, value) for this partition
+        output_path: Part file to write, or None to return the output instead
+        
+    Returns:
+        List of (key, value) output pairs if output_path is None, otherwise
+        the number of records written
+    """
+    job = make_job(job_name, job_args)
+    sorted_pairs = sort_pairs(pairs, sort_values=getattr(job, 'SORT_VALUES', False))
+    
+    if job.steps()[0].has_explicit_reducer:
+        output = job.reduce_pairs(sorted_pairs)
+    else:
+        output = iter(sorted_pairs)
+    
+    if output_path is None:
+        return list(output)
+    
+    protocol = job.output_protocol()
+    count = 0
+    with open(output_path, 'wb') as f:
+        for key, value in output:
+            f.write(protocol.write(key, value) + b'\n')
+            count += 1
+    return count
+
+
+def run_local(job_name, input_paths, output_dir, job_args=(), processes=None,
+              num_reducers=None, split_size=DEFAULT_SPLIT_SIZE, cache=None, mp_context=None):
+    """
+    Run a job over local input with a process pool
+    
+    Args:
+        job_name: Job registry name or module.ClassName
+        input_paths: Input files and/or directories
+        output_dir: Directory for part-NNNNN files
+        job_args: Job command line arguments (e.g. ['--top-k', '5'])
+        processes: Worker processes (default: all cores)
+        num_reducers: Reduce partitions (default: same as processes)
+        split_size: Maximum bytes per map task
+        cache: ResultCache; an output of an earlier run over the same
+            input contents, job code and job arguments is copied to
+            output_dir instead of running the job
+        mp_context: multiprocessing context of the worker pool (default:
+            the platform's); callers running jobs from threads should pass
+            a 'forkserver' or 'spawn' context, as forking a threaded
+            process can deadlock the workers
+        
+    Returns:
+        Dictionary run summary with task counts, per-phase timings, the
+        line count of every map task and the job's run report, and with
+        a cache, "cache": "hit" or "miss" (a hit returns the summary of
+        the run that produced the output)
+    """
+    job_args = list(job_args)
+    input_files = list_input_files(input_paths)
+    
+    # Parquet/Arrow input is read by the jobs' mapper_raw
+    formats = {columnar_format(path) or 'csv' for path in input_files}
+    if len(formats) > 1:
+        raise ValueError(f"Mixed input formats: {', '.join(sorted(formats))}")
+    columnar = formats - {'csv'}
+    if columnar and '--input-format' not in job_args:
+        job_args += ['--input-format', columnar.pop()]
+    
+    job = make_job(job_name, job_args)
+    
+    # Skip whole year=YYYY/month=MM partitions outside the job's date range
+    start_date = getattr(job.options, 'start_date', None)
+    end_date = getattr(job.options, 'end_date', None)
+    if start_date is not None or end_date is not None:
+        input_files = [path for path in input_files
+                       if partition_in_range(path, start_date, end_date)]
+        if not input_files:
+            raise ValueError('No input partitions in the date range')
+    
+    # Jobs that split their output into several directories are not cached
+    split_outputs = getattr(job.options, 'analysis_output_root', None)
+    cache_key = None
+    if cache is not None and not split_outputs:
+        cache_key = cache.key(input_files, job_name, source_fingerprint(type(job)), job_args)
+        entry = cache.fetch(cache_key, output_dir)
+        if entry is not None:
+            return dict(entry['metadata'], cache='hit')
+    
+    processes = processes or os.cpu_count() or 1
+    num_reducers = num_reducers or processes
+    
+    splits = split_input(input_files, processes, split_size)
+    
+    summary = {
+        'job': job_name,
+        'map_tasks': len(splits),
+        'reduce_tasks': num_reducers,
+        'processes': processes,
+    }
+    
+    with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context) as pool:
+        # Map phase
+        start_time = time.perf_counter()
+        pairs, input_lines, _, _, tasks = run_map_phase(pool, job_name, job_args, splits)
+        
+        summary['input_lines'] = input_lines
+        summary['map_task_lines'] = [line_count for line_count, _ in tasks]
+        summary['shuffle_records'] = len(pairs)
+        summary['map_seconds'] = time.perf_counter() - start_time
+        
+        # +1 for the newline separating records in the shuffle
+        protocol = job.internal_protocol()
+        summary['shuffle_bytes'] = sum(len(protocol.write(key, value)) + 1 for key, value in pairs)
+        
+        partitions = assign_partitions(pairs, num_reducers)
+        
+        # Reduce phase
+        start_time = time.perf_counter()
+        
+        if not split_outputs:
+            os.makedirs(output_dir, exist_ok=True)
+            for name in os.listdir(output_dir):
+                if is_job_output(name):
+                    os.remove(os.path.join(output_dir, name))
+        
+        reduce_futures = [
+            pool.submit(
+                run_reduce_task, job_name, job_args, pairs,
+                None if split_outputs else os.path.join(output_dir, f'part-{index:05d}')
+            )
+            for index, pairs in enumerate(partitions)
+        ]
+        results = [future.result() for future in reduce_futures]
+        
+        if split_outputs:
+            # e.g. WeatherAnalyses: one directory per analysis
+            job.write_analysis_outputs(
+                (pair for output in results for pair in output), split_outputs)
+            summary['output_records'] = sum(len(output) for output in results)
+        else:
+            open(os.path.join(output_dir, '_SUCCESS'), 'w').close()
+            summary['output_records'] = sum(results)
+        
+        summary['reduce_seconds'] = time.perf_counter() - start_time
+    
+    summary['report'] = build_run_report(
+        job_name, merge_counters(counters for _, counters in tasks))
+    
+    if cache_key is not None:
+        cache.store(cache_key, output_dir, summary)
+        summary['cache'] = 'miss'
+    
+    return summary
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Run a Weatheria MapReduce job on all local cores',
+        epilog='Arguments after a -- separator are passed to the job.'
+    )
+    parser.add_argument('job', help=f"One of {', '.join(JOBS)} or module.ClassName")
+    parser.add_argument('input', nargs='+', help='Input files or directories')
+    parser.add_argument('--output-dir', required=True, help='Directory for part files')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Worker processes (default: all cores)')
+    parser.add_argument('--reducers', type=int, default=None,
+                        help='Reduce partitions (default: --processes)')
+    parser.add_argument('--split-size-mb', type=int, default=DEFAULT_SPLIT_SIZE // (1024 * 1024),
+                        help='Maximum MB of input per map task (default: 64)')
+    add_cache_arguments(parser)
+    
+    argv = list(sys.argv[1:] if argv is None else argv)
+    job_args = []
+    if '--' in argv:
+        separator = argv.index('--')
+        argv, job_args = argv[:separator], argv[separator + 1:]
+    
+    args = parser.parse_args(argv)
+    
+    summary = run_local(
+        args.job,
+        args.input,
+        args.output_dir,
+        job_args=job_args,
+        processes=args.processes,
+        num_reducers=args.reducers,
+        split_size=args.split_size_mb * 1024 * 1024,
+        cache=cache_from_args(args)
+    )
+    
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,79 +7,184 @@ Usage:
     # Local mode
     python src/mapreduce/monthly_avg_temp.py data/raw/test_weather_data.csv
     
+    # Local mode with in-mapper aggregation (one record per month per map task)
+    python src/mapreduce/monthly_avg_temp.py --in-mapper-combine data/raw/test_weather_data.csv
+    
+    # Local mode, parsing and aggregating input in vectorized blocks
+    python src/mapreduce/monthly_avg_temp.py --batch-mapper data/raw/test_weather_data.csv
+    
     # Hadoop mode
     python src/mapreduce/monthly_avg_temp.py -r hadoop hdfs:///input/weather_data.csv
 """
 
-from mrjob.job import MRJob
 from mrjob.step import MRStep
-from datetime import datetime
 
+from weather_job import (
+    WeatherJob,
+    format_month_key,
+    split_station_key,
+    station_key,
+    station_result,
+)
 
-class MonthlyAvgTemperature(MRJob):
+
+class MonthlyAvgTemperature(WeatherJob):
     """
     MapReduce job to calculate monthly average temperatures
     
-    Input: CSV with date, temp_max, temp_min, precipitation
-    Output: year-month\tavg_temp_max\tavg_temp_min
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: JSON lines {["station_id",] "month", "avg_max", "avg_min"}
+    
+    Intermediate values are additive (sum_max, sum_min, count) partials, so
+    the same function serves as combiner and as the first half of the reducer.
     """
     
+    def configure_args(self):
+        """Register job-specific command line options"""
+        super(MonthlyAvgTemperature, self).configure_args()
+        self.add_passthru_arg(
+            '--in-mapper-combine',
+            action='store_true',
+            default=False,
+            help='Hold per-month partial sums in the mapper and emit them '
+                 'once per map task instead of one record per input line '
+                 '(CSV input, line-at-a-time mapper only: --batch-mapper and '
+                 'columnar input already emit per-block partial sums)'
+        )
+    
+    def __init__(self, *args, **kwargs):
+        super(MonthlyAvgTemperature, self).__init__(*args, **kwargs)
+        
+        if self.options.in_mapper_combine and (
+                self.options.batch_mapper or self.options.input_format != 'csv'):
+            raise ValueError('--in-mapper-combine cannot be combined with --batch-mapper '
+                             'or --input-format parquet|arrow')
+    
+    def mapper_functions(self):
+        """Mapper functions for the MRStep, honoring --in-mapper-combine"""
+        if self.options.in_mapper_combine:
+            return dict(
+                mapper_init=self.mapper_init,
+                mapper=self.mapper_aggregate,
+                mapper_final=self.mapper_final
+            )
+        return super(MonthlyAvgTemperature, self).mapper_functions()
+    
     def steps(self):
         """Define the MapReduce steps"""
         return [
             MRStep(
-                mapper=self.mapper,
-                reducer=self.reducer
+                combiner=self.combiner,
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
             )
         ]
     
-    def mapper(self, _, line):
+    def map_record(self, record):
         """
-        Parse CSV line and emit (year-month, (temp_max, temp_min, 1))
+        Emit (year-month, (temp_max, temp_min, 1)) for a parsed record
         
         Args:
-            _: Line number (ignored)
-            line: CSV line
+            record: WeatherRecord
             
         Yields:
-            (year_month, (temp_max, temp_min, 1))
+            (year_month or (station_id, year_month), (temp_max, temp_min, 1))
         """
-        # Skip header line
-        if line.startswith('date'):
+        if record.year_month is None:
             return
         
-        try:
-            # Parse CSV line
-            parts = line.strip().split(',')
-            if len(parts) < 3:
-                return
-            
-            date_str = parts[0]
-            temp_max = float(parts[1])
-            temp_min = float(parts[2])
-            
-            # Extract year-month
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            year_month = date_obj.strftime('%Y-%m')
+        # Emit (year_month, (temp_max, temp_min, count))
+        key = station_key(record.station_id, record.year_month)
+        yield key, (record.temp_max, record.temp_min, 1)
+    
+    def map_frame(self, frame):
+        """
+        Emit per-month partial sums for a block of parsed rows
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
             
-            # Emit (year_month, (temp_max, temp_min, count))
-            yield year_month, (temp_max, temp_min, 1)
+        Yields:
+            (year_month or (station_id, year_month),
+             (sum_temp_max, sum_temp_min, count))
+        """
+        grouped = frame.groupby(['station_id', 'month_key']).agg(
+            sum_max=('temp_max', 'sum'),
+            sum_min=('temp_min', 'sum'),
+            count=('temp_max', 'size')
+        )
+        
+        for (station_id, month_key), sum_max, sum_min, count in grouped.itertuples():
+            key = station_key(station_id, format_month_key(month_key))
+            yield key, (float(sum_max), float(sum_min), int(count))
+    
+    def mapper_init(self):
+        """Start an empty per-month partial sum table for this map task"""
+        self.partials = {}
+    
+    def mapper_aggregate(self, _, line):
+        """
+        Fold a CSV line into the per-month partial sums (emits nothing)
+        
+        Args:
+            _: Line number (ignored)
+            line: CSV line
+        """
+        for key, (temp_max, temp_min, count) in self.mapper(_, line):
+            partial = self.partials.get(key)
+            if partial is None:
+                self.partials[key] = [temp_max, temp_min, count]
+            else:
+                partial[0] += temp_max
+                partial[1] += temp_min
+                partial[2] += count
+    
+    def mapper_final(self):
+        """
+        Emit one partial sum per month seen by this map task
+        
+        Yields:
+            (key, (sum_temp_max, sum_temp_min, count))
+        """
+        for key, (total_max, total_min, count) in self.partials.items():
+            yield key, (total_max, total_min, count)
+    
+    def combiner(self, key, values):
+        """
+        Merge partial sums for a month before the shuffle
+        
+        Args:
+            key: Year-month string (e.g., "2022-01") or [station_id, year_month]
+            values: Iterator of (sum_temp_max, sum_temp_min, count) tuples
             
-        except (ValueError, IndexError) as e:
-            # Skip malformed lines
-            pass
+        Yields:
+            (key, (sum_temp_max, sum_temp_min, count))
+        """
+        total_max = 0.0
+        total_min = 0.0
+        count = 0
+        
+        for temp_max, temp_min, cnt in values:
+            total_max += temp_max
+            total_min += temp_min
+            count += cnt
+        
+        yield key, (total_max, total_min, count)
     
-    def reducer(self, year_month, values):
+    def reducer(self, key, values):
         """
         Calculate average temperatures for each month
         
         Args:
-            year_month: Year-month string (e.g., "2022-01")
-            values: Iterator of (temp_max, temp_min, count) tuples
+            key: Year-month string (e.g., "2022-01") or [station_id, year_month]
+            values: Iterator of (temp_max, temp_min, count) tuples, either raw
+                readings or partial sums from the combiner
             
         Yields:
-            (year_month, (avg_temp_max, avg_temp_min))
+            (key, {["station_id",] "month", "avg_max", "avg_min"})
         """
+        station_id, year_month = split_station_key(key)
+        
         total_max = 0.0
         total_min = 0.0
         count = 0
@@ -95,8 +200,12 @@ class MonthlyAvgTemperature(MRJob):
             avg_max = round(total_max / count, 2)
             avg_min = round(total_min / count, 2)
             
-            # Emit result as tab-separated values
-            yield year_month, f"{avg_max}\t{avg_min}"
+            # Emit result as a typed record
+            yield key, station_result(station_id, {
+                "month": year_month,
+                "avg_max": avg_max,
+                "avg_min": avg_min,
+            })
 
 
 if __name__ == '__main__':
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Compact internal protocol for the Weatheria MapReduce jobs
+
+PackedValueProtocol keeps the key as JSON (so Hadoop still groups and sorts
+on a stable text key) but writes flat numeric values as typed binary fields,
+typedbytes-style: one type byte per field followed by a zigzag varint for
+ints and for floats with a short decimal form (readings such as 28.5), or by
+8 little-endian float64 bytes for any other float. Newline, carriage return
+and backslash bytes are backslash-escaped so the record stays a single line.
+
+Values that are not flat tuples of numbers (e.g. the --top-k date lists of
+ExtremeTemperatures) are written as plain JSON, which never starts with a
+type byte.
+"""
+
+import json
+import math
+import re
+import struct
+
+
+# Field type bytes; all below 0x20 so a packed value never looks like JSON
+INT_FIELD = 0x01
+FLOAT_FIELD = 0x02
+# DECIMAL_FIELD + d: float equal to varint / 10**d, for d in 0..4
+DECIMAL_FIELD = 0x03
+DECIMAL_SCALES = (1, 10, 100, 1000, 10000)
+
+# Decimal fields keep the scaled value within float64's exact integers
+MAX_DECIMAL = 2 ** 53
+
+ESCAPES = {b'\\': b'\\\\', b'\n': b'\\n', b'\r': b'\\r'}
+UNESCAPES = {b'\\': b'\\', b'n': b'\n', b'r': b'\r'}
+ESCAPED_BYTE = re.compile(rb'\\(.)', re.DOTALL)
+
+
+class PackedValueProtocol(object):
+    """
+    Encode (key, value) as ``<json key>\\t<typed fields>``
+    
+    Example: ('2022-01', (775.3, 501.2, 31)) is written as
+    ``"2022-01"\\t`` followed by 10 bytes (three type bytes and the varints
+    of 7753, 5012 and 31) instead of ``[775.3, 501.2, 31]``. Integers
+    round-trip as ints and floats round-trip bit-exactly.
+    """
+    
+    def read(self, line):
+        """
+        Decode a line into (key, value)
+        
+        Args:
+            line: Encoded line (bytes, without trailing newline)
+            
+        Returns:
+            Tuple (key, value)
+        """
+        raw_key, raw_value = line.split(b'\t', 1)
+        key = json.loads(raw_key)
+        
+        if not raw_value or raw_value[0] >= 0x20:
+            return key, json.loads(raw_value)
+        
+        if b'\\' in raw_value:
+            raw_value = ESCAPED_BYTE.sub(lambda match: UNESCAPES[match.group(1)], raw_value)
+        
+        return key, self._unpack(raw_value)
+    
+    def write(self, key, value):
+        """
+        Encode (key, value) into a line
+        
+        Args:
+            key: JSON-serializable key
+            value: Tuple/list of ints and floats, or any JSON-serializable value
+            
+        Returns:
+            Encoded line (bytes, without trailing newline)
+        """
+        raw_key = json.dumps(key).encode('utf-8')
+        payload = self._pack(value)
+        
+        if payload is None:
+            return raw_key + b'\t' + json.dumps(value).encode('utf-8')
+        
+        for byte, escaped in ESCAPES.items():
+            if byte in payload:
+                payload = payload.replace(byte, escaped)
+        return raw_key + b'\t' + payload
+    
+    @staticmethod
+    def _pack(value):
+        """
+        Pack a flat numeric tuple into typed fields
+        
+        Args:
+            value: Value to encode
+            
+        Returns:
+            Unescaped payload, or None if the value cannot be packed
+        """
+        if not isinstance(value, (tuple, list)) or not value:
+            return None
+        
+        payload = bytearray()
+        for item in value:
+            # bool is an int subclass but would not round-trip as bool
+            if isinstance(item, bool):
+                return None
+            if isinstance(item, int):
+                payload.append(INT_FIELD)
+                _append_varint(payload, item)
+            elif isinstance(item, float):
+                _append_float(payload, item)
+            else:
+                return None
+        
+        return bytes(payload)
+    
+    @staticmethod
+    def _unpack(payload):
+        """
+        Unpack typed fields into a tuple
+        
+        Args:
+            payload: Unescaped payload
+            
+        Returns:
+            Tuple of ints and floats
+        """
+        items = []
+        position = 0
+        
+        while position < len(payload):
+            field = payload[position]
+            position += 1
+            
+            if field == FLOAT_FIELD:
+                items.append(struct.unpack_from('<d', payload, position)[0])
+                position += 8
+                continue
+            
+            number = shift = 0
+            while True:
+                byte = payload[position]
+                position += 1
+                number |= (byte & 0x7f) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            number = (number >> 1) ^ -(number & 1)
+            
+            if field == INT_FIELD:
+                items.append(number)
+            else:
+                items.append(number / DECIMAL_SCALES[field - DECIMAL_FIELD])
+        
+        return tuple(items)
+
+
+def _append_varint(payload, number):
+    """Append a signed int as a zigzag LEB128 varint"""
+    number = number * 2 if number >= 0 else -number * 2 - 1
+    while number >= 0x80:
+        payload.append(number & 0x7f | 0x80)
+        number >>= 7
+    payload.append(number)
+
+
+def _append_float(payload, number):
+    """Append a float as the shortest exact decimal field, or as float64"""
+    if abs(number) < MAX_DECIMAL and (number or math.copysign(1.0, number) > 0):
+        for places, scale in enumerate(DECIMAL_SCALES):
+            scaled = round(number * scale)
+            if abs(scaled) < MAX_DECIMAL and scaled / scale == number:
+                payload.append(DECIMAL_FIELD + places)
+                _append_varint(payload, scaled)
+                return
+    
+    payload.append(FLOAT_FIELD)
+    payload += struct.pack('<d', number)
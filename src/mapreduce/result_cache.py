@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of Weatheria job outputs
+
+A run is identified by the SHA-256 of its input files' contents, the job
+(name or class), a fingerprint of the job's code and its arguments. When
+all of these match an earlier run, the stored output is copied back instead
+of recomputing it. Input digests are remembered per (path, size, mtime), so
+an unchanged file is hashed only once.
+
+Entries are evicted least recently used first, beyond a number of entries
+or a total size, and once older than a maximum age. Hits, misses, stores
+and evictions are counted in stats.json in the cache directory.
+
+Several runs may share a cache directory: JSON files are replaced
+atomically (temporary file + rename), and read-modify-write updates of
+stats.json and digests.json hold an exclusive lock on its .lock file.
+
+Usage:
+    python src/mapreduce/local_engine.py monthly_avg data/raw/medellin_weather_2022-2024.csv \\
+        --output-dir output/local/monthly_avg --cache-dir .cache/results
+"""
+
+import fcntl
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+# Bytes hashed per read
+CHUNK_SIZE = 1024 * 1024
+
+DIGESTS_FILE = 'digests.json'
+STATS_FILE = 'stats.json'
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+OUTPUT_NAME = 'output'
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's contents
+    
+    Args:
+        path: File path
+        
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(*objects):
+    """
+    Fingerprint of the code of classes or functions
+    
+    For a class, the source files of every class in its MRO outside the
+    standard library and site-packages are hashed, plus the shared modules
+    it lists in FILES (e.g. weather_job.py), so an edit to a base job or a
+    shared module changes the fingerprint too.
+    
+    Args:
+        *objects: Job classes or functions
+        
+    Returns:
+        Hex digest
+    """
+    paths = set()
+    sources = []
+    for obj in objects:
+        if not inspect.isclass(obj):
+            sources.append(inspect.getsource(obj))
+            continue
+        
+        for cls in obj.__mro__:
+            module = sys.modules.get(cls.__module__)
+            path = getattr(module, '__file__', None)
+            if path and 'site-packages' not in path and not path.startswith(sys.base_prefix):
+                paths.add(os.path.abspath(path))
+        
+        for path in list(paths):
+            for name in getattr(obj, 'FILES', ()):
+                shared = os.path.join(os.path.dirname(path), name)
+                if os.path.exists(shared):
+                    paths.add(os.path.abspath(shared))
+    
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        digest.update(file_digest(path).encode('ascii'))
+    for source in sources:
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """
+    Replace a JSON file so that readers see the old or the new contents
+    
+    Args:
+        path: JSON file path
+        data: JSON-serializable data
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def output_size(path):
+    """Total bytes of a file or directory tree"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def is_job_output(name):
+    """Whether a file name is a job output file (part-* or _SUCCESS)"""
+    return name.startswith('part-') or name == '_SUCCESS'
+
+
+def replace_file(source, destination):
+    """Copy a file over another through a temporary name and a rename"""
+    directory = os.path.dirname(destination) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(destination)}.')
+    os.close(fd)
+    shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def copy_output(source, destination):
+    """
+    Replace a job output file, or the job output files of a directory
+    
+    For a directory only the part-* and _SUCCESS files are copied: each is
+    replaced atomically, part files the source does not have are removed,
+    and _SUCCESS is removed first and written last. Other files of the
+    destination directory are left alone.
+    
+    Args:
+        source: File or directory to copy
+        destination: File or directory to update
+    """
+    if os.path.dirname(destination):
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+    
+    if not os.path.isdir(source):
+        replace_file(source, destination)
+        return
+    
+    os.makedirs(destination, exist_ok=True)
+    names = sorted(name for name in os.listdir(source) if is_job_output(name))
+    
+    if os.path.exists(os.path.join(destination, '_SUCCESS')):
+        os.remove(os.path.join(destination, '_SUCCESS'))
+    
+    for name in names:
+        if name != '_SUCCESS':
+            replace_file(os.path.join(source, name), os.path.join(destination, name))
+    
+    for name in os.listdir(destination):
+        if is_job_output(name) and name not in names:
+            os.remove(os.path.join(destination, name))
+    
+    if '_SUCCESS' in names:
+        replace_file(os.path.join(source, '_SUCCESS'), os.path.join(destination, '_SUCCESS'))
+
+
+class ResultCache(object):
+    """
+    Directory of cached job outputs with LRU/age eviction
+    
+    Args:
+        cache_dir: Cache directory
+        max_entries: Entries kept (default: unlimited)
+        max_bytes: Total bytes of stored outputs kept (default: unlimited)
+        max_age: Seconds an entry is kept after it was stored (default:
+            unlimited)
+    """
+    
+    def __init__(self, cache_dir, max_entries=None, max_bytes=None, max_age=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def read_json(self, name, default):
+        """Read a JSON file of the cache directory"""
+        path = os.path.join(self.cache_dir, name)
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return json.load(f)
+    
+    def write_json(self, name, data):
+        """Atomically replace a JSON file of the cache directory"""
+        write_json_atomic(os.path.join(self.cache_dir, name), data)
+    
+    @contextmanager
+    def locked(self):
+        """Hold the cache directory's lock, shared with other processes"""
+        with open(os.path.join(self.cache_dir, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def input_digests(self, paths):
+        """
+        Content digests of input files, hashing only new or changed files
+        
+        Args:
+            paths: Input file paths
+            
+        Returns:
+            List of hex digests, in the order of paths
+        """
+        known = self.read_json(DIGESTS_FILE, {})
+        digests = []
+        updates = {}
+        
+        for path in paths:
+            stat = os.stat(path)
+            absolute = os.path.abspath(path)
+            entry = known.get(absolute)
+            if entry is None or entry[:2] != [stat.st_size, stat.st_mtime_ns]:
+                entry = [stat.st_size, stat.st_mtime_ns, file_digest(path)]
+                updates[absolute] = entry
+            digests.append(entry[2])
+        
+        # Hash outside the lock; merge into the digests other runs stored meanwhile
+        if updates:
+            with self.locked():
+                known = self.read_json(DIGESTS_FILE, {})
+                known.update(updates)
+                self.write_json(DIGESTS_FILE, known)
+        return digests
+    
+    def key(self, input_paths, job, fingerprint, args=()):
+        """
+        Cache key of a run
+        
+        Args:
+            input_paths: Input file paths
+            job: Job name or class path
+            fingerprint: Job code fingerprint (source_fingerprint())
+            args: Job arguments that change its output
+            
+        Returns:
+            Hex key
+        """
+        identity = {
+            'inputs': sorted(self.input_digests(input_paths)),
+            'job': job,
+            'fingerprint': fingerprint,
+            'args': list(args),
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def entries(self):
+        """
+        Metadata of every stored entry
+        
+        Returns:
+            Dictionary key -> metadata
+        """
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            # Skip entries still being staged by another run
+            if name.startswith('.'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name, META_FILE)
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    entries[name] = json.load(f)
+        return entries
+    
+    def count(self, event, amount=1):
+        """Add to a hit/miss/store/eviction counter"""
+        with self.locked():
+            stats = self.read_json(STATS_FILE, {})
+            stats[event] = stats.get(event, 0) + amount
+            self.write_json(STATS_FILE, stats)
+    
+    @property
+    def stats(self):
+        """Counters {"hits", "misses", "stores", "evictions"}"""
+        stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        stats.update(self.read_json(STATS_FILE, {}))
+        return stats
+    
+    def fetch(self, key, output_path):
+        """
+        Copy a cached output to output_path, if there is one
+        
+        For a directory, only its job output files are replaced (see
+        copy_output()).
+        
+        Args:
+            key: Cache key
+            output_path: File or directory to write
+            
+        Returns:
+            Entry metadata on a hit, None on a miss
+        """
+        self.evict()
+        
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            self.count('misses')
+            return None
+        
+        with open(meta_path) as f:
+            meta = json.load(f)
+        
+        copy_output(os.path.join(entry_dir, OUTPUT_NAME), output_path)
+        
+        meta['last_used'] = time.time()
+        write_json_atomic(meta_path, meta)
+        
+        self.count('hits')
+        return meta
+    
+    def store(self, key, output_path, metadata=None):
+        """
+        Store a run's output, then evict entries over the limits
+        
+        Args:
+            key: Cache key
+            output_path: File or directory written by the run (of which
+                only the job output files are stored)
+            metadata: JSON-serializable details kept with the entry
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix='.staging-')
+        
+        copy_output(output_path, os.path.join(staging, OUTPUT_NAME))
+        now = time.time()
+        with open(os.path.join(staging, META_FILE), 'w') as f:
+            json.dump({
+                'created': now,
+                'last_used': now,
+                'bytes': output_size(os.path.join(staging, OUTPUT_NAME)),
+                'metadata': metadata or {},
+            }, f, indent=2)
+        
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(staging, entry_dir)
+        
+        self.count('stores')
+        self.evict()
+    
+    def evict(self):
+        """
+        Remove expired entries, then least recently used ones over the
+        entry and size limits
+        
+        Returns:
+            Number of entries removed
+        """
+        entries = sorted(self.entries().items(), key=lambda item: item[1]['last_used'])
+        now = time.time()
+        evicted = []
+        
+        if self.max_age is not None:
+            evicted += [key for key, meta in entries if now - meta['created'] > self.max_age]
+        
+        kept = [(key, meta) for key, meta in entries if key not in evicted]
+        total = sum(meta['bytes'] for _, meta in kept)
+        while kept and (
+            (self.max_entries is not None and len(kept) > self.max_entries) or
+            (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            key, meta = kept.pop(0)
+            evicted.append(key)
+            total -= meta['bytes']
+        
+        for key in evicted:
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+        if evicted:
+            self.count('evictions', len(evicted))
+        return len(evicted)
+
+
+def add_cache_arguments(parser):
+    """
+    Register the result cache options on an argparse parser
+    
+    Caching is off unless --cache-dir is given.
+    
+    Args:
+        parser: argparse.ArgumentParser
+    """
+    parser.add_argument('--cache-dir', default=None,
+                        help='Reuse outputs of earlier runs over the same input and job '
+                             'code stored in this directory (default: no caching)')
+    parser.add_argument('--cache-max-entries', type=int, default=None,
+                        help='Keep at most this many cached outputs (default: unlimited)')
+    parser.add_argument('--cache-max-mb', type=float, default=None,
+                        help='Keep at most this many MB of cached outputs (default: unlimited)')
+    parser.add_argument('--cache-max-age-days', type=float, default=None,
+                        help='Drop cached outputs older than this (default: never)')
+
+
+def cache_from_args(args):
+    """
+    Build the ResultCache selected by add_cache_arguments() options
+    
+    Args:
+        args: Parsed arguments
+        
+    Returns:
+        ResultCache, or None when caching is off
+    """
+    if not args.cache_dir:
+        return None
+    
+    return ResultCache(
+        args.cache_dir,
+        max_entries=args.cache_max_entries,
+        max_bytes=None if args.cache_max_mb is None else int(args.cache_max_mb * 1024 * 1024),
+        max_age=None if args.cache_max_age_days is None else args.cache_max_age_days * 86400,
+    )
+
+
+def job_class_from_script(path):
+    """
+    Load the MRJob class defined in a job script
+    
+    Args:
+        path: Job script path (e.g. src/mapreduce/monthly_avg_temp.py)
+        
+    Returns:
+        MRJob subclass
+    """
+    import importlib
+    from mrjob.job import MRJob
+    
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    module = importlib.import_module(module_name)
+    
+    for value in vars(module).values():
+        if (inspect.isclass(value) and issubclass(value, MRJob)
+                and value.__module__ == module_name):
+            return value
+    raise ValueError(f"{path} defines no MRJob class")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Weatheria job result cache helpers')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    fingerprint = commands.add_parser(
+        'fingerprint', help="Print the code fingerprint of a job script's job class")
+    fingerprint.add_argument('script', help='Job script path')
+    
+    stats = commands.add_parser('stats', help='Print the counters of a cache directory')
+    stats.add_argument('cache_dir', help='Cache directory')
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'fingerprint':
+        print(source_fingerprint(job_class_from_script(args.script)))
+    else:
+        print(json.dumps(ResultCache(args.cache_dir).stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
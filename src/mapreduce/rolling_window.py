@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Rolling-Window Statistics MapReduce Job
+Calculates N-day moving averages and rolling temperature extremes per day
+
+Usage:
+    # Local mode, 7- and 30-day windows
+    python src/mapreduce/rolling_window.py data/raw/test_weather_data.csv
+    
+    # Local mode, custom windows
+    python src/mapreduce/rolling_window.py --windows 3,7,14 data/raw/test_weather_data.csv
+    
+    # Hadoop mode
+    python src/mapreduce/rolling_window.py -r hadoop hdfs:///input/weather_data.csv
+"""
+
+from collections import deque
+from datetime import date, timedelta
+
+from mrjob.step import MRStep
+
+from weather_job import WeatherJob, split_station_key, station_key, station_result
+
+
+def parse_windows(text):
+    """
+    Parse a comma-separated list of window lengths in days
+    
+    Args:
+        text: e.g. "7,30"
+        
+    Returns:
+        Sorted list of distinct positive ints
+        
+    Raises:
+        ValueError: If a window is not a positive integer
+    """
+    windows = sorted({int(part) for part in text.split(',') if part.strip()})
+    if not windows or windows[0] < 1:
+        raise ValueError(f"Invalid --windows: {text!r}")
+    return windows
+
+
+def next_month_start(day):
+    """First day of the month after day's month"""
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+
+class RollingWindow(object):
+    """
+    Streaming statistics over the last N calendar days
+    
+    Days must be added in date order. The window keeps a running sum for
+    the mean and two monotonic deques (decreasing temp_max, increasing
+    temp_min) for the extremes, so each day costs amortized O(1) and memory
+    is bounded by the window length. Windows are calendar based: a gap in
+    the data shrinks the number of days in the window instead of stretching
+    it back in time.
+    """
+    
+    def __init__(self, days):
+        self.days = days
+        self.readings = deque()
+        self.total = 0.0
+        self.max_deque = deque()
+        self.min_deque = deque()
+    
+    def add(self, ordinal, temp_max, temp_min, avg_temp):
+        """
+        Slide the window to end at a day and add that day's reading
+        
+        Args:
+            ordinal: date.toordinal() of the day
+            temp_max: Maximum temperature
+            temp_min: Minimum temperature
+            avg_temp: Average temperature
+        """
+        oldest = ordinal - self.days
+        
+        while self.readings and self.readings[0][0] <= oldest:
+            self.total -= self.readings.popleft()[1]
+        while self.max_deque and self.max_deque[0][0] <= oldest:
+            self.max_deque.popleft()
+        while self.min_deque and self.min_deque[0][0] <= oldest:
+            self.min_deque.popleft()
+        
+        self.readings.append((ordinal, avg_temp))
+        self.total += avg_temp
+        
+        while self.max_deque and self.max_deque[-1][1] <= temp_max:
+            self.max_deque.pop()
+        self.max_deque.append((ordinal, temp_max))
+        
+        while self.min_deque and self.min_deque[-1][1] >= temp_min:
+            self.min_deque.pop()
+        self.min_deque.append((ordinal, temp_min))
+    
+    def stats(self):
+        """
+        Statistics of the current window
+        
+        Returns:
+            Tuple (day count, mean avg_temp, max temp_max, min temp_min)
+        """
+        count = len(self.readings)
+        return count, self.total / count, self.max_deque[0][1], self.min_deque[0][1]
+
+
+class RollingWindowStats(WeatherJob):
+    """
+    Rolling means and extremes with a secondary sort on date
+    
+    Records are keyed by month (or (station_id, month)) and the values start
+    with the ISO date, so SORT_VALUES hands each reducer its month's days in
+    date order. Each day is also sent to the following months whose windows
+    reach back to it, so a reducer sees the overlap it needs from the
+    previous period and can compute every window in a single streaming pass
+    with memory bounded by the longest window.
+    
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: JSON lines {["station_id",] "date", "avg_temp", "mean_<N>d",
+            "max_<N>d", "min_<N>d", "days_<N>d"} for every window N
+    """
+    
+    SORT_VALUES = True
+    
+    def configure_args(self):
+        """Register job-specific command line options"""
+        super(RollingWindowStats, self).configure_args()
+        self.add_passthru_arg(
+            '--windows',
+            default='7,30',
+            help='Comma-separated window lengths in days (default: 7,30)'
+        )
+    
+    def __init__(self, *args, **kwargs):
+        super(RollingWindowStats, self).__init__(*args, **kwargs)
+        
+        # Window lengths in days, shortest first
+        self.windows = parse_windows(self.options.windows)
+    
+    def steps(self):
+        """Define the MapReduce steps"""
+        return [
+            MRStep(
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
+            )
+        ]
+    
+    def map_record(self, record):
+        """
+        Emit a day to its own month and to the months it overlaps into
+        
+        Args:
+            record: WeatherRecord
+            
+        Yields:
+            (year_month or (station_id, year_month),
+             [date, temp_max, temp_min])
+        """
+        if record.year_month is None:
+            return
+        
+        # Values are sorted as text, so normalize the date to zero-padded ISO
+        try:
+            day = date.fromisoformat(record.date)
+        except ValueError:
+            return
+        
+        value = [day.isoformat(), record.temp_max, record.temp_min]
+        yield station_key(record.station_id, record.year_month), value
+        
+        # Later months whose first window reaches back to this day
+        reach = timedelta(days=self.windows[-1] - 1)
+        month_start = next_month_start(day)
+        
+        while month_start - day <= reach:
+            year_month = month_start.strftime('%Y-%m')
+            yield station_key(record.station_id, year_month), value
+            month_start = next_month_start(month_start)
+    
+    def reducer(self, key, values):
+        """
+        Stream a month's days in date order through every window
+        
+        Args:
+            key: Year-month string or [station_id, year_month]
+            values: Iterator of [date, temp_max, temp_min], sorted by date
+                and starting with the overlap from earlier months
+            
+        Yields:
+            (key, {["station_id",] "date", "avg_temp", ...}) per day of the
+            month
+        """
+        station_id, year_month = split_station_key(key)
+        windows = [RollingWindow(days) for days in self.windows]
+        
+        for date_str, temp_max, temp_min in values:
+            avg_temp = (temp_max + temp_min) / 2
+            ordinal = date.fromisoformat(date_str).toordinal()
+            
+            for window in windows:
+                window.add(ordinal, temp_max, temp_min, avg_temp)
+            
+            # Overlap days only warm up the windows
+            if not date_str.startswith(year_month):
+                continue
+            
+            result = {"date": date_str, "avg_temp": round(avg_temp, 2)}
+            for window in windows:
+                count, mean, window_max, window_min = window.stats()
+                result[f"mean_{window.days}d"] = round(mean, 2)
+                result[f"max_{window.days}d"] = window_max
+                result[f"min_{window.days}d"] = window_min
+                result[f"days_{window.days}d"] = count
+            
+            # Emit result as a typed record
+            yield key, station_result(station_id, result)
+
+
+if __name__ == '__main__':
+    RollingWindowStats.run()
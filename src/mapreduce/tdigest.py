@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Mergeable t-digest quantile sketch
+
+A t-digest summarizes a distribution as a short list of weighted centroids,
+small near the tails and large in the middle, so extreme quantiles such as
+the 95th or 99th percentile stay accurate while the sketch size is bounded
+by the compression parameter rather than the number of values. Two digests
+merge into a digest of the combined data, which makes it usable as a
+MapReduce partial aggregate in mappers, combiners and reducers.
+
+This is the merging variant (Dunning & Ertl, "Computing Extremely Accurate
+Quantiles Using t-Digests") with the k1 arcsine scale function.
+"""
+
+import math
+
+
+DEFAULT_COMPRESSION = 100
+
+
+class TDigest(object):
+    """
+    Quantile sketch with bounded size
+    
+    Values are buffered and folded into the centroids in batches, so adding
+    a value is O(1) amortized. The exact minimum and maximum are kept so
+    estimates never leave the observed range.
+    """
+    
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.centroids = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def add(self, value, weight=1):
+        """
+        Add a value
+        
+        Args:
+            value: Number to add
+            weight: Number of occurrences
+        """
+        self.buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        
+        if len(self.buffer) >= 5 * self.compression:
+            self.compress()
+    
+    def merge(self, other):
+        """
+        Fold another digest into this one
+        
+        Args:
+            other: TDigest
+        """
+        if other.count == 0:
+            return
+        
+        self.buffer.extend(other.centroids)
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        
+        if len(self.buffer) >= 5 * self.compression:
+            self.compress()
+    
+    def q_limit(self, q):
+        """Largest quantile a centroid starting at q may extend to"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+    
+    def compress(self):
+        """Fold buffered values into the centroids"""
+        if not self.buffer:
+            return
+        
+        items = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        
+        total = float(self.count)
+        merged = []
+        mean, weight = items[0]
+        weight_so_far = 0
+        limit = self.q_limit(0.0)
+        
+        for item_mean, item_weight in items[1:]:
+            if (weight_so_far + weight + item_weight) / total <= limit:
+                # Weighted running mean of the centroid
+                weight += item_weight
+                mean += (item_mean - mean) * item_weight / weight
+            else:
+                merged.append((mean, weight))
+                weight_so_far += weight
+                limit = self.q_limit(weight_so_far / total)
+                mean, weight = item_mean, item_weight
+        
+        merged.append((mean, weight))
+        self.centroids = merged
+    
+    def quantile(self, q):
+        """
+        Estimate a quantile
+        
+        Interpolates linearly between centroid centers, and between the
+        outer centroids and the exact minimum/maximum.
+        
+        Args:
+            q: Quantile in [0, 1]
+            
+        Returns:
+            Estimated value, or None for an empty digest
+        """
+        self.compress()
+        return centroid_quantile(self.centroids, self.min, self.max, q)
+    
+    def to_dict(self, digits=4):
+        """
+        Serialize the digest
+        
+        Args:
+            digits: Decimal places kept for centroid means
+            
+        Returns:
+            Dictionary {"count", "min", "max", "centroids": [[mean, weight]]}
+        """
+        self.compress()
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "centroids": [[round(mean, digits), weight] for mean, weight in self.centroids],
+        }
+    
+    @classmethod
+    def from_dict(cls, data, compression=DEFAULT_COMPRESSION):
+        """
+        Rebuild a digest serialized with to_dict()
+        
+        Args:
+            data: Dictionary from to_dict()
+            compression: Compression for further merging
+            
+        Returns:
+            TDigest
+        """
+        digest = cls(compression)
+        digest.centroids = [(mean, weight) for mean, weight in data["centroids"]]
+        digest.count = data["count"]
+        digest.min = data["min"]
+        digest.max = data["max"]
+        return digest
+
+
+def centroid_quantile(centroids, minimum, maximum, q):
+    """
+    Estimate a quantile from sorted (mean, weight) centroids
+    
+    Args:
+        centroids: Sorted list of (mean, weight)
+        minimum: Exact minimum value
+        maximum: Exact maximum value
+        q: Quantile in [0, 1]
+        
+    Returns:
+        Estimated value, or None without centroids
+    """
+    if not centroids:
+        return None
+    if len(centroids) == 1:
+        return centroids[0][0]
+    
+    total = sum(weight for _, weight in centroids)
+    target = q * total
+    
+    first_mean, first_weight = centroids[0]
+    if target < first_weight / 2:
+        return minimum + (first_mean - minimum) * target / (first_weight / 2)
+    
+    last_mean, last_weight = centroids[-1]
+    if target > total - last_weight / 2:
+        return last_mean + (maximum - last_mean) * (target - total + last_weight / 2) / (last_weight / 2)
+    
+    # Walk the centers of adjacent centroids
+    cumulative = first_weight / 2
+    for (left_mean, left_weight), (right_mean, right_weight) in zip(centroids, centroids[1:]):
+        step = (left_weight + right_weight) / 2
+        if target <= cumulative + step:
+            return left_mean + (right_mean - left_mean) * (target - cumulative) / step
+        cumulative += step
+    
+    return last_mean
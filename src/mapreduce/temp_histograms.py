@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Temperature Histograms MapReduce Job
+Builds fixed-bin histograms of temp_max, temp_min and average temperature,
+so extreme-temperature counts can be computed for any threshold without a
+rerun
+
+Usage:
+    # Local mode (0.1 °C bins)
+    python src/mapreduce/temp_histograms.py data/raw/test_weather_data.csv
+    
+    # Hadoop mode
+    python src/mapreduce/temp_histograms.py -r hadoop hdfs:///input/weather_data.csv
+"""
+
+from mrjob.step import MRStep
+
+from weather_job import WeatherJob, split_station_key, station_key, station_result
+
+
+# Histogrammed variables
+VARIABLES = ('temp_max', 'temp_min', 'avg_temp')
+
+# Bins per degree Celsius (0.1 °C resolution)
+BINS_PER_DEGREE = 10
+
+
+def bin_index(value):
+    """
+    Histogram bin of a temperature
+    
+    Bins are centered on multiples of the resolution, so readings reported
+    to 0.1 °C each land exactly on their own bin.
+    
+    Args:
+        value: Temperature (°C)
+        
+    Returns:
+        Integer bin index (value * BINS_PER_DEGREE, rounded)
+    """
+    return int(round(value * BINS_PER_DEGREE))
+
+
+class TemperatureHistograms(WeatherJob):
+    """
+    Fixed-bin temperature histograms
+    
+    Every bin of every variable holds the number of days and the sum of
+    their average temperatures, so a threshold on any variable (e.g.
+    temp_max > 30) yields both the day count and the mean temperature of
+    those days, like ExtremeTemperatures does for its fixed thresholds.
+    Intermediate values are sparse [[bin, count, sum_avg_temp], ...] lists
+    that merge by adding bins.
+    
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: JSON lines {["station_id",] "variable", "resolution", "min_bin",
+            "counts", "sum_avg_temp"} with dense per-bin lists starting at
+            min_bin
+    """
+    
+    def steps(self):
+        """Define the MapReduce steps"""
+        return [
+            MRStep(
+                combiner=self.combiner,
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
+            )
+        ]
+    
+    def key_class(self, key):
+        """Count emitted records per histogrammed variable"""
+        return split_station_key(key)[1]
+    
+    def map_record(self, record):
+        """
+        Emit a day's bin for each variable
+        
+        Args:
+            record: WeatherRecord
+            
+        Yields:
+            (variable or (station_id, variable), [[bin, 1, avg_temp]])
+        """
+        avg_temp = (record.temp_max + record.temp_min) / 2
+        values = (record.temp_max, record.temp_min, avg_temp)
+        
+        for variable, value in zip(VARIABLES, values):
+            yield station_key(record.station_id, variable), [[bin_index(value), 1, avg_temp]]
+    
+    def map_frame(self, frame):
+        """
+        Emit per-block sparse histograms for a block of parsed rows
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
+            
+        Yields:
+            (variable or (station_id, variable),
+             [[bin, count, sum_avg_temp], ...])
+        """
+        frame = frame.assign(avg_temp=(frame['temp_max'] + frame['temp_min']) / 2)
+        
+        for variable in VARIABLES:
+            bins = (frame[variable] * BINS_PER_DEGREE).round().astype(int).rename('bin')
+            grouped = frame.groupby([frame['station_id'], bins]).agg(
+                count=('avg_temp', 'size'),
+                sum_avg_temp=('avg_temp', 'sum')
+            )
+            
+            histograms = {}
+            for (station_id, index), count, sum_avg_temp in grouped.itertuples():
+                histograms.setdefault(station_id, []).append(
+                    [int(index), int(count), float(sum_avg_temp)])
+            
+            for station_id, histogram in histograms.items():
+                yield station_key(station_id, variable), histogram
+    
+    def merge_values(self, values):
+        """
+        Add sparse histograms bin by bin
+        
+        Args:
+            values: Iterator of [[bin, count, sum_avg_temp], ...] lists
+            
+        Returns:
+            Dictionary bin -> [count, sum_avg_temp]
+        """
+        bins = {}
+        for histogram in values:
+            for index, count, total in histogram:
+                current = bins.get(index)
+                if current is None:
+                    bins[index] = [count, total]
+                else:
+                    current[0] += count
+                    current[1] += total
+        return bins
+    
+    def combiner(self, key, values):
+        """
+        Merge partial histograms before the shuffle
+        
+        Args:
+            key: Variable name or [station_id, variable]
+            values: Iterator of sparse histograms
+            
+        Yields:
+            (key, [[bin, count, sum_avg_temp], ...])
+        """
+        bins = self.merge_values(values)
+        yield key, [[index, count, total] for index, (count, total) in sorted(bins.items())]
+    
+    def reducer(self, key, values):
+        """
+        Write a variable's histogram as dense per-bin lists
+        
+        Args:
+            key: Variable name or [station_id, variable]
+            values: Iterator of sparse histograms
+            
+        Yields:
+            (key, {["station_id",] "variable", "resolution", "min_bin",
+                   "counts", "sum_avg_temp"})
+        """
+        station_id, variable = split_station_key(key)
+        bins = self.merge_values(values)
+        if not bins:
+            return
+        
+        min_bin = min(bins)
+        size = max(bins) - min_bin + 1
+        counts = [0] * size
+        sums = [0.0] * size
+        for index, (count, total) in bins.items():
+            counts[index - min_bin] = count
+            sums[index - min_bin] = round(total, 4)
+        
+        # Emit result as a typed record
+        yield key, station_result(station_id, {
+            "variable": variable,
+            "resolution": 1 / BINS_PER_DEGREE,
+            "min_bin": min_bin,
+            "counts": counts,
+            "sum_avg_temp": sums,
+        })
+
+
+if __name__ == '__main__':
+    TemperatureHistograms.run()
@@ -11,125 +11,217 @@ Usage:
     python src/mapreduce/temp_precipitation.py -r hadoop hdfs:///input/weather_data.csv
 """
 
-from mrjob.job import MRJob
 from mrjob.step import MRStep
-from datetime import datetime
 import math
 
+from weather_job import (
+    WeatherJob,
+    format_month_key,
+    split_station_key,
+    station_key,
+    station_result,
+)
 
-class TempPrecipitationCorrelation(MRJob):
+
+def merge_moments(a, b):
+    """
+    Merge two sets of Pearson sufficient statistics
+    
+    Each set is (n, sum_temp, sum_precip, m2_temp, m2_precip, c_temp_precip,
+    rainy_days), where the m2/c terms are sums of squared/cross deviations
+    from the set's own means. Deviations are combined with the pairwise update
+    of Chan et al., which avoids the cancellation of the naive
+    sum(x^2) - n * mean^2 formula.
+    
+    Args:
+        a: First statistics tuple
+        b: Second statistics tuple
+        
+    Returns:
+        Merged statistics tuple
+    """
+    n_a, sum_t_a, sum_p_a, m2_t_a, m2_p_a, c_a, rainy_a = a
+    n_b, sum_t_b, sum_p_b, m2_t_b, m2_p_b, c_b, rainy_b = b
+    
+    if n_a == 0:
+        return tuple(b)
+    if n_b == 0:
+        return tuple(a)
+    
+    n = n_a + n_b
+    delta_t = sum_t_b / n_b - sum_t_a / n_a
+    delta_p = sum_p_b / n_b - sum_p_a / n_a
+    weight = n_a * n_b / n
+    
+    return (
+        n,
+        sum_t_a + sum_t_b,
+        sum_p_a + sum_p_b,
+        m2_t_a + m2_t_b + delta_t * delta_t * weight,
+        m2_p_a + m2_p_b + delta_p * delta_p * weight,
+        c_a + c_b + delta_t * delta_p * weight,
+        rainy_a + rainy_b,
+    )
+
+
+EMPTY_MOMENTS = (0, 0.0, 0.0, 0.0, 0.0, 0.0, 0)
+
+
+class TempPrecipitationCorrelation(WeatherJob):
     """
     Analyze correlation between temperature and precipitation
     
-    Input: CSV with date, temp_max, temp_min, precipitation
-    Output: year-month\tcorrelation\tavg_temp\tavg_precip\tdays_with_rain
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: JSON lines {["station_id",] "month", "correlation", "avg_temp",
+            "avg_precip", "rainy_days", "total_precip"}
+    
+    Intermediate values are the sufficient statistics merged by
+    merge_moments(), so the combiner and reducer need O(1) memory per month.
     """
     
     def steps(self):
         """Define the MapReduce steps"""
         return [
             MRStep(
-                mapper=self.mapper,
-                reducer=self.reducer
+                combiner=self.combiner,
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
             )
         ]
     
-    def mapper(self, _, line):
+    def map_record(self, record):
         """
-        Emit monthly temperature and precipitation data
+        Emit the statistics of a single day for its month
         
         Args:
-            _: Line number (ignored)
-            line: CSV line
+            record: WeatherRecord
             
         Yields:
-            (year_month, (avg_temp, precipitation))
+            (year_month or (station_id, year_month),
+             (1, avg_temp, precipitation, 0.0, 0.0, 0.0, rainy))
         """
-        # Skip header line
-        if line.startswith('date'):
+        if record.year_month is None or record.precipitation is None:
             return
         
-        try:
-            # Parse CSV line
-            parts = line.strip().split(',')
-            if len(parts) < 4:
-                return
-            
-            date_str = parts[0]
-            temp_max = float(parts[1])
-            temp_min = float(parts[2])
-            precipitation = float(parts[3])
-            
-            # Calculate average temperature
-            avg_temp = (temp_max + temp_min) / 2
-            
-            # Extract year-month
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            year_month = date_obj.strftime('%Y-%m')
+        # Calculate average temperature
+        avg_temp = (record.temp_max + record.temp_min) / 2
+        precipitation = record.precipitation
+        
+        # Emit the statistics of a single observation
+        rainy = 1 if precipitation > 0 else 0
+        key = station_key(record.station_id, record.year_month)
+        yield key, (1, avg_temp, precipitation, 0.0, 0.0, 0.0, rainy)
+    
+    def map_frame(self, frame):
+        """
+        Emit per-month sufficient statistics for a block of parsed rows
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
             
-            # Emit (year_month, (avg_temp, precipitation))
-            yield year_month, (avg_temp, precipitation)
+        Yields:
+            (year_month or (station_id, year_month),
+             (n, sum_temp, sum_precip, m2_temp, m2_precip, c_temp_precip,
+              rainy_days))
+        """
+        frame = frame[frame['month_key'].notna() & frame['precipitation'].notna()]
+        
+        temp = (frame['temp_max'] + frame['temp_min']) / 2
+        precip = frame['precipitation']
+        groups = [frame['station_id'], frame['month_key']]
+        
+        # Deviations from each station-month's own means
+        temp_dev = temp - temp.groupby(groups).transform('mean')
+        precip_dev = precip - precip.groupby(groups).transform('mean')
+        
+        stats = temp.to_frame('temp').assign(
+            precip=precip,
+            m2_temp=temp_dev * temp_dev,
+            m2_precip=precip_dev * precip_dev,
+            c_temp_precip=temp_dev * precip_dev,
+            rainy=(precip > 0).astype(int)
+        ).groupby(groups).agg(
+            n=('temp', 'size'),
+            sum_temp=('temp', 'sum'),
+            sum_precip=('precip', 'sum'),
+            m2_temp=('m2_temp', 'sum'),
+            m2_precip=('m2_precip', 'sum'),
+            c_temp_precip=('c_temp_precip', 'sum'),
+            rainy=('rainy', 'sum')
+        )
+        
+        for (station_id, month_key), n, sum_temp, sum_precip, m2_temp, m2_precip, c_temp_precip, rainy in stats.itertuples():
+            yield station_key(station_id, format_month_key(month_key)), (
+                int(n), float(sum_temp), float(sum_precip), float(m2_temp),
+                float(m2_precip), float(c_temp_precip), int(rainy)
+            )
+    
+    def combiner(self, key, values):
+        """
+        Merge sufficient statistics for a month before the shuffle
+        
+        Args:
+            key: Year-month string or [station_id, year_month]
+            values: Iterator of statistics tuples
             
-        except (ValueError, IndexError):
-            # Skip malformed lines
-            pass
+        Yields:
+            (key, merged statistics tuple)
+        """
+        moments = EMPTY_MOMENTS
+        for value in values:
+            moments = merge_moments(moments, value)
+        
+        yield key, moments
     
-    def reducer(self, year_month, values):
+    def reducer(self, key, values):
         """
         Calculate correlation coefficient and statistics
         
         Args:
-            year_month: Year-month string
-            values: Iterator of (avg_temp, precipitation) tuples
+            key: Year-month string or [station_id, year_month]
+            values: Iterator of statistics tuples
             
         Yields:
-            (year_month, statistics)
+            (key, statistics)
         """
-        temps = []
-        precips = []
+        station_id, year_month = split_station_key(key)
         
-        # Collect all values
-        for temp, precip in values:
-            temps.append(temp)
-            precips.append(precip)
+        moments = EMPTY_MOMENTS
+        for value in values:
+            moments = merge_moments(moments, value)
         
-        n = len(temps)
+        n, sum_temp, sum_precip, temp_variance, precip_variance, covariance, rainy_days = moments
         
         if n < 2:
             # Not enough data for correlation
             return
         
         # Calculate means
-        mean_temp = sum(temps) / n
-        mean_precip = sum(precips) / n
+        mean_temp = sum_temp / n
+        mean_precip = sum_precip / n
         
         # Calculate correlation coefficient (Pearson)
-        numerator = sum((t - mean_temp) * (p - mean_precip) 
-                       for t, p in zip(temps, precips))
-        
-        temp_variance = sum((t - mean_temp) ** 2 for t in temps)
-        precip_variance = sum((p - mean_precip) ** 2 for p in precips)
-        
         denominator = math.sqrt(temp_variance * precip_variance)
         
         if denominator == 0:
             correlation = 0.0
         else:
-            correlation = round(numerator / denominator, 4)
-        
-        # Count rainy days (precipitation > 0)
-        rainy_days = sum(1 for p in precips if p > 0)
-        
-        # Calculate total precipitation
-        total_precip = sum(precips)
+            correlation = round(covariance / denominator, 4)
         
         # Format output
         avg_temp = round(mean_temp, 2)
         avg_precip = round(mean_precip, 2)
-        total_precip = round(total_precip, 2)
+        total_precip = round(sum_precip, 2)
         
-        # Emit result as tab-separated values
-        yield year_month, f"{correlation}\t{avg_temp}\t{avg_precip}\t{rainy_days}\t{total_precip}"
+        # Emit result as a typed record
+        yield key, station_result(station_id, {
+            "month": year_month,
+            "correlation": correlation,
+            "avg_temp": avg_temp,
+            "avg_precip": avg_precip,
+            "rainy_days": rainy_days,
+            "total_precip": total_precip,
+        })
 
 
 if __name__ == '__main__':
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Monthly Temperature Quantile Sketches MapReduce Job
+Builds a mergeable t-digest of temp_max, temp_min and average temperature
+per month, so any percentile can be answered later without a rerun
+
+Usage:
+    # Local mode
+    python src/mapreduce/temp_quantiles.py data/raw/test_weather_data.csv
+    
+    # Local mode, larger (more accurate) sketches
+    python src/mapreduce/temp_quantiles.py --compression 200 data/raw/test_weather_data.csv
+    
+    # Hadoop mode
+    python src/mapreduce/temp_quantiles.py -r hadoop hdfs:///input/weather_data.csv
+"""
+
+from mrjob.step import MRStep
+
+from tdigest import DEFAULT_COMPRESSION, TDigest
+from weather_job import (
+    WeatherJob,
+    format_month_key,
+    split_station_key,
+    station_key,
+    station_result,
+)
+
+
+# Sketched variables, in the order of the intermediate value lists
+VARIABLES = ('temp_max', 'temp_min', 'avg_temp')
+
+
+class TemperatureQuantiles(WeatherJob):
+    """
+    Per-month t-digest sketches of daily temperatures
+    
+    Mappers emit raw [temp_max, temp_min, avg_temp] readings (or per-block
+    digests in --batch-mapper mode); combiners and reducers merge them into
+    one digest per variable. Both forms can reach the reducer, since the
+    combiner may run any number of times.
+    
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: JSON lines {["station_id",] "month", "count", "temp_max",
+            "temp_min", "avg_temp"}, each variable a serialized digest
+            {"count", "min", "max", "centroids": [[mean, weight], ...]}
+    """
+    
+    FILES = WeatherJob.FILES + ['tdigest.py']
+    
+    def configure_args(self):
+        """Register job-specific command line options"""
+        super(TemperatureQuantiles, self).configure_args()
+        self.add_passthru_arg(
+            '--compression',
+            type=int,
+            default=DEFAULT_COMPRESSION,
+            help='t-digest compression; larger sketches are more accurate '
+                 f'(default: {DEFAULT_COMPRESSION})'
+        )
+    
+    def steps(self):
+        """Define the MapReduce steps"""
+        return [
+            MRStep(
+                combiner=self.combiner,
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
+            )
+        ]
+    
+    def map_record(self, record):
+        """
+        Emit a day's readings for its month
+        
+        Args:
+            record: WeatherRecord
+            
+        Yields:
+            (year_month or (station_id, year_month),
+             [temp_max, temp_min, avg_temp])
+        """
+        if record.year_month is None:
+            return
+        
+        avg_temp = (record.temp_max + record.temp_min) / 2
+        key = station_key(record.station_id, record.year_month)
+        yield key, [record.temp_max, record.temp_min, avg_temp]
+    
+    def map_frame(self, frame):
+        """
+        Emit per-month digests for a block of parsed rows
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
+            
+        Yields:
+            (year_month or (station_id, year_month), [digest, digest, digest])
+        """
+        frame = frame.assign(avg_temp=(frame['temp_max'] + frame['temp_min']) / 2)
+        
+        for (station_id, month_key), rows in frame.groupby(['station_id', 'month_key']):
+            digests = []
+            for variable in VARIABLES:
+                digest = TDigest(self.options.compression)
+                for value in rows[variable].tolist():
+                    digest.add(value)
+                digests.append(digest.to_dict())
+            
+            yield station_key(station_id, format_month_key(month_key)), digests
+    
+    def merge_values(self, values):
+        """
+        Merge raw readings and partial digests
+        
+        Args:
+            values: Iterator of [temp_max, temp_min, avg_temp] readings or
+                lists of serialized digests
+            
+        Returns:
+            List of TDigest, one per variable
+        """
+        compression = self.options.compression
+        digests = [TDigest(compression) for _ in VARIABLES]
+        
+        for value in values:
+            for digest, part in zip(digests, value):
+                if isinstance(part, dict):
+                    digest.merge(TDigest.from_dict(part, compression))
+                else:
+                    digest.add(part)
+        
+        return digests
+    
+    def combiner(self, key, values):
+        """
+        Merge a month's readings into partial digests before the shuffle
+        
+        Args:
+            key: Year-month string or [station_id, year_month]
+            values: Iterator of readings or digests
+            
+        Yields:
+            (key, [digest, digest, digest])
+        """
+        yield key, [digest.to_dict() for digest in self.merge_values(values)]
+    
+    def reducer(self, key, values):
+        """
+        Merge a month's digests into its final sketches
+        
+        Args:
+            key: Year-month string or [station_id, year_month]
+            values: Iterator of readings or digests
+            
+        Yields:
+            (key, {["station_id",] "month", "count", "temp_max", "temp_min",
+                   "avg_temp"})
+        """
+        station_id, year_month = split_station_key(key)
+        digests = self.merge_values(values)
+        
+        result = {"month": year_month, "count": digests[0].count}
+        for variable, digest in zip(VARIABLES, digests):
+            result[variable] = digest.to_dict()
+        
+        # Emit result as a typed record
+        yield key, station_result(station_id, result)
+
+
+if __name__ == '__main__':
+    TemperatureQuantiles.run()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Fused Weather Analyses MapReduce Job
+Runs the monthly average, extreme temperature, temperature-precipitation
+and temperature histogram analyses over a single scan of the input
+
+Usage:
+    # Local mode, writing output/monthly_avg, output/extreme_temps,
+    # output/temp_precip and output/temp_histograms in the same format as
+    # the individual jobs
+    python src/mapreduce/weather_analyses.py --analysis-output-root output \\
+        data/raw/test_weather_data.csv
+    
+    # EMR mode: the fused output stays on S3 and the (small) reduced
+    # results are split into output/hadoop/<analysis> on this machine
+    python src/mapreduce/weather_analyses.py -r emr \\
+        --analysis-output-root output/hadoop \\
+        --output-dir s3://weatheria-climate-data/output/fused \\
+        s3://weatheria-climate-data/input/medellin_weather_2022-2024.csv
+"""
+
+import json
+import os
+from collections import defaultdict
+
+from mrjob.protocol import JSONProtocol
+from mrjob.step import MRStep
+
+from weather_job import WeatherJob
+from monthly_avg_temp import MonthlyAvgTemperature
+from extreme_temps import ExtremeTemperatures
+from temp_precipitation import TempPrecipitationCorrelation
+from temp_histograms import TemperatureHistograms
+
+
+# Analysis tag (also its output directory name) -> job class
+ANALYSES = {
+    'monthly_avg': MonthlyAvgTemperature,
+    'extreme_temps': ExtremeTemperatures,
+    'temp_precip': TempPrecipitationCorrelation,
+    'temp_histograms': TemperatureHistograms,
+}
+
+
+class WeatherAnalyses(WeatherJob):
+    """
+    Compute all analyses through one shuffle
+    
+    Each line is parsed once and handed to every analysis' map_record().
+    Keys are tagged as [analysis, key] so that the combiner and reducer can
+    dispatch to the matching job, whose partial-aggregate formats are
+    reused unchanged.
+    
+    Input: CSV with date, temp_max, temp_min, precipitation[, station_id]
+    Output: [analysis, key]\trecord, or one directory per analysis under
+            --analysis-output-root
+    """
+    
+    # Keep the tagged key so the output can be split per analysis
+    OUTPUT_PROTOCOL = JSONProtocol
+    
+    FILES = WeatherJob.FILES + [
+        'monthly_avg_temp.py',
+        'extreme_temps.py',
+        'temp_precipitation.py',
+        'temp_histograms.py',
+    ]
+    
+    def configure_args(self):
+        """Register job-specific command line options"""
+        super(WeatherAnalyses, self).configure_args()
+        self.add_passthru_arg(
+            '--top-k',
+            type=int,
+            default=0,
+            help='Forwarded to the extreme temperature analysis'
+        )
+        self.add_passthru_arg(
+            '--analysis-output-root',
+            default=None,
+            help='Local directory under which to write one output '
+                 'directory per analysis (monthly_avg, extreme_temps, '
+                 'temp_precip, temp_histograms). The split runs on this '
+                 'machine from the job output, so URIs (s3://, hdfs://) '
+                 'are rejected; keep the fused --output-dir remote instead'
+        )
+    
+    def __init__(self, *args, **kwargs):
+        super(WeatherAnalyses, self).__init__(*args, **kwargs)
+        
+        if self.options.analysis_output_root and '://' in self.options.analysis_output_root:
+            raise ValueError('--analysis-output-root must be a local directory, '
+                             f'got {self.options.analysis_output_root!r}')
+        
+        # One instance per analysis, used for its map/combine/reduce logic
+        self.analyses = {
+            name: job_class(self.analysis_args(job_class))
+            for name, job_class in ANALYSES.items()
+        }
+    
+    def analysis_args(self, job_class):
+        """
+        Build the command line for an analysis from the fused job's options
+        
+        Args:
+            job_class: Analysis job class
+            
+        Returns:
+            List of arguments
+        """
+        if job_class is ExtremeTemperatures:
+            return ['--top-k', str(self.options.top_k)]
+        return []
+    
+    def steps(self):
+        """Define the MapReduce steps"""
+        return [
+            MRStep(
+                combiner=self.combiner,
+                reducer=self.reducer,
+                **self.mapper_step_kwargs()
+            )
+        ]
+    
+    def key_class(self, tagged_key):
+        """Count emitted records per analysis and the analysis' own key class"""
+        name, key = tagged_key
+        return f"{name}:{self.analyses[name].key_class(key)}"
+    
+    def map_record(self, record):
+        """
+        Feed a parsed record to every analysis
+        
+        Args:
+            record: WeatherRecord
+            
+        Yields:
+            ([analysis, key], value)
+        """
+        for name, job in self.analyses.items():
+            for key, value in job.map_record(record):
+                yield [name, key], value
+    
+    def map_frame(self, frame):
+        """
+        Feed a block of parsed rows to every analysis
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
+            
+        Yields:
+            ([analysis, key], value)
+        """
+        for name, job in self.analyses.items():
+            for key, value in job.map_frame(frame):
+                yield [name, key], value
+    
+    def combiner(self, tagged_key, values):
+        """
+        Merge partial aggregates with the owning analysis' combiner
+        
+        Args:
+            tagged_key: [analysis, key]
+            values: Iterator of the analysis' partial values
+            
+        Yields:
+            ([analysis, key], merged value)
+        """
+        name, key = tagged_key
+        for out_key, value in self.analyses[name].combiner(key, values):
+            yield [name, out_key], value
+    
+    def reducer(self, tagged_key, values):
+        """
+        Finalize results with the owning analysis' reducer
+        
+        Args:
+            tagged_key: [analysis, key]
+            values: Iterator of the analysis' partial values
+            
+        Yields:
+            ([analysis, key], result)
+        """
+        name, key = tagged_key
+        for out_key, value in self.analyses[name].reducer(key, values):
+            yield [name, out_key], value
+    
+    def write_analysis_outputs(self, pairs, output_root):
+        """
+        Split tagged results into one directory per analysis
+        
+        Each directory gets a single part-00000 file, sorted by key and
+        encoded with the analysis' own output protocol, i.e. exactly what
+        the individual job would have written.
+        
+        Args:
+            pairs: Iterator of ([analysis, key], value) results
+            output_root: Local directory
+        """
+        results = defaultdict(list)
+        for (name, key), value in pairs:
+            results[name].append((key, value))
+        
+        for name, job in self.analyses.items():
+            local_dir = os.path.join(output_root, name)
+            os.makedirs(local_dir, exist_ok=True)
+            part_path = os.path.join(local_dir, 'part-00000')
+            
+            protocol = job.output_protocol()
+            with open(part_path, 'wb') as f:
+                # Sort on the encoded key, as the shuffle does, since
+                # station keys may arrive as tuples or decoded lists
+                for key, value in sorted(results[name], key=lambda pair: json.dumps(pair[0])):
+                    f.write(protocol.write(key, value) + b'\n')
+    
+    def run_job(self):
+        """
+        Run the job; with --analysis-output-root, demultiplex the output
+        into per-analysis directories instead of printing it
+        """
+        if not self.options.analysis_output_root:
+            return super(WeatherAnalyses, self).run_job()
+        
+        self.set_up_logging(quiet=self.options.quiet,
+                            verbose=self.options.verbose)
+        
+        with self.make_runner() as runner:
+            runner.run()
+            self.write_analysis_outputs(
+                self.parse_output(runner.cat_output()),
+                self.options.analysis_output_root
+            )
+            
+            if self.options.run_report:
+                self.write_run_report(runner)
+
+
+if __name__ == '__main__':
+    WeatherAnalyses.run()
@@ -0,0 +1,1095 @@
+#!/usr/bin/env python3
+"""
+Shared building blocks for the Weatheria MapReduce jobs
+
+Every job reads the same CSV layout (date, temp_max, temp_min,
+precipitation[, station_id]). The line parsing lives here so that a job, or
+the fused WeatherAnalyses job, parses each line exactly once and hands a
+typed record to map_record(). The same columns can also be read from
+Parquet or Arrow IPC files (--input-format), straight into the DataFrame
+blocks that map_frame() aggregates.
+
+With --start-date/--end-date, input partitioned as year=YYYY/month=MM/
+directories is pruned before the job starts, and mappers drop lines
+outside the range by their date prefix, before parsing any number.
+
+The station_id column is optional. Records without one keep the plain
+single-location keys (e.g. "2022-01"); records with one are keyed by
+(station_id, key) and their output records carry a "station_id" field.
+
+Every job counts parsed, skipped and malformed lines and emitted records
+per key class in Hadoop counters, optionally times the parse, classify and
+emit phases of its mappers (--timing), and can write a JSON run report
+built from the counters when it finishes (--run-report).
+"""
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from mrjob.job import MRJob
+from mrjob.protocol import JSONValueProtocol
+
+from protocols import PackedValueProtocol
+
+
+WeatherRecord = namedtuple(
+    'WeatherRecord',
+    ['date', 'year_month', 'temp_max', 'temp_min', 'precipitation', 'station_id'],
+    defaults=[None]
+)
+
+
+def parse_weather_line(line):
+    """
+    Parse a CSV line into a WeatherRecord
+    
+    Only the two temperatures are mandatory. year_month is None when the
+    date cannot be parsed, precipitation is None when the column is missing
+    or malformed and station_id is None when the column is missing or empty,
+    so each job can decide which fields it needs.
+    
+    Args:
+        line: CSV line
+        
+    Returns:
+        WeatherRecord, or None for the header and malformed lines
+    """
+    # Skip header line
+    if line.startswith('date'):
+        return None
+    
+    parts = line.strip().split(',')
+    if len(parts) < 3:
+        return None
+    
+    try:
+        temp_max = float(parts[1])
+        temp_min = float(parts[2])
+    except ValueError:
+        return None
+    
+    date_str = parts[0]
+    
+    try:
+        year_month = datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y-%m')
+    except ValueError:
+        year_month = None
+    
+    try:
+        precipitation = float(parts[3])
+    except (ValueError, IndexError):
+        precipitation = None
+    
+    station_id = parts[4].strip() if len(parts) > 4 else ''
+    
+    return WeatherRecord(
+        date_str, year_month, temp_max, temp_min, precipitation, station_id or None)
+
+
+def parse_weather_frame(lines):
+    """
+    Parse a block of CSV lines into a DataFrame with vectorized operations
+    
+    Applies the same rules as parse_weather_line(): rows without two numeric
+    temperatures are dropped, month_key (YYYYMM as a number) is NaN when the
+    date cannot be parsed and precipitation is NaN when missing or malformed.
+    A literal "nan" reading is treated as malformed. station_id is an empty
+    string for rows without one, so it can always be used as a group key.
+    
+    Args:
+        lines: List of CSV lines
+        
+    Returns:
+        DataFrame with date, temp_max, temp_min, precipitation, station_id
+        and month_key columns
+    """
+    # pandas is only needed by the batch mapper, so import it lazily
+    import numpy as np
+    import pandas as pd
+    
+    raw = pd.Series(lines, dtype=object)
+    raw = raw[~raw.str.startswith('date')]
+    parts = raw.str.strip().str.split(',', expand=True)
+    
+    if parts.shape[0] == 0 or parts.shape[1] < 3:
+        return pd.DataFrame(
+            columns=['date', 'temp_max', 'temp_min', 'precipitation', 'station_id',
+                     'month_key'])
+    
+    frame = pd.DataFrame({
+        'date': parts[0],
+        'temp_max': pd.to_numeric(parts[1], errors='coerce'),
+        'temp_min': pd.to_numeric(parts[2], errors='coerce'),
+        'precipitation': (
+            pd.to_numeric(parts[3], errors='coerce') if parts.shape[1] > 3
+            else np.nan
+        ),
+        'station_id': (
+            parts[4].fillna('').str.strip() if parts.shape[1] > 4
+            else ''
+        ),
+    })
+    frame = frame[frame['temp_max'].notna() & frame['temp_min'].notna()]
+    
+    dates = pd.to_datetime(frame['date'], format='%Y-%m-%d', errors='coerce')
+    
+    return frame.assign(month_key=dates.dt.year * 100 + dates.dt.month)
+
+
+# Columnar input file extension -> --input-format
+COLUMNAR_FORMATS = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+
+# Columns read from columnar input; station_id is read when present
+COLUMNAR_COLUMNS = ['date', 'temp_max', 'temp_min', 'precipitation']
+
+
+def columnar_format(path):
+    """
+    Columnar format of an input file, from its extension
+    
+    Args:
+        path: File path or URI
+        
+    Returns:
+        'parquet', 'arrow', or None for text input
+    """
+    return COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def date_in_range(date_str, start_date=None, end_date=None):
+    """
+    Check a YYYY-MM-DD date against an inclusive date range
+    
+    ISO dates order like strings, so this is a plain string comparison and
+    can run on the first 10 characters of a CSV line, before any parsing.
+    
+    Args:
+        date_str: Date string (YYYY-MM-DD)
+        start_date: First date (YYYY-MM-DD), or None for no lower bound
+        end_date: Last date (YYYY-MM-DD), or None for no upper bound
+        
+    Returns:
+        True if the date is in range
+    """
+    if date_str[4:5] != '-':
+        return False
+    if start_date is not None and date_str < start_date:
+        return False
+    if end_date is not None and date_str > end_date:
+        return False
+    return True
+
+
+def partition_in_range(path, start_date=None, end_date=None):
+    """
+    Check whether a year=YYYY[/month=MM] partition can hold dates in range
+    
+    Args:
+        path: Partition directory or file path (local or URI)
+        start_date: First date (YYYY-MM-DD), or None
+        end_date: Last date (YYYY-MM-DD), or None
+        
+    Returns:
+        False only when the path's year/month partition lies entirely
+        outside the range; paths without partition components are kept
+    """
+    year = month = None
+    for component in path.replace('\\', '/').split('/'):
+        if component.startswith('year='):
+            year = component[5:]
+        elif component.startswith('month=') and year is not None:
+            month = component[6:]
+    
+    if year is None or not year.isdigit():
+        return True
+    
+    if month is not None and month.isdigit():
+        partition, width = f"{int(year):04d}-{int(month):02d}", 7
+    else:
+        partition, width = f"{int(year):04d}", 4
+    
+    if start_date is not None and partition < start_date[:width]:
+        return False
+    if end_date is not None and partition > end_date[:width]:
+        return False
+    return True
+
+
+def month_partitions(start_date, end_date):
+    """
+    List the year/month partitions of a date range
+    
+    Args:
+        start_date: First date (YYYY-MM-DD)
+        end_date: Last date (YYYY-MM-DD)
+        
+    Returns:
+        List of (year, month) tuples
+    """
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    last = (int(end_date[:4]), int(end_date[5:7]))
+    
+    partitions = []
+    while (year, month) <= last:
+        partitions.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return partitions
+
+
+def prune_input_paths(paths, start_date=None, end_date=None, columnar=False):
+    """
+    Drop year=YYYY/month=MM input partitions outside a date range
+    
+    Local directories are walked, skipping partition directories out of
+    range, and replaced by their files. URIs ending with '/' are taken as
+    partitioned dataset roots and, when both dates are given, narrowed to
+    the months in range: with one Hadoop brace glob for text input, or one
+    prefix per month for columnar input, whose files mrjob lists itself
+    (its S3 globbing has no braces). Partition paths given explicitly are
+    kept only if in range; anything else is kept as is.
+    
+    Args:
+        paths: Input paths and URIs
+        start_date: First date (YYYY-MM-DD), or None
+        end_date: Last date (YYYY-MM-DD), or None
+        columnar: Input is read by mapper_raw (Parquet/Arrow)
+        
+    Returns:
+        List of input paths
+    """
+    pruned = []
+    for path in paths:
+        if '://' in path:
+            if not partition_in_range(path, start_date, end_date):
+                continue
+            if path.endswith('/') and start_date and end_date and 'year=' not in path:
+                months = month_partitions(start_date, end_date)
+                if columnar:
+                    pruned.extend(f"{path}year={year:04d}/month={month:02d}/"
+                                  for year, month in months)
+                else:
+                    years = defaultdict(list)
+                    for year, month in months:
+                        years[year].append(f"{month:02d}")
+                    alternatives = ','.join(
+                        f"year={year:04d}/month={{{','.join(year_months)}}}"
+                        for year, year_months in years.items()
+                    )
+                    pruned.append(f"{path}{{{alternatives}}}")
+                continue
+            pruned.append(path)
+        elif os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = sorted(
+                    d for d in dirs
+                    if not d.startswith(('_', '.'))
+                    and partition_in_range(os.path.join(root, d), start_date, end_date)
+                )
+                pruned.extend(
+                    os.path.join(root, name) for name in sorted(names)
+                    if not name.startswith(('_', '.')) and not name.endswith('.gzi')
+                )
+        elif partition_in_range(path, start_date, end_date):
+            pruned.append(path)
+    
+    return pruned
+
+
+def read_columnar_frames(path, input_format, batch_size=100000,
+                         start_date=None, end_date=None):
+    """
+    Read a Parquet or Arrow IPC file as blocks of typed rows
+    
+    Only the weather columns are read, as typed arrays, so there is no
+    text to parse. Dates may be stored as date/timestamp or as YYYY-MM-DD
+    strings. Blocks follow the rules of parse_weather_frame(): rows without
+    both temperatures are dropped and month_key is NaN for missing dates.
+    
+    With a date range, Parquet row groups whose date statistics lie
+    outside it are not read at all, and the remaining rows are filtered on
+    the date column before conversion.
+    
+    Args:
+        path: Local file path
+        input_format: 'parquet' or 'arrow' (Arrow IPC file / Feather v2)
+        batch_size: Maximum rows per block
+        start_date: First date (YYYY-MM-DD), or None
+        end_date: Last date (YYYY-MM-DD), or None
+        
+    Yields:
+        Tuples (rows read, rows out of the date range, DataFrame with the
+        columns of parse_weather_frame())
+    """
+    # pyarrow is only needed for columnar input, so import it lazily
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    
+    filtered = start_date is not None or end_date is not None
+    
+    if input_format == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        columns = [name for name in COLUMNAR_COLUMNS + ['station_id'] if name in names]
+        row_groups = list(range(parquet_file.num_row_groups))
+        
+        if filtered:
+            metadata = parquet_file.metadata
+            date_index = parquet_file.schema_arrow.get_field_index('date')
+            kept = []
+            for index in row_groups:
+                row_group = metadata.row_group(index)
+                statistics = row_group.column(date_index).statistics
+                if statistics is not None and statistics.has_min_max:
+                    # date32/timestamp statistics print as ISO dates
+                    first = str(statistics.min)[:10]
+                    last = str(statistics.max)[:10]
+                    if ((end_date is not None and first > end_date) or
+                            (start_date is not None and last < start_date)):
+                        yield row_group.num_rows, row_group.num_rows, None
+                        continue
+                kept.append(index)
+            row_groups = kept
+        
+        batches = parquet_file.iter_batches(
+            batch_size=batch_size, row_groups=row_groups, columns=columns
+        ) if row_groups else iter(())
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        names = reader.schema.names
+        columns = [name for name in COLUMNAR_COLUMNS + ['station_id'] if name in names]
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    
+    def floats(table, name):
+        if name not in table.column_names:
+            return float('nan')
+        return table.column(name).cast(pa.float64()).to_pandas()
+    
+    for batch in batches:
+        table = pa.Table.from_batches([batch]).select(columns)
+        dates = table.column('date')
+        is_text = pa.types.is_string(dates.type) or pa.types.is_large_string(dates.type)
+        
+        if not is_text:
+            dates = dates.cast(pa.date32(), safe=False)
+        
+        if filtered:
+            def bound(date_str):
+                return date_str if is_text else pa.scalar(
+                    datetime.strptime(date_str, '%Y-%m-%d').date(), pa.date32())
+            
+            mask = pc.is_valid(dates)
+            if start_date is not None:
+                mask = pc.and_(mask, pc.greater_equal(dates, bound(start_date)))
+            if end_date is not None:
+                mask = pc.and_(mask, pc.less_equal(dates, bound(end_date)))
+            
+            table = table.filter(mask)
+            dates = dates.filter(mask)
+        
+        if is_text:
+            date_strings = dates.to_pandas()
+            parsed = pd.to_datetime(date_strings, format='%Y-%m-%d', errors='coerce')
+            month_key = parsed.dt.year * 100 + parsed.dt.month
+        else:
+            date_strings = dates.cast(pa.string()).to_pandas()
+            month_key = pc.add(pc.multiply(pc.year(dates), 100),
+                               pc.month(dates)).to_pandas().astype(float)
+        
+        frame = pd.DataFrame({
+            'date': date_strings,
+            'temp_max': floats(table, 'temp_max'),
+            'temp_min': floats(table, 'temp_min'),
+            'precipitation': floats(table, 'precipitation'),
+            'station_id': (
+                table.column('station_id').cast(pa.string()).to_pandas().fillna('')
+                if 'station_id' in table.column_names else ''
+            ),
+            'month_key': month_key,
+        })
+        
+        yield (batch.num_rows, batch.num_rows - table.num_rows,
+               frame[frame['temp_max'].notna() & frame['temp_min'].notna()])
+
+
+def format_month_key(month_key):
+    """
+    Format a numeric YYYYMM month key as 'YYYY-MM'
+    
+    Args:
+        month_key: Month key such as 202201 (int or float)
+        
+    Returns:
+        Year-month string
+    """
+    month_key = int(month_key)
+    return f"{month_key // 100:04d}-{month_key % 100:02d}"
+
+
+def station_key(station_id, key):
+    """
+    Key a job's aggregate by station
+    
+    Args:
+        station_id: Station identifier, or None/'' for single-location input
+        key: The job's own key (e.g. year-month or category)
+        
+    Returns:
+        key unchanged without a station, otherwise (station_id, key)
+    """
+    if not station_id:
+        return key
+    return (station_id, key)
+
+
+def split_station_key(key):
+    """
+    Inverse of station_key()
+    
+    Args:
+        key: Key from station_key(), possibly decoded as a JSON list
+        
+    Returns:
+        Tuple (station_id or None, key)
+    """
+    if isinstance(key, (list, tuple)):
+        return key[0], key[1]
+    return None, key
+
+
+def station_result(station_id, result):
+    """
+    Add the station to an output record
+    
+    Args:
+        station_id: Station identifier or None
+        result: Output record dictionary
+        
+    Returns:
+        result, led by a "station_id" field when station_id is set
+    """
+    if station_id is None:
+        return result
+    return {"station_id": station_id, **result}
+
+
+# Hadoop counter groups written by every weather job
+LINE_COUNTERS = 'Weatheria lines'
+EMITTED_COUNTERS = 'Weatheria emitted'
+TIME_COUNTERS = 'Weatheria map ms'
+TASK_LINE_COUNTERS = 'Weatheria map task lines'
+TASK_TIME_COUNTERS = 'Weatheria map task ms'
+
+
+def power_of_two_bucket(value):
+    """
+    Histogram bucket of a non-negative amount, for per-task counters
+    
+    Hadoop only sums counters over tasks, so per-task amounts (lines read,
+    milliseconds spent) are reported as one increment of a bucket; the
+    buckets then show the spread of the tasks.
+    
+    Args:
+        value: Non-negative number
+        
+    Returns:
+        Bucket name "<=2^N" for the smallest N with value <= 2^N
+    """
+    return f"<=2^{max(0, math.ceil(value) - 1).bit_length()}"
+
+
+class TaskCounters(object):
+    """
+    Counters of one map task
+    
+    mrjob writes a stderr line for every increment_counter() call, so counts
+    and timings are kept in memory and reported once, when the task ends.
+    
+    Args:
+        timing: Also accumulate per-phase timings
+    """
+    
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.lines = defaultdict(int)
+        self.emitted = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.total_lines = 0
+    
+    def count_line(self, line, record):
+        """
+        Count an input line by its parse outcome
+        
+        Args:
+            line: CSV line
+            record: WeatherRecord parsed from it, or None
+        """
+        self.total_lines += 1
+        
+        if record is not None:
+            self.lines['parsed'] += 1
+            if record.year_month is None:
+                self.lines['bad_date'] += 1
+        elif line.startswith('date') or not line.strip():
+            self.lines['skipped'] += 1
+        else:
+            self.lines['malformed'] += 1
+    
+    def count_block(self, lines, frame):
+        """
+        Count a block of input lines parsed by parse_weather_frame()
+        
+        Args:
+            lines: List of CSV lines
+            frame: DataFrame parsed from them
+        """
+        skipped = sum(1 for line in lines if line.startswith('date') or not line.strip())
+        
+        self.total_lines += len(lines)
+        self.lines['parsed'] += len(frame)
+        self.lines['skipped'] += skipped
+        self.lines['malformed'] += len(lines) - skipped - len(frame)
+        self.lines['bad_date'] += int(frame['month_key'].isna().sum())
+    
+    def count_out_of_range(self, line):
+        """
+        Count an input line rejected by the date range before parsing
+        
+        Args:
+            line: CSV line
+        """
+        self.total_lines += 1
+        
+        if line.startswith('date') or not line.strip():
+            self.lines['skipped'] += 1
+        else:
+            self.lines['out_of_range'] += 1
+    
+    def count_rows(self, rows, frame, out_of_range=0):
+        """
+        Count a block of columnar rows read by read_columnar_frames()
+        
+        Args:
+            rows: Rows read
+            frame: DataFrame of the valid rows in range, or None
+            out_of_range: Rows outside the date range
+        """
+        parsed = 0 if frame is None else len(frame)
+        
+        self.total_lines += rows
+        self.lines['parsed'] += parsed
+        self.lines['out_of_range'] += out_of_range
+        self.lines['malformed'] += rows - out_of_range - parsed
+        if frame is not None:
+            self.lines['bad_date'] += int(frame['month_key'].isna().sum())
+    
+    def as_dict(self):
+        """
+        Counters in mrjob's format
+        
+        The time spent in map functions minus parsing is reported as
+        "classify"; "emit" is the time spent downstream of the mapper
+        (serializing and writing its records).
+        
+        Returns:
+            Dictionary {group: {name: amount}}
+        """
+        counters = {
+            LINE_COUNTERS: {name: amount for name, amount in self.lines.items() if amount},
+            EMITTED_COUNTERS: dict(self.emitted),
+            TASK_LINE_COUNTERS: {power_of_two_bucket(self.total_lines): 1},
+        }
+        
+        if self.timing:
+            parse = self.seconds['parse']
+            classify = max(0.0, self.seconds['map'] - parse)
+            emit = self.seconds['emit']
+            counters[TIME_COUNTERS] = {
+                'parse': round(parse * 1000),
+                'classify': round(classify * 1000),
+                'emit': round(emit * 1000),
+            }
+            counters[TASK_TIME_COUNTERS] = {
+                power_of_two_bucket((parse + classify + emit) * 1000): 1
+            }
+        
+        return counters
+
+
+def merge_counters(counter_dicts):
+    """
+    Add up counters of several tasks or steps
+    
+    Args:
+        counter_dicts: Iterable of {group: {name: amount}}
+        
+    Returns:
+        Dictionary {group: {name: amount}}
+    """
+    merged = defaultdict(lambda: defaultdict(int))
+    for counters in counter_dicts:
+        for group, names in counters.items():
+            for name, amount in names.items():
+                merged[group][name] += amount
+    return {group: dict(names) for group, names in merged.items()}
+
+
+def build_run_report(job_name, counters):
+    """
+    Summarize a run's counters as a machine-readable report
+    
+    Args:
+        job_name: Job name
+        counters: Counters {group: {name: amount}} summed over the run
+        
+    Returns:
+        Dictionary with line outcomes, malformed rate, emitted records per
+        key class, per-task line (and, with --timing, millisecond)
+        histograms, and per-phase map times
+    """
+    lines = counters.get(LINE_COUNTERS, {})
+    total = sum(lines.get(name, 0) for name in ('parsed', 'skipped', 'malformed'))
+    
+    def histogram(group):
+        buckets = counters.get(group, {})
+        return dict(sorted(buckets.items(), key=lambda item: int(item[0].split('^')[1])))
+    
+    report = {
+        'job': job_name,
+        'lines': dict(lines, total=total),
+        'malformed_rate': lines.get('malformed', 0) / total if total else 0.0,
+        'emitted': counters.get(EMITTED_COUNTERS, {}),
+        'map_task_lines': histogram(TASK_LINE_COUNTERS),
+    }
+    
+    if TIME_COUNTERS in counters:
+        report['map_ms'] = counters[TIME_COUNTERS]
+        report['parse_us_per_line'] = (
+            counters[TIME_COUNTERS].get('parse', 0) * 1000 / total if total else 0.0)
+        report['map_task_ms'] = histogram(TASK_TIME_COUNTERS)
+    
+    report['counters'] = counters
+    return report
+
+
+class WeatherJob(MRJob):
+    """
+    Base class for jobs over the daily weather CSV
+    
+    Subclasses implement map_record() instead of parsing lines themselves.
+    Reducers yield (key, record) where record is a dict of named, typed
+    fields; only the record is written, one JSON object per line, so the
+    output can be loaded with a single vectorized JSON-lines read.
+    """
+    
+    OUTPUT_PROTOCOL = JSONValueProtocol
+    
+    # Ship the shared modules next to the job script on Hadoop/EMR
+    FILES = ['weather_job.py', 'protocols.py']
+    
+    def configure_args(self):
+        """Register options shared by all weather jobs"""
+        super(WeatherJob, self).configure_args()
+        self.add_passthru_arg(
+            '--packed-protocol',
+            action='store_true',
+            default=False,
+            help='Use the typed binary PackedValueProtocol instead of JSON '
+                 'for intermediate (mapper/combiner/reducer) records. '
+                 'Shuffles about 35-45%% fewer bytes but encodes and decodes '
+                 'about 1.5x slower (scripts/benchmark_protocols.py), so it '
+                 'only pays off when the shuffle is I/O-bound'
+        )
+        self.add_passthru_arg(
+            '--batch-mapper',
+            action='store_true',
+            default=False,
+            help='Buffer input lines and parse/aggregate them in blocks with '
+                 'pandas instead of one line at a time (requires pandas on '
+                 'the task nodes)'
+        )
+        self.add_passthru_arg(
+            '--batch-size',
+            type=int,
+            default=100000,
+            help='Lines per block in --batch-mapper mode (default: 100000)'
+        )
+        self.add_passthru_arg(
+            '--input-format',
+            choices=['csv', 'parquet', 'arrow'],
+            default='csv',
+            help='Input file format: CSV text (default), or Parquet / Arrow '
+                 'IPC files read whole by each map task, only the weather '
+                 'columns, as typed arrays (requires pyarrow and pandas on '
+                 'the task nodes)'
+        )
+        self.add_passthru_arg(
+            '--start-date',
+            default=None,
+            help='Only read records dated on or after this YYYY-MM-DD date; '
+                 'year=YYYY/month=MM input partitions outside the range are '
+                 'not read at all'
+        )
+        self.add_passthru_arg(
+            '--end-date',
+            default=None,
+            help='Only read records dated on or before this YYYY-MM-DD date'
+        )
+        self.add_passthru_arg(
+            '--timing',
+            action='store_true',
+            default=False,
+            help='Time the parse, classify and emit phases of the mappers '
+                 'and report them in counters'
+        )
+        self.add_passthru_arg(
+            '--run-report',
+            default=None,
+            help='Local path or URI of a JSON report of the run built from '
+                 'its counters (lines parsed/skipped/malformed, records '
+                 'emitted per key class, per-task histograms, map timings)'
+        )
+    
+    def __init__(self, *args, **kwargs):
+        super(WeatherJob, self).__init__(*args, **kwargs)
+        
+        # Counters of the current map task, reported by mapper_final
+        self.task_counters = TaskCounters(timing=self.options.timing)
+        
+        for name in ('start_date', 'end_date'):
+            value = getattr(self.options, name)
+            if value is not None:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    raise ValueError(f"--{name.replace('_', '-')} must be a YYYY-MM-DD date, "
+                                     f"got {value!r}")
+        
+        self.date_filtered = (self.options.start_date is not None or
+                              self.options.end_date is not None)
+    
+    def make_runner(self):
+        """Make a runner, with input partitions outside the date range pruned"""
+        if self.date_filtered:
+            paths = prune_input_paths(
+                self.options.args, self.options.start_date, self.options.end_date,
+                columnar=self.options.input_format != 'csv'
+            )
+            if not paths:
+                raise ValueError('No input partitions in the date range')
+            self.options.args = paths
+        
+        return super(WeatherJob, self).make_runner()
+    
+    def in_date_range(self, line):
+        """
+        Check a CSV line's date prefix against --start-date/--end-date
+        
+        Args:
+            line: CSV line
+            
+        Returns:
+            True if the line should be parsed
+        """
+        return date_in_range(line[:10], self.options.start_date, self.options.end_date)
+    
+    def internal_protocol(self):
+        """Protocol for records passed between steps and tasks"""
+        if self.options.packed_protocol:
+            return PackedValueProtocol()
+        return super(WeatherJob, self).internal_protocol()
+    
+    def mapper_functions(self):
+        """
+        Mapper, and optionally mapper_init/mapper_final, for the job
+        
+        Returns:
+            Dictionary of MRStep keyword arguments
+        """
+        if self.options.input_format != 'csv':
+            return dict(mapper_raw=self.columnar_mapper_raw)
+        if self.options.batch_mapper:
+            return dict(
+                mapper_init=self.batch_mapper_init,
+                mapper=self.batch_mapper,
+                mapper_final=self.batch_mapper_final
+            )
+        return dict(mapper=self.mapper)
+    
+    def mapper_step_kwargs(self):
+        """
+        Mapper functions for the job's MRStep, instrumented
+        
+        The mapper (or mapper_raw) and mapper_final from mapper_functions()
+        are wrapped to count emitted records per key_class() and, with
+        --timing, to time them; the wrapped mapper_final reports the task's
+        counters.
+        
+        Returns:
+            Dictionary of MRStep keyword arguments
+        """
+        functions = self.mapper_functions()
+        counters = self.task_counters
+        mapper_name = 'mapper_raw' if 'mapper_raw' in functions else 'mapper'
+        mapper = functions[mapper_name]
+        mapper_final = functions.get('mapper_final')
+        
+        def emit(function, *args):
+            if not counters.timing:
+                for key, value in function(*args) or ():
+                    counters.emitted[self.key_class(key)] += 1
+                    yield key, value
+                return
+            
+            start = time.perf_counter()
+            for key, value in function(*args) or ():
+                mapped = time.perf_counter()
+                counters.seconds['map'] += mapped - start
+                counters.emitted[self.key_class(key)] += 1
+                yield key, value
+                start = time.perf_counter()
+                counters.seconds['emit'] += start - mapped
+            counters.seconds['map'] += time.perf_counter() - start
+        
+        def counted_mapper(*args):
+            return emit(mapper, *args)
+        
+        def counted_mapper_final():
+            if mapper_final is not None:
+                yield from emit(mapper_final)
+            self.report_counters()
+        
+        return dict(functions, **{
+            mapper_name: counted_mapper,
+            'mapper_final': counted_mapper_final,
+        })
+    
+    def report_counters(self):
+        """Write the map task's counters to Hadoop"""
+        for group, names in self.task_counters.as_dict().items():
+            for name, amount in names.items():
+                self.increment_counter(group, name, amount)
+    
+    def key_class(self, key):
+        """
+        Class of an intermediate key, for the emitted records counters
+        
+        Subclasses with a few kinds of keys (e.g. categories) override this;
+        the number of classes must stay small, as Hadoop caps counters.
+        
+        Args:
+            key: Intermediate key
+            
+        Returns:
+            Counter name
+        """
+        return 'records'
+    
+    def mapper(self, _, line):
+        """
+        Parse a CSV line and emit the job's records for it
+        
+        Args:
+            _: Line number (ignored)
+            line: CSV line
+            
+        Yields:
+            (key, value) pairs from map_record()
+        """
+        counters = self.task_counters
+        if self.date_filtered and not self.in_date_range(line):
+            counters.count_out_of_range(line)
+            return
+        
+        if counters.timing:
+            start = time.perf_counter()
+            record = parse_weather_line(line)
+            counters.seconds['parse'] += time.perf_counter() - start
+        else:
+            record = parse_weather_line(line)
+        
+        counters.count_line(line, record)
+        if record is None:
+            return
+        
+        yield from self.map_record(record)
+    
+    def map_record(self, record):
+        """
+        Emit intermediate (key, value) pairs for a parsed record
+        
+        Args:
+            record: WeatherRecord
+            
+        Yields:
+            (key, value) pairs
+        """
+        raise NotImplementedError
+    
+    def map_frame(self, frame):
+        """
+        Emit intermediate (key, value) pairs for a block of parsed rows
+        
+        Subclasses override this with vectorized partial aggregates in their
+        combiner's value format; the default feeds each row to map_record().
+        
+        Args:
+            frame: DataFrame from parse_weather_frame()
+            
+        Yields:
+            (key, value) pairs
+        """
+        for row in frame.itertuples(index=False):
+            year_month = None if math.isnan(row.month_key) else format_month_key(row.month_key)
+            precipitation = None if math.isnan(row.precipitation) else float(row.precipitation)
+            record = WeatherRecord(
+                row.date, year_month, float(row.temp_max), float(row.temp_min), precipitation,
+                row.station_id or None)
+            
+            yield from self.map_record(record)
+    
+    def batch_mapper_init(self):
+        """Start an empty line buffer for this map task"""
+        self.batch_lines = []
+    
+    def batch_mapper(self, _, line):
+        """
+        Buffer a CSV line, processing the buffer once it is full
+        
+        Args:
+            _: Line number (ignored)
+            line: CSV line
+            
+        Yields:
+            (key, value) pairs from map_frame()
+        """
+        if self.date_filtered and not self.in_date_range(line):
+            self.task_counters.count_out_of_range(line)
+            return
+        
+        self.batch_lines.append(line)
+        
+        if len(self.batch_lines) >= self.options.batch_size:
+            yield from self.flush_batch()
+    
+    def batch_mapper_final(self):
+        """
+        Process the lines left in the buffer
+        
+        Yields:
+            (key, value) pairs from map_frame()
+        """
+        yield from self.flush_batch()
+    
+    def flush_batch(self):
+        """
+        Parse and aggregate the buffered lines as one block
+        
+        Yields:
+            (key, value) pairs from map_frame()
+        """
+        if not self.batch_lines:
+            return
+        
+        counters = self.task_counters
+        start = time.perf_counter()
+        frame = parse_weather_frame(self.batch_lines)
+        counters.seconds['parse'] += time.perf_counter() - start
+        
+        counters.count_block(self.batch_lines, frame)
+        self.batch_lines = []
+        
+        yield from self.map_frame(frame)
+    
+    def columnar_mapper_raw(self, path, uri):
+        """
+        Read a whole Parquet or Arrow file and map it block by block
+        
+        Args:
+            path: Local copy of the input file
+            uri: Original input URI (unused)
+            
+        Yields:
+            (key, value) pairs from map_frame()
+        """
+        counters = self.task_counters
+        frames = read_columnar_frames(
+            path, self.options.input_format, self.options.batch_size,
+            start_date=self.options.start_date, end_date=self.options.end_date
+        )
+        
+        while True:
+            start = time.perf_counter()
+            block = next(frames, None)
+            counters.seconds['parse'] += time.perf_counter() - start
+            
+            if block is None:
+                return
+            
+            rows, out_of_range, frame = block
+            counters.count_rows(rows, frame, out_of_range)
+            
+            if frame is not None:
+                yield from self.map_frame(frame)
+    
+    def run_job(self):
+        """Run the job, then write the --run-report if requested"""
+        if not self.options.run_report:
+            return super(WeatherJob, self).run_job()
+        
+        self.set_up_logging(quiet=self.options.quiet,
+                            verbose=self.options.verbose)
+        
+        with self.make_runner() as runner:
+            runner.run()
+            
+            # Same default as mrjob: print the output unless it has a home
+            cat_output = self.options.cat_output
+            if cat_output is None:
+                cat_output = not self.options.output_dir
+            
+            if cat_output:
+                for chunk in runner.cat_output():
+                    self.stdout.write(chunk)
+                self.stdout.flush()
+            
+            self.write_run_report(runner)
+    
+    def write_run_report(self, runner):
+        """
+        Write the JSON run report of a finished run to --run-report
+        
+        Args:
+            runner: mrjob runner that ran the job
+        """
+        report = build_run_report(type(self).__name__, merge_counters(runner.counters()))
+        path = self.options.run_report
+        
+        if '://' in path:
+            local_dir = tempfile.mkdtemp()
+            try:
+                local_path = os.path.join(local_dir, 'run_report.json')
+                with open(local_path, 'w') as f:
+                    json.dump(report, f, indent=2)
+                if runner.fs.exists(path):
+                    runner.fs.rm(path)
+                runner.fs.put(local_path, path)
+            finally:
+                shutil.rmtree(local_dir, ignore_errors=True)
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,25 @@
+"""
+Shared pytest configuration
+"""
+
+import os
+import sys
+
+# The MapReduce jobs import their sibling modules by name, exactly as they do
+# when mrjob runs them as scripts, so put src/mapreduce on the path.
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'mapreduce')
+)
+
+# Standalone helpers (e.g. the synthetic data generator) live in scripts/
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+)
+
+# The API package (src/api) is imported as "api"
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+)
@@ -0,0 +1,158 @@
+"""
+Unit tests for the API's parsed results cache and non-blocking data access
+"""
+
+import asyncio
+import io
+import json
+import os
+import threading
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from api.config import settings
+from api.dependencies.file_handler import ResultsCache, load_csv_data, results_cache
+from api.main import app
+
+
+COLUMNS = ['station_id', 'month', 'avg_max', 'avg_min']
+
+
+def write_results(path, records):
+    """Write JSON-lines results"""
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    """Empty results directory with a fresh cache"""
+    monkeypatch.setattr(settings, 'results_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'use_s3', False)
+    results_cache.clear()
+    yield tmp_path
+    results_cache.clear()
+
+
+def test_steady_state_requests_do_no_io(results_dir, monkeypatch):
+    """Repeated requests are served from memory until the file changes"""
+    path = results_dir / settings.monthly_avg_file
+    write_results(path, [{'month': '2022-01', 'avg_max': 28.5, 'avg_min': 17.2}])
+    
+    client = TestClient(app)
+    assert client.get('/monthly-avg/hottest').status_code == 200
+    
+    def no_io(*args, **kwargs):
+        raise AssertionError('results read from disk')
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'stat', no_io)
+        patch.setattr('api.dependencies.file_handler.read_results', no_io)
+        for _ in range(20):
+            assert client.get('/monthly-avg/hottest').json()['month'] == '2022-01'
+    
+    stats = client.get('/cache-stats').json()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (20, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(20 / 21)
+    assert stats['revalidated_rate'] == 0.0
+
+
+def test_cache_revalidates_after_ttl(results_dir, monkeypatch):
+    """Expired entries are kept while the file is unchanged, reloaded when it changes"""
+    monkeypatch.setattr(results_cache, 'ttl', 0)
+    path = results_dir / settings.monthly_avg_file
+    write_results(path, [{'month': '2022-01', 'avg_max': 28.5, 'avg_min': 17.2}])
+    
+    first = load_csv_data(settings.monthly_avg_file, COLUMNS)
+    first['avg_max'] = 0.0
+    assert load_csv_data(settings.monthly_avg_file, COLUMNS)['avg_max'].tolist() == [28.5]
+    
+    write_results(path, [
+        {'month': '2022-01', 'avg_max': 28.5, 'avg_min': 17.2},
+        {'month': '2022-02', 'avg_max': 29.1, 'avg_min': 17.8},
+    ])
+    os.utime(path, ns=(0, 0))
+    assert len(load_csv_data(settings.monthly_avg_file, COLUMNS)) == 2
+    
+    stats = results_cache.stats()
+    assert (stats['hits'], stats['revalidated'], stats['misses']) == (0, 1, 2)
+    assert (stats['hit_rate'], stats['revalidated_rate']) == (0.0, pytest.approx(1 / 3))
+
+
+def test_cache_evicts_least_recently_used():
+    """Entries beyond the limit are evicted, least recently used first"""
+    cache = ResultsCache(max_entries=2, ttl=60)
+    loads = []
+    
+    def get(key):
+        return cache.get(key, lambda: 1, lambda version: loads.append(key) or [key])
+    
+    for key in ('a', 'b', 'a', 'c', 'a', 'b'):
+        get(key)
+    
+    assert loads == ['a', 'b', 'c', 'b']
+    assert list(cache.entries) == ['a', 'b']
+    assert cache.stats()['evictions'] == 2
+
+
+class SlowS3Client:
+    """S3 stand-in whose part file downloads block until released"""
+    
+    def __init__(self, parts):
+        self.parts = parts
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def get_paginator(self, operation):
+        return self
+    
+    def paginate(self, Bucket, Prefix):
+        contents = [
+            {'Key': key, 'ETag': '"1"', 'Size': len(data)}
+            for key, data in self.parts.items() if key.startswith(Prefix)
+        ]
+        yield {'Contents': contents} if contents else {}
+    
+    def get_object(self, Bucket, Key):
+        self.started.set()
+        self.release.wait(timeout=10)
+        return {'Body': io.BytesIO(self.parts[Key])}
+
+
+def test_slow_s3_read_does_not_block_other_requests(results_dir, monkeypatch):
+    """Other endpoints answer while an S3 download is in flight"""
+    write_results(results_dir / settings.monthly_avg_file,
+                  [{'month': '2022-01', 'avg_max': 28.5, 'avg_min': 17.2}])
+    write_results(results_dir / settings.extreme_temps_file,
+                  [{'category': 'normal', 'count': 31, 'avg_temp': 22.4}])
+    
+    record = {'month': '2022-01', 'correlation': -0.5, 'avg_temp': 22.8,
+              'avg_precip': 4.1, 'rainy_days': 18, 'total_precip': 127.1}
+    s3 = SlowS3Client({'output/temp_precip/part-00000': (json.dumps(record) + '\n').encode()})
+    monkeypatch.setattr(settings, 'use_s3', True)
+    monkeypatch.setattr('api.dependencies.file_handler.get_s3_client', lambda: s3)
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            slow = asyncio.create_task(client.get('/temp-precipitation/wettest-month'))
+            while not s3.started.is_set():
+                await asyncio.sleep(0.01)
+            
+            # With the download blocked, local results are still served
+            responses = await asyncio.gather(
+                client.get('/health'),
+                client.get('/monthly-avg/hottest'),
+                client.get('/extreme-temps/summary'),
+            )
+            assert [response.status_code for response in responses] == [200, 200, 200]
+            assert not slow.done()
+            
+            s3.release.set()
+            return await slow
+    
+    response = asyncio.run(scenario())
+    assert response.status_code == 200 and response.json()['total_precip'] == 127.1
@@ -0,0 +1,51 @@
+"""
+Unit tests for the synthetic weather data generator
+"""
+
+from generate_weather_data import generate_lines
+
+
+def test_generator_is_deterministic():
+    """The same options always produce the same lines"""
+    first = list(generate_lines(500, stations=3, malformed_rate=0.05, seed=1))
+    second = list(generate_lines(500, stations=3, malformed_rate=0.05, seed=1))
+    
+    assert first == second
+    assert first != list(generate_lines(500, stations=3, malformed_rate=0.05, seed=2))
+
+
+def test_generator_layout():
+    """Rows follow the job input layout, one row per station and day"""
+    lines = list(generate_lines(1000, stations=4, years=1, start_year=2020))
+    
+    assert lines[0] == 'date,temp_max,temp_min,precipitation,station_id'
+    assert len(lines) == 1001
+    
+    rows = [line.split(',') for line in lines[1:]]
+    assert all(len(parts) == 5 for parts in rows)
+    assert rows[0][0] == rows[3][0] == '2020-01-01'
+    assert rows[4][0] == '2020-01-02'
+    assert [parts[4] for parts in rows[:4]] == ['ST00000', 'ST00001', 'ST00002', 'ST00003']
+    assert all(float(parts[1]) > float(parts[2]) - 5 and float(parts[3]) >= 0 for parts in rows)
+
+
+def test_generator_wraps_dates_and_corrupts_lines():
+    """Row counts beyond the date range repeat dates; a share of lines is malformed"""
+    lines = list(generate_lines(20000, years=1, start_year=2021, malformed_rate=0.1, seed=3))
+    
+    assert lines[0] == 'date,temp_max,temp_min,precipitation'
+    assert len(lines) == 20001
+    assert sum(line.startswith('2021-01-01,') for line in lines) > 1
+    
+    valid = 0
+    for line in lines[1:]:
+        parts = line.split(',')
+        try:
+            float(parts[1])
+            float(parts[2])
+        except (ValueError, IndexError):
+            continue
+        if len(parts) == 4 and parts[0][4] == '-':
+            valid += 1
+    
+    assert 0.85 < valid / 20000 < 0.95
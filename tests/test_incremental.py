@@ -0,0 +1,122 @@
+"""
+Unit tests for incremental runs over stored job state
+"""
+
+import json
+import os
+
+import pytest
+
+from incremental import run_incremental
+from test_local_engine import read_part_files
+from test_mapreduce import DATA_FILE, keyed, run_job
+from monthly_avg_temp import MonthlyAvgTemperature
+from extreme_temps import ExtremeTemperatures
+from temp_precipitation import TempPrecipitationCorrelation
+
+
+def write_history_and_delta(tmp_path, split_at=30, overlap=5):
+    """Cut the test data into a history file and an overlapping delta file"""
+    with open(DATA_FILE) as f:
+        header, *lines = f.read().splitlines()
+    
+    history = tmp_path / 'history.csv'
+    delta = tmp_path / 'delta.csv'
+    history.write_text('\n'.join([header] + lines[:split_at]) + '\n')
+    delta.write_text('\n'.join([header] + lines[split_at - overlap:]) + '\n')
+    return str(history), str(delta)
+
+
+def test_incremental_delta_matches_full_run(tmp_path):
+    """History plus an overlapping delta gives the same results as one full run"""
+    history, delta = write_history_and_delta(tmp_path)
+    
+    for job_name, job_class, job_args in [
+        ('monthly_avg', MonthlyAvgTemperature, []),
+        ('extreme_temps', ExtremeTemperatures, ['--top-k', '3']),
+        ('temp_precip', TempPrecipitationCorrelation, []),
+    ]:
+        output_dir = str(tmp_path / job_name)
+        run_incremental(job_name, [history], output_dir, job_args=job_args, processes=2)
+        summary = run_incremental(job_name, [delta], output_dir, job_args=job_args,
+                                  processes=2)
+        
+        assert summary['watermarks'] == {'': '2022-05-10'}
+        assert summary['already_merged'] == 5
+        assert keyed((None, record) for record in read_part_files(output_dir)) == \
+            run_job(job_class, *job_args)
+    
+    # Rerunning the same delta adds nothing
+    summary = run_incremental('temp_precip', [delta], str(tmp_path / 'temp_precip'),
+                              processes=2)
+    assert summary['new_records'] == 0
+    assert summary['already_merged'] == 30
+
+
+def write_station_lines(path, header, station_lines):
+    """Write (station, lines) groups as one CSV with a station_id column"""
+    path.write_text('\n'.join(
+        [header + ',station_id'] +
+        [f'{line},{station}' for station, lines in station_lines for line in lines]
+    ) + '\n')
+    return str(path)
+
+
+def test_incremental_watermarks_are_per_station(tmp_path):
+    """A station behind the others, or new in a delta, still gets its records merged"""
+    with open(DATA_FILE) as f:
+        header, *lines = f.read().splitlines()
+    
+    history = write_station_lines(tmp_path / 'history.csv', header, [
+        ('MED01', lines[:40]), ('BOG02', lines[:20])
+    ])
+    # BOG02's new days and all of CAL03 are older than MED01's watermark
+    delta = write_station_lines(tmp_path / 'delta.csv', header, [
+        ('MED01', lines[35:]), ('BOG02', lines[15:30]), ('CAL03', lines[:10])
+    ])
+    full = write_station_lines(tmp_path / 'full.csv', header, [
+        ('MED01', lines), ('BOG02', lines[:30]), ('CAL03', lines[:10])
+    ])
+    
+    output_dir = str(tmp_path / 'monthly_avg')
+    run_incremental('monthly_avg', [history], output_dir, processes=2)
+    summary = run_incremental('monthly_avg', [delta], output_dir, processes=2)
+    
+    assert summary['already_merged'] == 10
+    assert summary['watermarks'] == {
+        'MED01': lines[-1][:10], 'BOG02': lines[29][:10], 'CAL03': lines[9][:10]
+    }
+    
+    job = MonthlyAvgTemperature(['-r', 'inline', '--no-conf', full])
+    with job.make_runner() as runner:
+        runner.run()
+        expected = [record for _, record in job.parse_output(runner.cat_output())]
+    assert sorted(read_part_files(output_dir), key=json.dumps) == \
+        sorted(expected, key=json.dumps)
+
+
+def test_incremental_fused_job_and_state_checks(tmp_path):
+    """The fused job keeps per-analysis outputs current; mismatched args fail"""
+    history, delta = write_history_and_delta(tmp_path)
+    root = tmp_path / 'results'
+    job_args = ['--analysis-output-root', str(root)]
+    state_dir = str(tmp_path / 'fused')
+    
+    run_incremental('weather_analyses', [history], state_dir, job_args=job_args,
+                    processes=2)
+    run_incremental('weather_analyses', [delta], state_dir, job_args=job_args,
+                    processes=2)
+    
+    for name, job_class in [
+        ('monthly_avg', MonthlyAvgTemperature),
+        ('extreme_temps', ExtremeTemperatures),
+        ('temp_precip', TempPrecipitationCorrelation),
+    ]:
+        assert keyed((None, record) for record in read_part_files(str(root / name))) == \
+            run_job(job_class)
+    
+    with open(os.path.join(state_dir, '_state.json')) as f:
+        assert json.load(f)['watermarks'] == {'': '2022-05-10'}
+    
+    with pytest.raises(ValueError):
+        run_incremental('weather_analyses', [delta], state_dir, processes=2)
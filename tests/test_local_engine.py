@@ -0,0 +1,230 @@
+"""
+Unit tests for the multiprocess local engine
+"""
+
+import bz2
+import gzip
+import json
+import os
+
+import pytest
+
+import local_engine
+from bgzf import BgzfWriter, is_bgzf
+from local_engine import assign_partitions, iter_range_lines, run_local, run_map_task, split_input
+from test_mapreduce import DATA_FILE, keyed, run_job, write_columnar_data
+from monthly_avg_temp import MonthlyAvgTemperature
+from extreme_temps import ExtremeTemperatures
+from temp_precipitation import TempPrecipitationCorrelation
+from rolling_window import RollingWindowStats
+from temp_histograms import TemperatureHistograms
+
+
+def read_part_files(output_dir):
+    """Read every JSON record from a directory of part files"""
+    records = []
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith('part-'):
+            with open(os.path.join(output_dir, name)) as f:
+                records.extend(json.loads(line) for line in f)
+    return records
+
+
+def decimal_places(value):
+    """Digits after the decimal point in a float's shortest repr"""
+    text = repr(value)
+    return len(text.split('.')[1]) if '.' in text and 'e' not in text else 0
+
+
+def assert_records_match(actual, expected):
+    """
+    Compare output records exactly, except for rounding ties
+    
+    A mean exactly half-way between two rounded values (e.g. the May 2022
+    average temperature of the test data, 23.635) rounds up or down with
+    the last bits of its sum, and the engine adds partial sums in another
+    order than the inline runner. Such floats may differ by exactly one
+    unit in their last rounded decimal place; any other difference fails.
+    """
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and actual.keys() == expected.keys()
+        for key in expected:
+            assert_records_match(actual[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(actual) == len(expected)
+        for actual_item, expected_item in zip(actual, expected):
+            assert_records_match(actual_item, expected_item)
+    elif isinstance(expected, float) and actual != expected:
+        unit = 10.0 ** -max(decimal_places(actual), decimal_places(expected))
+        assert abs(actual - expected) == pytest.approx(unit, rel=1e-6), (actual, expected)
+    else:
+        assert actual == expected
+
+
+def test_byte_ranges_cover_every_line_once():
+    """Line-aligned ranges neither drop nor duplicate lines at boundaries"""
+    with open(DATA_FILE) as f:
+        expected = f.read().splitlines()
+    
+    for num_splits, split_size in [(1, 10 ** 9), (4, 10 ** 9), (1, 37), (64, 10 ** 9)]:
+        lines = [
+            line
+            for path, start, end in split_input([DATA_FILE], num_splits, split_size)
+            for line in iter_range_lines(path, start, end)
+        ]
+        assert lines == expected
+
+
+def write_bgzf_data(tmp_path, index=True):
+    """Write the test data as block-gzip with small blocks"""
+    os.makedirs(tmp_path / 'bgzip', exist_ok=True)
+    path = str(tmp_path / 'bgzip' / 'weather.csv.gz')
+    with open(DATA_FILE, 'rb') as f, BgzfWriter(path, index=index, block_data_size=300) as out:
+        out.write(f.read())
+    return path
+
+
+@pytest.mark.parametrize('index', [True, False])
+def test_bgzf_ranges_cover_every_line_once(tmp_path, index):
+    """BGZF input is cut into ranges like plain text, with or without a .gzi"""
+    path = write_bgzf_data(tmp_path, index)
+    with open(DATA_FILE) as f:
+        expected = f.read().splitlines()
+    
+    assert is_bgzf(path) and not is_bgzf(DATA_FILE)
+    assert os.path.exists(path + '.gzi') == index
+    with gzip.open(path, 'rt') as f:
+        assert f.read().splitlines() == expected
+    
+    for num_splits, split_size in [(1, 10 ** 9), (4, 10 ** 9), (1, 37)]:
+        splits = split_input([path], num_splits, split_size)
+        assert len(splits) >= num_splits
+        assert [line for split in splits for line in iter_range_lines(*split)] == expected
+
+
+def test_local_engine_reads_compressed_input(tmp_path):
+    """BGZF input is split across map tasks; bzip2 streams are read whole"""
+    os.makedirs(tmp_path / 'bzip2')
+    bzip2_path = str(tmp_path / 'bzip2' / 'weather.csv.bz2')
+    with open(DATA_FILE, 'rb') as f, bz2.open(bzip2_path, 'wb') as out:
+        out.write(f.read())
+    
+    for path, map_tasks in [(write_bgzf_data(tmp_path), 8), (bzip2_path, 1)]:
+        output_dir = str(tmp_path / ('output' + os.path.splitext(path)[1]))
+        summary = run_local('monthly_avg', [os.path.dirname(path)], output_dir,
+                            processes=2, split_size=200)
+        
+        assert summary['map_tasks'] == map_tasks
+        assert summary['input_lines'] == 56
+        assert_records_match(
+            keyed((None, record) for record in read_part_files(output_dir)),
+            run_job(MonthlyAvgTemperature)
+        )
+
+
+def test_assign_partitions_balances_whole_keys():
+    """Keys are never split and the heaviest keys are spread first"""
+    pairs = [('a', 1)] * 4 + [(['s1', 'b'], 1)] * 2 + [(('s2', 'b'), 1)] * 2
+    partitions = assign_partitions(pairs, 2)
+    
+    assert sorted(len(partition) for partition in partitions) == [4, 4]
+    for partition in partitions:
+        keys = {json.dumps(list(key) if isinstance(key, tuple) else key)
+                for key, _ in partition}
+        assert keys in ({'"a"'}, {'["s1", "b"]', '["s2", "b"]'})
+
+
+def test_local_engine_matches_mrjob_runner(tmp_path):
+    """Parallel map/combine/reduce writes the same records as the inline runner"""
+    for job_name, job_class in [
+        ('monthly_avg', MonthlyAvgTemperature),
+        ('extreme_temps', ExtremeTemperatures),
+        ('temp_precip', TempPrecipitationCorrelation),
+        ('rolling_window', RollingWindowStats),
+    ]:
+        output_dir = str(tmp_path / job_name)
+        summary = run_local(job_name, [DATA_FILE], output_dir,
+                            processes=2, num_reducers=3, split_size=200)
+        
+        assert summary['map_tasks'] > 2
+        assert sum(summary['map_task_lines']) == summary['input_lines'] == 56
+        assert summary['report']['lines']['parsed'] == 55
+        assert os.path.exists(os.path.join(output_dir, '_SUCCESS'))
+        assert_records_match(
+            keyed((None, record) for record in read_part_files(output_dir)),
+            run_job(job_class)
+        )
+
+
+def test_map_task_spills_only_through_a_combiner(monkeypatch):
+    """Spills combine each new batch once; combiner-less map output is never re-combined"""
+    calls = []
+    
+    def counting_combine(job, pairs):
+        calls.append(len(pairs))
+        return combine(job, pairs)
+    
+    combine = local_engine.combine
+    monkeypatch.setattr(local_engine, 'combine', counting_combine)
+    size = os.path.getsize(DATA_FILE)
+    
+    for job_name in ('monthly_avg', 'rolling_window'):
+        unspilled = run_map_task(job_name, [], DATA_FILE, 0, size)
+        calls.clear()
+        spilled = run_map_task(job_name, [], DATA_FILE, 0, size, spill_size=5)
+        
+        assert sorted(map(json.dumps, spilled[0])) == sorted(map(json.dumps, unspilled[0]))
+        if job_name == 'rolling_window':
+            # Far past spill_size, passed through once at the end
+            assert calls == [len(spilled[0])] and len(spilled[0]) > 5
+        else:
+            # Each spill adds 5 new records to the combined months so far
+            assert len(calls) > 2 and max(calls) <= 5 + len(spilled[0])
+
+
+def test_local_engine_splits_fused_output(tmp_path):
+    """The fused job writes one directory per analysis through the engine"""
+    root = tmp_path / 'results'
+    run_local('weather_analyses', [DATA_FILE], str(tmp_path / 'fused'),
+              job_args=['--analysis-output-root', str(root)], processes=2)
+    
+    for name, job_class in [
+        ('monthly_avg', MonthlyAvgTemperature),
+        ('extreme_temps', ExtremeTemperatures),
+        ('temp_precip', TempPrecipitationCorrelation),
+        ('temp_histograms', TemperatureHistograms),
+    ]:
+        assert keyed((None, record) for record in read_part_files(str(root / name))) == \
+            run_job(job_class)
+
+
+def test_local_engine_reads_parquet_partitions(tmp_path):
+    """A partitioned Parquet dataset is mapped one file per task"""
+    root = write_columnar_data(tmp_path, 'parquet')
+    output_dir = str(tmp_path / 'monthly_avg')
+    
+    summary = run_local('monthly_avg', [root], output_dir, processes=2)
+    
+    assert summary['map_tasks'] == 5
+    assert summary['input_lines'] == 55
+    assert summary['report']['lines'] == {'parsed': 55, 'total': 55}
+    assert_records_match(
+        keyed((None, record) for record in read_part_files(output_dir)),
+        run_job(MonthlyAvgTemperature)
+    )
+
+
+def test_local_engine_prunes_partitions_by_date(tmp_path):
+    """Only the partitions of the job's date range become map tasks"""
+    root = write_columnar_data(tmp_path, 'parquet')
+    output_dir = str(tmp_path / 'monthly_avg')
+    date_args = ['--start-date', '2022-02-01', '--end-date', '2022-03-31']
+    
+    summary = run_local('monthly_avg', [root], output_dir, job_args=date_args, processes=2)
+    
+    assert summary['map_tasks'] == 2
+    assert summary['input_lines'] == 20
+    assert_records_match(
+        keyed((None, record) for record in read_part_files(output_dir)),
+        run_job(MonthlyAvgTemperature, *date_args)
+    )
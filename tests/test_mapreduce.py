@@ -2,15 +2,623 @@
 Unit tests for MapReduce jobs
 """
 
+import glob
+import json
+import math
+import os
+import struct
+from collections import defaultdict
+from datetime import date
+from itertools import groupby
+
 import pytest
-from src.mapreduce import word_count, monthly_avg_temp
+from monthly_avg_temp import MonthlyAvgTemperature
+from extreme_temps import ExtremeTemperatures
+from temp_precipitation import (
+    EMPTY_MOMENTS,
+    TempPrecipitationCorrelation,
+    merge_moments,
+)
+from weather_analyses import WeatherAnalyses
+from rolling_window import RollingWindowStats
+from temp_quantiles import TemperatureQuantiles
+from tdigest import TDigest
+from temp_histograms import TemperatureHistograms
+from protocols import PackedValueProtocol
+from weather_job import (
+    parse_weather_frame, parse_weather_line, partition_in_range, prune_input_paths
+)
+
+DATA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', 'raw', 'test_weather_data.csv'
+)
+
+
+def keyed(pairs):
+    """Index output records by key (by their first field for value-only output)"""
+    results = {}
+    for key, value in pairs:
+        if key is None:
+            key = next(iter(value.values()))
+        elif isinstance(key, list):
+            key = tuple(key)
+        results[key] = value
+    return results
+
+
+def run_job(job_class, *args):
+    """Run a job with the inline runner and return {key: record}"""
+    job = job_class(['-r', 'inline', '--no-conf', *args, DATA_FILE])
+    with job.make_runner() as runner:
+        runner.run()
+        return keyed(job.parse_output(runner.cat_output()))
+
+
+def run_uncombined(job_class, *args):
+    """Run a job's plain mapper and reducer in-process, without any combining"""
+    job = job_class(list(args))
+    
+    with open(DATA_FILE) as f:
+        pairs = [
+            pair
+            for line in f
+            for pair in job.mapper(None, line.rstrip('\n'))
+        ]
+    
+    pairs.sort(key=lambda pair: pair[0])
+    
+    return keyed(
+        output
+        for key, group in groupby(pairs, key=lambda pair: pair[0])
+        for output in job.reducer(key, (value for _, value in group))
+    )
+
+
+def test_monthly_avg_mapper():
+    """Mapper emits one (temp_max, temp_min, 1) record per valid line"""
+    job = MonthlyAvgTemperature([])
+    
+    assert list(job.mapper(None, 'date,temp_max,temp_min,precipitation')) == []
+    assert list(job.mapper(None, '2022-01-01,28.5,16.2,0.0')) == [
+        ('2022-01', (28.5, 16.2, 1))
+    ]
+    assert list(job.mapper(None, '2022-01-01,not-a-number,16.2,0.0')) == []
+    assert list(job.mapper(None, '2022-01-01,28.5')) == []
+
+
+def test_monthly_avg_combiner_matches_reducer():
+    """Combined output is identical to the uncombined mapper/reducer flow"""
+    expected = run_uncombined(MonthlyAvgTemperature)
+    
+    assert expected
+    assert run_job(MonthlyAvgTemperature) == expected
+
+
+def test_monthly_avg_in_mapper_combine_matches_reducer():
+    """In-mapper aggregation produces exactly the same monthly averages"""
+    expected = run_uncombined(MonthlyAvgTemperature)
+    
+    assert run_job(MonthlyAvgTemperature, '--in-mapper-combine') == expected
+
+
+def test_monthly_avg_in_mapper_combine_emits_one_record_per_month():
+    """Each map task emits a single partial sum per month"""
+    job = MonthlyAvgTemperature(['--in-mapper-combine'])
+    job.mapper_init()
+    
+    with open(DATA_FILE) as f:
+        lines = [line.rstrip('\n') for line in f]
+    
+    for line in lines:
+        job.mapper_aggregate(None, line)
+    
+    emitted = list(job.mapper_final())
+    months = [year_month for year_month, _ in emitted]
+    
+    assert len(months) == len(set(months))
+    assert sum(count for _, (_, _, count) in emitted) == len(lines) - 1
+
+
+@pytest.mark.parametrize('args', [['--batch-mapper'], ['--input-format', 'parquet']])
+def test_monthly_avg_in_mapper_combine_rejects_block_mappers(args):
+    """--in-mapper-combine is an error where the mapper already aggregates blocks"""
+    with pytest.raises(ValueError):
+        MonthlyAvgTemperature(['--in-mapper-combine', *args])
+
+
+def test_extreme_temps_combiner_matches_reducer():
+    """Category counts and averages are unchanged by the (count, sum) combiner"""
+    expected = run_uncombined(ExtremeTemperatures)
+    
+    assert expected
+    assert run_job(ExtremeTemperatures) == expected
+
+
+def test_task_counters_classify_lines():
+    """Mappers count parsed, skipped and malformed lines and emitted records"""
+    job = MonthlyAvgTemperature([])
+    mapper = job.mapper_step_kwargs()['mapper']
+    
+    for line in [
+        'date,temp_max,temp_min,precipitation',
+        '2022-01-01,28.5,16.2,0.0',
+        '2022/01/02,28.5,16.2,0.0',
+        '2022-01-03,n/a,16.2,0.0',
+        '',
+    ]:
+        list(mapper(None, line))
+    
+    counters = job.task_counters.as_dict()
+    assert counters['Weatheria lines'] == {
+        'parsed': 2, 'bad_date': 1, 'skipped': 2, 'malformed': 1
+    }
+    assert counters['Weatheria emitted'] == {'records': 1}
+    assert counters['Weatheria map task lines'] == {'<=2^3': 1}
+    assert 'Weatheria map ms' not in counters
+
+
+def test_counters_reach_the_runner_and_run_report(tmp_path):
+    """Counters are reported once per task and summarized in the run report"""
+    report_path = tmp_path / 'report.json'
+    job = ExtremeTemperatures(['-r', 'inline', '--no-conf', '--timing',
+                               '--run-report', str(report_path), DATA_FILE])
+    
+    with job.make_runner() as runner:
+        runner.run()
+        results = keyed(job.parse_output(runner.cat_output()))
+        job.write_run_report(runner)
+    
+    with open(report_path) as f:
+        report = json.load(f)
+    
+    assert report['job'] == 'ExtremeTemperatures'
+    assert report['lines'] == {'parsed': 55, 'skipped': 1, 'total': 56}
+    assert report['malformed_rate'] == 0.0
+    assert report['emitted'] == {
+        record['category']: record['count'] for record in results.values()
+    }
+    assert sum(report['map_task_lines'].values()) >= 1
+    assert set(report['map_ms']) == {'parse', 'classify', 'emit'}
+
+
+def test_extreme_temps_top_k_is_bounded():
+    """--top-k keeps at most K hottest and coldest dates per category"""
+    results = run_job(ExtremeTemperatures, '--top-k', '3')
+    
+    assert results == run_uncombined(ExtremeTemperatures, '--top-k', '3')
+    
+    for category, record in results.items():
+        hottest_temps = [day['avg_temp'] for day in record['hottest']]
+        coldest_temps = [day['avg_temp'] for day in record['coldest']]
+        
+        assert len(hottest_temps) == min(3, record['count'])
+        assert len(coldest_temps) == min(3, record['count'])
+        assert hottest_temps == sorted(hottest_temps, reverse=True)
+        assert coldest_temps == sorted(coldest_temps)
+
+
+def two_pass_correlation():
+    """Reference per-month statistics using the original list-based two-pass algorithm"""
+    months = {}
+    with open(DATA_FILE) as f:
+        next(f)
+        for line in f:
+            date_str, temp_max, temp_min, precip = line.strip().split(',')[:4]
+            months.setdefault(date_str[:7], []).append(
+                ((float(temp_max) + float(temp_min)) / 2, float(precip)))
+    
+    results = {}
+    for year_month, rows in months.items():
+        temps = [t for t, _ in rows]
+        precips = [p for _, p in rows]
+        n = len(rows)
+        mean_temp = sum(temps) / n
+        mean_precip = sum(precips) / n
+        numerator = sum((t - mean_temp) * (p - mean_precip) for t, p in rows)
+        denominator = math.sqrt(
+            sum((t - mean_temp) ** 2 for t in temps)
+            * sum((p - mean_precip) ** 2 for p in precips))
+        correlation = round(numerator / denominator, 4) if denominator else 0.0
+        results[year_month] = {
+            'month': year_month,
+            'correlation': correlation,
+            'avg_temp': round(mean_temp, 2),
+            'avg_precip': round(mean_precip, 2),
+            'rainy_days': sum(1 for p in precips if p > 0),
+            'total_precip': round(sum(precips), 2),
+        }
+    
+    return results
+
+
+def test_temp_precip_matches_two_pass_reference():
+    """Merged sufficient statistics reproduce the 4-decimal two-pass output"""
+    expected = two_pass_correlation()
+    
+    assert run_uncombined(TempPrecipitationCorrelation) == expected
+    assert run_job(TempPrecipitationCorrelation) == expected
+
+
+def test_merge_moments_is_order_independent():
+    """Merging split partials gives the same statistics as a single pass"""
+    job = TempPrecipitationCorrelation([])
+    with open(DATA_FILE) as f:
+        values = [
+            value
+            for line in f
+            for _, value in job.mapper(None, line.rstrip('\n'))
+        ]
+    
+    single = EMPTY_MOMENTS
+    for value in values:
+        single = merge_moments(single, value)
+    
+    left = right = EMPTY_MOMENTS
+    for value in values[::2]:
+        left = merge_moments(left, value)
+    for value in values[1::2]:
+        right = merge_moments(right, value)
+    merged = merge_moments(right, left)
+    
+    assert merged[0] == single[0] == len(values)
+    assert merged[6] == single[6]
+    for merged_stat, single_stat in zip(merged[1:6], single[1:6]):
+        assert merged_stat == pytest.approx(single_stat, rel=1e-9, abs=1e-9)
+
+
+def test_fused_job_matches_individual_jobs():
+    """One scan produces exactly what the separate jobs produce"""
+    fused = run_job(WeatherAnalyses)
+    
+    for name, job_class in [
+        ('monthly_avg', MonthlyAvgTemperature),
+        ('extreme_temps', ExtremeTemperatures),
+        ('temp_precip', TempPrecipitationCorrelation),
+        ('temp_histograms', TemperatureHistograms),
+    ]:
+        expected = run_job(job_class)
+        actual = {key: value for (tag, key), value in fused.items() if tag == name}
+        assert actual == expected
+
+
+def test_fused_job_writes_one_directory_per_analysis(tmp_path):
+    """Split output files use the individual jobs' line format"""
+    job = WeatherAnalyses([])
+    job.write_analysis_outputs(
+        [(['monthly_avg', '2022-01'], {'month': '2022-01', 'avg_max': 28.0, 'avg_min': 16.0}),
+         (['extreme_temps', 'normal'], {'category': 'normal', 'count': 2, 'avg_temp': 22.0})],
+        str(tmp_path)
+    )
+    
+    assert json.loads((tmp_path / 'monthly_avg' / 'part-00000').read_text()) == \
+        {'month': '2022-01', 'avg_max': 28.0, 'avg_min': 16.0}
+    assert json.loads((tmp_path / 'extreme_temps' / 'part-00000').read_text()) == \
+        {'category': 'normal', 'count': 2, 'avg_temp': 22.0}
+    assert (tmp_path / 'temp_precip' / 'part-00000').read_text() == ''
+
+
+def test_fused_job_rejects_remote_analysis_output_root():
+    """Per-analysis directories are split locally, so URIs are refused"""
+    for root in ['s3://bucket/output', 'hdfs:///output']:
+        with pytest.raises(ValueError):
+            WeatherAnalyses(['--analysis-output-root', root])
+
+
+def test_packed_protocol_round_trip():
+    """Flat numeric values are packed exactly, anything else falls back to JSON"""
+    protocol = PackedValueProtocol()
+    
+    for key, value in [
+        ('2022-01', (775.3, 501.2, 31)),
+        (['monthly_avg', '2022-01'], (1, 0.1 + 0.2)),
+        ('cool', (1, 20.5, [[20.5, '2022-01-01']], [[20.5, '2022-01-01']])),
+    ]:
+        decoded_key, decoded_value = protocol.read(protocol.write(key, value))
+        assert decoded_key == key
+        assert list(decoded_value) == list(value)
+    
+    assert protocol.read(protocol.write('2022-01', (1, 2.0)))[1] == (1, 2.0)
+    assert type(protocol.read(protocol.write('2022-01', (1, 2.0)))[1][0]) is int
+    
+    # Readings are written as short decimals, smaller than their JSON text
+    assert len(protocol.write('2022-01', (28.5, 16.2, 1))) < len(b'"2022-01"\t[28.5, 16.2, 1]')
+
+
+def test_packed_protocol_escapes_line_breaks():
+    """Packed bytes that are newlines, returns or backslashes are escaped"""
+    protocol = PackedValueProtocol()
+    value = struct.unpack('<d', b'\n\r\\\t\n\r\\\x00')[0]
+    
+    for packed in [(value, 10), (-0.0, float('inf'), 2 ** 70, -5)]:
+        line = protocol.write('2022-01', packed)
+        assert b'\n' not in line and b'\r' not in line
+        
+        decoded = protocol.read(line)[1]
+        assert [struct.pack('<d', item) if isinstance(item, float) else item for item in decoded] == \
+            [struct.pack('<d', item) if isinstance(item, float) else item for item in packed]
+
+
+def test_packed_protocol_matches_json_output():
+    """Jobs produce identical results with the packed internal protocol"""
+    for job_class in (MonthlyAvgTemperature, ExtremeTemperatures,
+                      TempPrecipitationCorrelation, WeatherAnalyses):
+        assert run_job(job_class, '--packed-protocol') == run_job(job_class)
+
+
+def test_output_is_typed_json_lines():
+    """Reducers write one JSON object with named, typed fields per line"""
+    job = MonthlyAvgTemperature([])
+    key, record = next(job.reducer('2022-01', [(28.0, 16.0, 1), (29.0, 17.0, 1)]))
+    
+    line = job.output_protocol().write(key, record)
+    
+    assert b'\t' not in line
+    assert json.loads(line) == {'month': '2022-01', 'avg_max': 28.5, 'avg_min': 16.5}
+
+
+def test_batch_mapper_matches_line_mapper():
+    """Vectorized block parsing gives the same results as line-by-line parsing"""
+    pytest.importorskip('pandas')
+    
+    for job_class, args in [
+        (MonthlyAvgTemperature, []),
+        (ExtremeTemperatures, []),
+        (ExtremeTemperatures, ['--top-k', '3']),
+        (TempPrecipitationCorrelation, []),
+        (WeatherAnalyses, []),
+    ]:
+        # A small block size exercises partial blocks and the final flush
+        assert run_job(job_class, '--batch-mapper', '--batch-size', '7', *args) == \
+            run_job(job_class, *args)
+
+
+def test_batch_mapper_skips_malformed_lines():
+    """Block parsing drops the same header and malformed lines as parse_weather_line()"""
+    pytest.importorskip('pandas')
+    
+    lines = [
+        'date,temp_max,temp_min,precipitation',
+        '2022-01-01,28.5,16.2,0.0',
+        '2022-01-02,29.1,15.8',
+        'not-a-date,27.0,15.0,1.0',
+        '2022-01-03,oops,16.5,5.1',
+        '2022-01-04',
+        '',
+    ]
+    
+    for job_class in (MonthlyAvgTemperature, ExtremeTemperatures, TempPrecipitationCorrelation):
+        job = job_class([])
+        expected = [pair for line in lines for pair in job.mapper(None, line)]
+        
+        combined_expected = keyed(
+            output
+            for key, group in groupby(sorted(expected, key=lambda pair: pair[0]),
+                                      key=lambda pair: pair[0])
+            for output in job.reducer(key, (value for _, value in group))
+        )
+        
+        frame = parse_weather_frame(lines)
+        actual = sorted(job.map_frame(frame), key=lambda pair: pair[0])
+        combined_actual = keyed(
+            output
+            for key, group in groupby(actual, key=lambda pair: pair[0])
+            for output in job.reducer(key, (value for _, value in group))
+        )
+        
+        assert combined_actual == combined_expected
+
+
+def write_columnar_data(tmp_path, file_format):
+    """Write the test data as a year/month partitioned Parquet or Arrow dataset"""
+    pytest.importorskip('pyarrow')
+    pytest.importorskip('pandas')
+    from download_data import write_partitioned
+    
+    import pandas as pd
+    
+    root = tmp_path / file_format
+    write_partitioned(pd.read_csv(DATA_FILE), str(root), file_format)
+    return str(root)
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_columnar_input_matches_csv(tmp_path, file_format):
+    """Jobs read Parquet/Arrow partitions into the same results as the CSV"""
+    root = write_columnar_data(tmp_path, file_format)
+    assert os.path.isdir(os.path.join(root, 'year=2022', 'month=01'))
+    
+    for job_class in (MonthlyAvgTemperature, ExtremeTemperatures,
+                      TempPrecipitationCorrelation, RollingWindowStats):
+        # The inline runner hands mapper_raw its input paths as they are
+        job = job_class(['-r', 'inline', '--no-conf', '--input-format', file_format,
+                         *sorted(glob.glob(os.path.join(root, '*', '*', '*')))])
+        with job.make_runner() as runner:
+            runner.run()
+            results = keyed(job.parse_output(runner.cat_output()))
+        
+        assert results == run_job(job_class)
+
+
+def test_date_range_rejects_lines_before_parsing():
+    """--start-date/--end-date drop out-of-range lines by their date prefix"""
+    job = MonthlyAvgTemperature(['--start-date', '2022-02-01', '--end-date', '2022-03-31'])
+    
+    with open(DATA_FILE) as f:
+        pairs = [pair for line in f for pair in job.mapper(None, line.rstrip('\n'))]
+    
+    assert {key for key, _ in pairs} == {'2022-02', '2022-03'}
+    assert dict(job.task_counters.lines) == {'parsed': 20, 'skipped': 1, 'out_of_range': 35}
+    
+    full = run_job(MonthlyAvgTemperature)
+    for args in ([], ['--batch-mapper']):
+        results = run_job(MonthlyAvgTemperature, '--start-date', '2022-02-01',
+                          '--end-date', '2022-03-31', *args)
+        assert results == {key: full[key] for key in ('2022-02', '2022-03')}
+
+
+def test_prune_input_paths():
+    """Partitions outside the date range are dropped or never listed"""
+    assert partition_in_range('s3://bucket/weather/year=2022/month=03/part-0.csv',
+                              '2022-02-15', '2022-03-01')
+    assert not partition_in_range('/data/year=2022/month=04', '2022-02-15', '2022-03-01')
+    assert not partition_in_range('/data/year=2021', '2022-02-15', None)
+    assert partition_in_range('/data/weather.csv', '2022-02-15', '2022-03-01')
+    
+    root = 's3://bucket/weather/'
+    assert prune_input_paths([root], '2022-11-20', '2023-02-01') == [
+        root + '{year=2022/month={11,12},year=2023/month={01,02}}'
+    ]
+    assert prune_input_paths([root], '2022-12-20', '2023-01-01', columnar=True) == [
+        root + 'year=2022/month=12/', root + 'year=2023/month=01/'
+    ]
+    assert prune_input_paths([root + 'year=2021/'], '2022-01-01', None) == []
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_columnar_input_date_range(tmp_path, file_format):
+    """Partitions and rows outside the date range are skipped in columnar input"""
+    root = write_columnar_data(tmp_path, file_format)
+    date_args = ['--start-date', '2022-02-06', '--end-date', '2022-03-31']
+    
+    job = MonthlyAvgTemperature(['-r', 'inline', '--no-conf', '--input-format', file_format,
+                                 *date_args, *sorted(glob.glob(os.path.join(root, '*', '*', '*')))])
+    with job.make_runner() as runner:
+        assert len(job.options.args) == 2
+        runner.run()
+        results = keyed(job.parse_output(runner.cat_output()))
+    
+    assert results == run_job(MonthlyAvgTemperature, *date_args)
+    assert results['2022-02']['avg_max'] != run_job(MonthlyAvgTemperature)['2022-02']['avg_max']
+
+
+def write_station_data(tmp_path, stations):
+    """Copy the test data once per station, with a station_id column"""
+    with open(DATA_FILE) as f:
+        header, *lines = f.read().splitlines()
+    
+    path = tmp_path / 'stations.csv'
+    path.write_text('\n'.join(
+        [header + ',station_id'] +
+        [f'{line},{station}' for station in stations for line in lines]
+    ) + '\n')
+    return str(path)
+
+
+def test_parse_weather_line_station_id():
+    """station_id is optional; an empty column means no station"""
+    assert parse_weather_line('2022-01-01,28.5,16.2,0.0').station_id is None
+    assert parse_weather_line('2022-01-01,28.5,16.2,0.0,').station_id is None
+    assert parse_weather_line('2022-01-01,28.5,16.2,0.0,MED01').station_id == 'MED01'
+    assert parse_weather_line('2022-01-01,28.5,16.2,,MED01').precipitation is None
+
+
+def test_station_id_keys_results_per_station(tmp_path):
+    """Each station gets its own records, equal to a single-station run"""
+    path = write_station_data(tmp_path, ['MED01', 'BOG02'])
+    
+    for job_class, args in [
+        (MonthlyAvgTemperature, []),
+        (MonthlyAvgTemperature, ['--in-mapper-combine']),
+        (ExtremeTemperatures, ['--top-k', '3']),
+        (TempPrecipitationCorrelation, []),
+    ]:
+        job = job_class(['-r', 'inline', '--no-conf', *args, path])
+        with job.make_runner() as runner:
+            runner.run()
+            records = [record for _, record in job.parse_output(runner.cat_output())]
+        
+        by_station = defaultdict(list)
+        for record in records:
+            by_station[record.pop('station_id')].append(record)
+        
+        assert set(by_station) == {'MED01', 'BOG02'}
+        for station_records in by_station.values():
+            assert keyed((None, record) for record in station_records) == \
+                run_job(job_class, *args)
+
+
+def test_rolling_window_matches_brute_force():
+    """Streaming windows over the sorted month plus overlap match a full rescan"""
+    windows = (3, 7, 30)
+    results = run_job(RollingWindowStats, '--windows', ','.join(map(str, windows)))
+    
+    with open(DATA_FILE) as f:
+        rows = [record for record in map(parse_weather_line, f) if record is not None]
+    
+    assert set(results) == {row.date for row in rows}
+    
+    for row in rows:
+        day = date.fromisoformat(row.date)
+        record = results[row.date]
+        
+        for days in windows:
+            window = [
+                other for other in rows
+                if 0 <= (day - date.fromisoformat(other.date)).days < days
+            ]
+            mean = sum((other.temp_max + other.temp_min) / 2 for other in window) / len(window)
+            
+            assert record[f'days_{days}d'] == len(window)
+            assert record[f'mean_{days}d'] == pytest.approx(mean, abs=0.006)
+            assert record[f'max_{days}d'] == max(other.temp_max for other in window)
+            assert record[f'min_{days}d'] == min(other.temp_min for other in window)
+
+
+def test_temp_quantiles_sketch_each_month():
+    """Monthly digests keep every day and the exact range of each variable"""
+    results = run_job(TemperatureQuantiles)
+    
+    with open(DATA_FILE) as f:
+        rows = [record for record in map(parse_weather_line, f) if record is not None]
+    
+    assert set(results) == {row.year_month for row in rows}
+    
+    for year_month, record in results.items():
+        month_rows = [row for row in rows if row.year_month == year_month]
+        temps_max = [row.temp_max for row in month_rows]
+        
+        assert record['count'] == len(month_rows)
+        assert record['temp_max']['min'] == min(temps_max)
+        assert record['temp_max']['max'] == max(temps_max)
+        
+        digest = TDigest.from_dict(record['temp_max'])
+        assert digest.count == len(month_rows)
+        assert min(temps_max) <= digest.quantile(0.95) <= max(temps_max)
+    
+    # Digest partials survive the packed intermediate protocol unchanged
+    assert run_job(TemperatureQuantiles, '--packed-protocol') == results
 
-def test_word_count():
-    """Test word count mapper"""
-    # TODO: Implement tests
-    pass
 
-def test_monthly_avg():
-    """Test monthly average temperature"""
-    # TODO: Implement tests
-    pass
+def test_histogram_thresholds_reproduce_extreme_categories():
+    """Cumulative 0.1 degree bins give the same counts and means as the fixed thresholds"""
+    histograms = run_job(TemperatureHistograms)
+    extremes = run_job(ExtremeTemperatures)
+    
+    def beyond(variable, above=None, below=None):
+        record = histograms[variable]
+        count = 0
+        total = 0.0
+        for offset, (days, sum_avg_temp) in enumerate(zip(record['counts'], record['sum_avg_temp'])):
+            # Compare bin indexes, which are exact, rather than scaled floats
+            index = record['min_bin'] + offset
+            if (above is None or index > above * 10) and (below is None or index < below * 10):
+                count += days
+                total += sum_avg_temp
+        return count, total
+    
+    for category, variable, above, below in [
+        ('very_hot', 'temp_max', 30, None),
+        ('cool', 'temp_min', None, 15),
+        ('very_cool', 'temp_min', None, 12),
+    ]:
+        count, total = beyond(variable, above, below)
+        expected = extremes.get(category, {'count': 0})
+        
+        assert count == expected['count']
+        if count:
+            assert round(total / count, 2) == pytest.approx(expected['avg_temp'], abs=0.01)
+    
+    for variable in ('temp_max', 'temp_min', 'avg_temp'):
+        assert sum(histograms[variable]['counts']) == sum(
+            1 for line in open(DATA_FILE) if parse_weather_line(line) is not None)
@@ -0,0 +1,117 @@
+"""
+Unit tests for the pipeline orchestrator
+"""
+
+import argparse
+import json
+import os
+import threading
+
+import pytest
+
+from convert_hadoop_output import convert
+from run_pipeline import Stage, job_processes, main, run_dag
+from test_mapreduce import DATA_FILE
+
+
+def read_results(path):
+    """Read a JSON-lines result file"""
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_independent_stages_run_concurrently():
+    """Stages whose dependencies are met run at the same time"""
+    # Each job waits for the other, so they only finish if run concurrently
+    barrier = threading.Barrier(2, timeout=10)
+    order = []
+    
+    stages = [
+        Stage('a', barrier.wait),
+        Stage('b', barrier.wait),
+        Stage('c', lambda: order.append('c'), ['a', 'b']),
+    ]
+    report = run_dag(stages)
+    
+    assert [report[name]['status'] for name in 'abc'] == ['ok'] * 3
+    assert order == ['c']
+    assert report['c']['start'] >= max(report['a']['end'], report['b']['end'])
+
+
+def test_failed_stage_skips_dependents():
+    """A failure skips everything downstream but not other branches"""
+    def fail():
+        raise RuntimeError('no data')
+    
+    report = run_dag([
+        Stage('job:a', fail),
+        Stage('publish:a', lambda: None, ['job:a']),
+        Stage('report', lambda: None, ['publish:a']),
+        Stage('job:b', lambda: 3),
+    ])
+    
+    assert report['job:a'] == dict(report['job:a'], status='failed', error='RuntimeError: no data')
+    assert report['publish:a']['status'] == report['report']['status'] == 'skipped'
+    assert report['job:b']['status'] == 'ok' and report['job:b']['result'] == 3
+    
+    with pytest.raises(ValueError):
+        run_dag([Stage('a', fail, ['missing'])])
+
+
+def test_concurrent_jobs_share_processes():
+    """--processes is split between the jobs that can run at once"""
+    def processes(total, jobs, max_parallel=None):
+        return job_processes(argparse.Namespace(
+            processes=total, jobs=['job'] * jobs, max_parallel=max_parallel))
+    
+    assert processes(8, 4) == 2
+    assert processes(8, 3) == 2
+    assert processes(2, 5) == 1
+    assert processes(8, 4, max_parallel=2) == 4
+    assert processes(None, 1) == (os.cpu_count() or 1)
+
+
+@pytest.mark.parametrize('runner', ['local', 'hadoop'])
+def test_pipeline_publishes_results(tmp_path, runner):
+    """The pipeline publishes the API result files with the same records"""
+    results_dir = tmp_path / 'results'
+    jobs = ['monthly_avg', 'extreme_temps', 'temp_precip']
+    
+    main(['--input', DATA_FILE, '--runner', runner, '--jobs', *jobs, '--processes', '1',
+          '--work-dir', str(tmp_path / 'work'), '--results-dir', str(results_dir)])
+    
+    main(['--input', DATA_FILE, '--runner', 'simple',
+          '--work-dir', str(tmp_path / 'simple'), '--results-dir', str(tmp_path / 'expected')])
+    
+    # Only the results are left in the results directory
+    assert sorted(os.listdir(results_dir)) == sorted(f'{name}.jsonl' for name in jobs)
+    for name in jobs:
+        records = read_results(results_dir / f'{name}.jsonl')
+        expected = read_results(tmp_path / 'expected' / f'{name}.jsonl')
+        assert len(records) == len(expected) > 0
+        assert set(records[0]) == set(expected[0])
+    
+    with open(tmp_path / 'work' / 'pipeline_report.json') as f:
+        report = json.load(f)
+    assert report['runner'] == runner
+    assert set(report['stages']) == {f'{kind}:{name}' for kind in ('job', 'publish') for name in jobs}
+    assert all(entry['status'] == 'ok' for entry in report['stages'].values())
+    if runner == 'local':
+        assert report['stages']['job:monthly_avg']['result']['processes'] == 1
+
+
+def test_convert_keeps_result_without_part_files(tmp_path):
+    """A result with no part files is skipped instead of emptied"""
+    result = tmp_path / 'monthly_avg.jsonl'
+    result.write_text('{"month": "2022-01", "avg_max": 28.5, "avg_min": 17.2}\n')
+    
+    assert convert('monthly_avg', str(tmp_path / 'hadoop'), str(tmp_path)) is None
+    assert convert('temp_quantiles', str(tmp_path / 'hadoop'), str(tmp_path)) is None
+    assert result.read_text() == '{"month": "2022-01", "avg_max": 28.5, "avg_min": 17.2}\n'
+    assert sorted(os.listdir(tmp_path)) == ['monthly_avg.jsonl']
+    
+    (tmp_path / 'hadoop' / 'monthly_avg').mkdir(parents=True)
+    (tmp_path / 'hadoop' / 'monthly_avg' / 'part-00000').write_text(
+        '{"month": "2022-02", "avg_max": 29.1, "avg_min": 16.9}\n')
+    assert convert('monthly_avg', str(tmp_path / 'hadoop'), str(tmp_path)) == 1
+    assert '2022-02' in result.read_text()
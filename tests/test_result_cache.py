@@ -0,0 +1,135 @@
+"""
+Unit tests for the job result cache
+"""
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from local_engine import run_local
+from monthly_avg_temp import MonthlyAvgTemperature
+from result_cache import ResultCache, source_fingerprint
+from test_mapreduce import DATA_FILE
+
+
+def write_output(path, text):
+    """Write a one-file job output"""
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_cache_hits_only_for_same_input_and_code(tmp_path):
+    """Outputs are reused for identical input contents and job code"""
+    cache = ResultCache(str(tmp_path / 'cache'))
+    input_path = str(tmp_path / 'input.csv')
+    output_path = str(tmp_path / 'output.jsonl')
+    shutil.copy(DATA_FILE, input_path)
+    
+    fingerprint = source_fingerprint(MonthlyAvgTemperature)
+    key = cache.key([input_path], 'monthly_avg', fingerprint)
+    
+    assert cache.fetch(key, output_path) is None
+    write_output(output_path, 'first\n')
+    cache.store(key, output_path, {'rows': 1})
+    
+    os.remove(output_path)
+    assert cache.fetch(key, output_path)['metadata'] == {'rows': 1}
+    with open(output_path) as f:
+        assert f.read() == 'first\n'
+    
+    # A copy with the same contents is the same input
+    copy_path = str(tmp_path / 'copy.csv')
+    shutil.copy(DATA_FILE, copy_path)
+    assert cache.key([copy_path], 'monthly_avg', fingerprint) == key
+    
+    with open(input_path, 'a') as f:
+        f.write('2022-06-01,25.0,15.0,0.0\n')
+    assert cache.key([input_path], 'monthly_avg', fingerprint) != key
+    assert cache.key([copy_path], 'monthly_avg', fingerprint, ['--top-k', '3']) != key
+    assert source_fingerprint(write_output) != fingerprint
+    
+    assert cache.stats == {'hits': 1, 'misses': 1, 'stores': 1, 'evictions': 0}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Entries over the limit are evicted, least recently used first"""
+    cache = ResultCache(str(tmp_path / 'cache'), max_entries=2)
+    output_path = str(tmp_path / 'output.jsonl')
+    
+    for key in ('a', 'b'):
+        write_output(output_path, key)
+        cache.store(key, output_path)
+    
+    # Using "a" makes "b" the least recently used entry
+    assert cache.fetch('a', output_path) is not None
+    write_output(output_path, 'c')
+    cache.store('c', output_path)
+    
+    assert sorted(cache.entries()) == ['a', 'c']
+    assert cache.stats['evictions'] == 1
+    
+    cache.max_age = -1
+    assert cache.evict() == 2 and cache.entries() == {}
+
+
+def test_concurrent_counters_are_not_lost(tmp_path):
+    """Counter updates from concurrent users of a cache directory all land"""
+    cache_dir = str(tmp_path / 'cache')
+    
+    def count_hits(_):
+        cache = ResultCache(cache_dir)
+        for _ in range(25):
+            cache.count('hits')
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(count_hits, range(8)))
+    
+    cache = ResultCache(cache_dir)
+    assert cache.stats['hits'] == 200
+    assert cache.entries() == {}
+    assert sorted(os.listdir(cache_dir)) == ['.lock', 'stats.json']
+
+
+def test_local_engine_reuses_cached_output(tmp_path):
+    """A rerun over unchanged input restores the output without running"""
+    cache = ResultCache(str(tmp_path / 'cache'))
+    output_dir = str(tmp_path / 'monthly_avg')
+    
+    first = run_local('monthly_avg', [DATA_FILE], output_dir, processes=1, cache=cache)
+    with open(os.path.join(output_dir, 'part-00000')) as f:
+        expected = f.read()
+    shutil.rmtree(output_dir)
+    
+    second = run_local('monthly_avg', [DATA_FILE], output_dir, processes=1, cache=cache)
+    
+    assert (first['cache'], second['cache']) == ('miss', 'hit')
+    assert second['input_lines'] == first['input_lines'] == 56
+    with open(os.path.join(output_dir, 'part-00000')) as f:
+        assert f.read() == expected
+    
+    third = run_local('monthly_avg', [DATA_FILE], output_dir, job_args=['--batch-mapper'],
+                      processes=1, cache=cache)
+    assert third['cache'] == 'miss'
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 2
+
+
+def test_cache_restores_only_job_output_files(tmp_path):
+    """A hit replaces the part files and _SUCCESS, leaving other files alone"""
+    cache = ResultCache(str(tmp_path / 'cache'))
+    output_dir = tmp_path / 'monthly_avg'
+    output_dir.mkdir()
+    (output_dir / 'notes.txt').write_text('before\n')
+    
+    run_local('monthly_avg', [DATA_FILE], str(output_dir), processes=1, num_reducers=1, cache=cache)
+    expected = (output_dir / 'part-00000').read_text()
+    
+    (output_dir / 'notes.txt').write_text('after\n')
+    (output_dir / 'part-00000').write_text('stale\n')
+    (output_dir / 'part-00003').write_text('stale\n')
+    (output_dir / '_SUCCESS').unlink()
+    
+    assert run_local('monthly_avg', [DATA_FILE], str(output_dir), processes=1,
+                     num_reducers=1, cache=cache)['cache'] == 'hit'
+    assert sorted(os.listdir(output_dir)) == ['_SUCCESS', 'notes.txt', 'part-00000']
+    assert (output_dir / 'part-00000').read_text() == expected
+    assert (output_dir / 'notes.txt').read_text() == 'after\n'
@@ -0,0 +1,179 @@
+"""
+Unit tests for the typed, precomputed results store
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from api.config import settings
+from api.dependencies.file_handler import read_results, results_cache
+from api.dependencies.results_store import (
+    MonthlyResults,
+    TempPrecipResults,
+    interpret_correlation,
+    quantile_sketches,
+    threshold_histograms,
+)
+from api.main import app
+from tdigest import TDigest
+
+
+MONTHLY = [
+    {'station_id': 'A', 'month': '2022-01', 'avg_max': 28.53, 'avg_min': 17.21},
+    {'station_id': 'A', 'month': '2022-02', 'avg_max': 29.14, 'avg_min': 16.9},
+    {'station_id': 'B', 'month': '2022-01', 'avg_max': 31.02, 'avg_min': 18.4},
+    {'station_id': 'B', 'month': '2022-02', 'avg_max': 30.6, 'avg_min': 15.33},
+]
+
+TEMP_PRECIP = [
+    {'station_id': 'A', 'month': '2022-01', 'correlation': -0.52, 'avg_temp': 22.8,
+     'avg_precip': 4.1, 'rainy_days': 18, 'total_precip': 127.1},
+    {'station_id': 'B', 'month': '2022-01', 'correlation': 0.13, 'avg_temp': 24.7,
+     'avg_precip': 2.2, 'rainy_days': 9, 'total_precip': 68.2},
+]
+
+
+def digest_of(values):
+    """Serialized t-digest of a list of values"""
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+    return digest.to_dict()
+
+
+QUANTILES = [
+    {'station_id': station_id, 'month': '2022-01', 'count': 11,
+     **{variable: digest_of([offset + day for day in range(11)])
+        for variable in ('temp_max', 'temp_min', 'avg_temp')}}
+    for station_id, offset in (('A', 20.0), ('B', 25.0))
+]
+
+# temp_max histograms at 0.1 °C: A has days at 29.9, 30.0 (x2) and 30.1 °C
+HISTOGRAMS = [
+    {'station_id': 'A', 'variable': 'temp_max', 'resolution': 0.1, 'min_bin': 299,
+     'counts': [1, 2, 1], 'sum_avg_temp': [22.0, 46.0, 24.0]},
+    {'station_id': 'B', 'variable': 'temp_max', 'resolution': 0.1, 'min_bin': 301,
+     'counts': [3], 'sum_avg_temp': [75.0]},
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API client over multi-station results"""
+    for name, records in ((settings.monthly_avg_file, MONTHLY),
+                          (settings.temp_precip_file, TEMP_PRECIP),
+                          (settings.temp_quantiles_file, QUANTILES),
+                          (settings.temp_histograms_file, HISTOGRAMS)):
+        with open(tmp_path / name, 'w') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+    
+    monkeypatch.setattr(settings, 'results_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'use_s3', False)
+    results_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    results_cache.clear()
+
+
+def test_store_matches_dataframe_answers(tmp_path):
+    """Precomputed answers equal the per-request pandas computations"""
+    path = tmp_path / 'monthly.jsonl'
+    path.write_text(''.join(json.dumps(record) + '\n' for record in MONTHLY))
+    df = read_results(str(path), ['station_id', 'month', 'avg_max', 'avg_min'])
+    store = MonthlyResults(df)
+    
+    assert store.values['avg_max'].dtype == 'float32'
+    assert store.month.categories.tolist() == ['2022-01', '2022-02']
+    
+    for station_id in (None, 'A', 'B'):
+        selection = df if station_id is None else df[df['station_id'] == station_id]
+        assert store.answer('rows', station_id) == selection.to_dict('records')
+        assert store.answer('hottest', station_id) == selection.loc[selection['avg_max'].idxmax()].to_dict()
+        assert store.answer('coolest', station_id) == selection.loc[selection['avg_min'].idxmin()].to_dict()
+        
+        stats = store.answer('stats', station_id)
+        assert stats['total_stations'] == (2 if station_id is None else 1)
+        assert stats['overall_avg_max'] == float(selection['avg_max'].mean())
+    
+    with pytest.raises(HTTPException) as error:
+        store.answer('hottest', 'C')
+    assert error.value.status_code == 404
+    
+    # Rows are rebuilt from the float32/int32 columns with the file's values
+    path.write_text(''.join(json.dumps(record) + '\n' for record in TEMP_PRECIP))
+    df = read_results(str(path), list(TEMP_PRECIP[0]))
+    store = TempPrecipResults(df)
+    assert store.values['rainy_days'].dtype == 'int32'
+    assert store.answer('rows') == df.to_dict('records') == TEMP_PRECIP
+    assert store.answer('wettest', 'B') == TEMP_PRECIP[1]
+
+
+def test_endpoints_serve_precomputed_answers(client, monkeypatch):
+    """Endpoints answer from the store loaded at startup, without parsing"""
+    def no_parse(*args, **kwargs):
+        raise AssertionError('results parsed per request')
+    
+    monkeypatch.setattr('api.dependencies.file_handler.read_results', no_parse)
+    
+    assert client.get('/monthly-avg/hottest').json()['avg_max'] == 31.02
+    assert client.get('/monthly-avg/coolest', params={'station_id': 'A'}).json()['month'] == '2022-02'
+    assert client.get('/temp-precipitation/wettest-month').json()['station_id'] == 'A'
+    assert client.get('/temp-precipitation/driest-month').json()['total_precip'] == 68.2
+    
+    stats = client.get('/stats').json()
+    assert (stats['total_months_analyzed'], stats['total_stations']) == (2, 2)
+    assert stats['max_temperature'] == 31.02 and stats['min_temperature'] == 15.33
+    
+    interpretations = client.get('/temp-precipitation/correlation-strength').json()
+    assert [row['interpretation'] for row in interpretations] == ['moderate negative', 'very weak positive']
+    assert client.get('/monthly-avg', params={'station_id': 'C'}).status_code == 404
+    
+    assert results_cache.stats()['misses'] == 4
+    assert interpret_correlation(0.7) == 'strong positive'
+
+
+def test_percentiles_use_sketches_built_once(client, monkeypatch):
+    """Percentile endpoints query the digests built when the sketches loaded"""
+    sketches = quantile_sketches()
+    monkeypatch.setattr('api.dependencies.file_handler.read_results',
+                        lambda *args, **kwargs: pytest.fail('sketches parsed per request'))
+    monkeypatch.setattr('api.dependencies.sketches.DigestQuantiles.__init__',
+                        lambda *args: pytest.fail('digest rebuilt per request'))
+    
+    rows = client.get('/extreme-temps/percentiles', params={'p': [0, 100]}).json()
+    assert [(row['station_id'], row['percentiles']) for row in rows] == [
+        ('A', {'0': 20.0, '100': 30.0}), ('B', {'0': 25.0, '100': 35.0})
+    ]
+    
+    rank = client.get('/extreme-temps/percentile-rank',
+                      params={'value': 35.0, 'station_id': 'A', 'variable': 'avg_temp'}).json()
+    assert [row['percentile'] for row in rank] == [100.0]
+    
+    assert client.get('/extreme-temps/percentiles', params={'month': '2022-02'}).status_code == 404
+    assert client.get('/extreme-temps/percentiles', params={'station_id': 'C'}).status_code == 404
+    assert quantile_sketches() is sketches
+
+
+def test_thresholds_use_histograms_built_once(client, monkeypatch):
+    """Threshold queries use the prefix sums built when the histograms loaded"""
+    histograms = threshold_histograms()
+    monkeypatch.setattr('api.dependencies.file_handler.read_results',
+                        lambda *args, **kwargs: pytest.fail('histograms parsed per request'))
+    monkeypatch.setattr('api.dependencies.histograms.CumulativeHistogram.__init__',
+                        lambda *args: pytest.fail('histogram rebuilt per request'))
+    
+    station = client.get('/extreme-temps/threshold',
+                         params={'above': 29.95, 'station_id': 'A'}).json()
+    assert (station['count'], station['avg_temp']) == (3, 23.33)
+    
+    pooled = client.get('/extreme-temps/threshold', params={'above': 30.0}).json()
+    assert (pooled['count'], pooled['avg_temp'], pooled['percentage']) == (4, 24.75, 57.14)
+    
+    assert client.get('/extreme-temps/threshold',
+                      params={'variable': 'temp_min', 'below': 12}).status_code == 404
+    assert client.get('/extreme-temps/threshold',
+                      params={'above': 30, 'station_id': 'C'}).status_code == 404
+    assert threshold_histograms() is histograms
@@ -0,0 +1,150 @@
+"""
+Unit tests for loading MapReduce output from S3 (against moto's S3 stand-in)
+"""
+
+import json
+import os
+import threading
+
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from api.config import settings
+from api.dependencies import file_handler
+from api.dependencies.file_handler import load_csv_data, load_csv_from_s3, results_cache
+from api.dependencies.s3_mirror import MANIFEST_FILE, mirror_path
+
+moto = pytest.importorskip('moto')
+mock_aws = getattr(moto, 'mock_aws', None) or moto.mock_s3
+
+
+COLUMNS = ['station_id', 'month', 'avg_max', 'avg_min']
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    """Empty results bucket in an in-memory S3, with a fresh shared client"""
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        monkeypatch.setenv(name, 'testing')
+    monkeypatch.setattr(settings, 'aws_region', 'us-east-1')
+    monkeypatch.setattr(settings, 'results_dir', str(tmp_path))
+    monkeypatch.setattr(file_handler, 's3_clients', {})
+    results_cache.clear()
+    
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=settings.s3_bucket)
+        yield client
+    
+    results_cache.clear()
+
+
+def put_parts(client, prefix, count):
+    """Write one monthly record per part file, plus _SUCCESS and an empty part"""
+    for index in range(count):
+        record = {'month': f'{2000 + index // 12}-{index % 12 + 1:02d}',
+                  'avg_max': 20.0 + index / 100, 'avg_min': 10.0}
+        client.put_object(Bucket=settings.s3_bucket, Key=f'{prefix}part-{index:05d}',
+                          Body=json.dumps(record) + '\n')
+    client.put_object(Bucket=settings.s3_bucket, Key=f'{prefix}part-{count:05d}', Body=b'')
+    client.put_object(Bucket=settings.s3_bucket, Key=f'{prefix}_SUCCESS', Body=b'')
+
+
+def test_listing_is_paginated(s3):
+    """Outputs with more than 1000 objects load completely, in part order"""
+    put_parts(s3, 'output/monthly_avg/', 1003)
+    
+    df = load_csv_from_s3('output/monthly_avg/', COLUMNS)
+    
+    assert len(df) == 1003
+    assert df['avg_max'].tolist() == [20.0 + index / 100 for index in range(1003)]
+    assert df['station_id'].isna().all()
+    
+    # The client is created once and shared
+    assert load_csv_from_s3('output/monthly_avg/', COLUMNS) is df
+    assert len(file_handler.s3_clients) == 1
+
+
+def test_parts_download_concurrently(s3, monkeypatch):
+    """Part files are fetched at the same time, not one after another"""
+    put_parts(s3, 'output/monthly_avg/', 4)
+    client = file_handler.get_s3_client()
+    get_object = client.get_object
+    
+    # Every download waits for the others, so they only finish if concurrent
+    barrier = threading.Barrier(4, timeout=10)
+    
+    def slow_get_object(**kwargs):
+        barrier.wait()
+        return get_object(**kwargs)
+    
+    monkeypatch.setattr(client, 'get_object', slow_get_object)
+    
+    df = load_csv_from_s3('output/monthly_avg/', COLUMNS)
+    assert df['month'].tolist() == ['2000-01', '2000-02', '2000-03', '2000-04']
+
+
+def count_downloads(monkeypatch):
+    """Record the keys fetched with get_object by the shared client"""
+    client = file_handler.get_s3_client()
+    get_object = client.get_object
+    downloads = []
+    
+    def counted_get_object(**kwargs):
+        downloads.append(kwargs['Key'])
+        return get_object(**kwargs)
+    
+    monkeypatch.setattr(client, 'get_object', counted_get_object)
+    return downloads
+
+
+def test_mirror_downloads_only_changed_parts(s3, monkeypatch):
+    """Unchanged parts are read from the mirror, changed ones downloaded"""
+    put_parts(s3, 'output/monthly_avg/', 3)
+    downloads = count_downloads(monkeypatch)
+    
+    load_csv_from_s3('output/monthly_avg/', COLUMNS)
+    assert len(downloads) == 3
+    assert os.path.exists(mirror_path('output/monthly_avg/part-00002'))
+    
+    results_cache.clear()
+    load_csv_from_s3('output/monthly_avg/', COLUMNS)
+    assert len(downloads) == 3
+    
+    s3.put_object(Bucket=settings.s3_bucket, Key='output/monthly_avg/part-00001',
+                  Body=json.dumps({'month': '2001-01', 'avg_max': 30.0, 'avg_min': 11.0}) + '\n')
+    s3.delete_object(Bucket=settings.s3_bucket, Key='output/monthly_avg/part-00002')
+    results_cache.clear()
+    df = load_csv_from_s3('output/monthly_avg/', COLUMNS)
+    
+    assert downloads[3:] == ['output/monthly_avg/part-00001']
+    assert df['month'].tolist() == ['2000-01', '2001-01']
+    assert not os.path.exists(mirror_path('output/monthly_avg/part-00002'))
+    with open(os.path.join(mirror_path('output/monthly_avg/'), MANIFEST_FILE)) as f:
+        assert sorted(json.load(f)) == ['output/monthly_avg/part-00000', 'output/monthly_avg/part-00001']
+
+
+def test_mirror_serves_results_when_s3_is_unreachable(s3, tmp_path, monkeypatch):
+    """Without S3, the mirrored output is preferred over stale local files"""
+    monkeypatch.setattr(settings, 'use_s3', True)
+    put_parts(s3, 'output/monthly_avg/', 2)
+    with open(tmp_path / settings.monthly_avg_file, 'w') as f:
+        f.write(json.dumps({'month': '1999-01', 'avg_max': 1.0, 'avg_min': 0.0}) + '\n')
+    
+    assert load_csv_data(settings.monthly_avg_file, COLUMNS)['month'].tolist() == ['2000-01', '2000-02']
+    
+    class UnreachableS3:
+        def get_paginator(self, operation):
+            raise EndpointConnectionError(endpoint_url='https://s3.amazonaws.com')
+    
+    monkeypatch.setattr(file_handler, 'get_s3_client', UnreachableS3)
+    results_cache.clear()
+    assert load_csv_data(settings.monthly_avg_file, COLUMNS)['month'].tolist() == ['2000-01', '2000-02']
+    
+    # Outputs never mirrored still fall back to the local files
+    results_cache.clear()
+    monkeypatch.setattr(settings, 'results_dir', str(tmp_path / 'empty'))
+    os.makedirs(tmp_path / 'empty')
+    os.rename(tmp_path / settings.monthly_avg_file, tmp_path / 'empty' / settings.monthly_avg_file)
+    assert load_csv_data(settings.monthly_avg_file, COLUMNS)['month'].tolist() == ['1999-01']
@@ -0,0 +1,50 @@
+"""
+Unit tests for the t-digest quantile sketch
+"""
+
+import random
+
+from tdigest import TDigest
+
+
+def exact_quantile(values, q):
+    """Linear-interpolated quantile of a list"""
+    values = sorted(values)
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def test_merged_digests_track_exact_quantiles():
+    """Digests merged from serialized parts stay close to the exact quantiles"""
+    rng = random.Random(7)
+    values = [rng.gauss(25, 3) for _ in range(20000)]
+    
+    parts = [TDigest() for _ in range(8)]
+    for index, value in enumerate(values):
+        parts[index % len(parts)].add(value)
+    
+    digest = TDigest()
+    for part in parts:
+        digest.merge(TDigest.from_dict(part.to_dict()))
+    
+    assert digest.count == len(values)
+    assert len(digest.to_dict()['centroids']) <= 100
+    assert digest.quantile(0) == min(values)
+    assert digest.quantile(1) == max(values)
+    
+    for q in (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99):
+        assert abs(digest.quantile(q) - exact_quantile(values, q)) < 0.1
+
+
+def test_small_digest_is_exact_at_the_ends():
+    """With few values every value keeps its own centroid"""
+    digest = TDigest()
+    for value in [3.0, 1.0, 2.0, 5.0, 4.0]:
+        digest.add(value)
+    
+    assert [mean for mean, _ in digest.to_dict()['centroids']] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert digest.quantile(0.5) == 3.0
+    assert digest.quantile(0) == 1.0
+    assert digest.quantile(1) == 5.0
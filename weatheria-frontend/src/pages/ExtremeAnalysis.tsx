@@ -79,7 +79,7 @@ export function ExtremeAnalysis() {
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = 'extreme_temps_results.csv';
+      a.download = 'extreme_temps.jsonl';
       document.body.appendChild(a);
       a.click();
       window.URL.revokeObjectURL(url);
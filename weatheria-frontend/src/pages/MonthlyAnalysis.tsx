@@ -42,7 +42,7 @@ export function MonthlyAnalysis() {
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = 'monthly_avg_results.csv';
+      a.download = 'monthly_avg.jsonl';
       document.body.appendChild(a);
       a.click();
       window.URL.revokeObjectURL(url);
@@ -45,7 +45,7 @@ export function PrecipitationAnalysis() {
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = 'temp_precip_results.csv';
+      a.download = 'temp_precip.jsonl';
       document.body.appendChild(a);
       a.click();
       window.URL.revokeObjectURL(url);